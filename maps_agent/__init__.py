@@ -1,2 +1,37 @@
-from . import config  # Load config first
-from . import agent
+"""
+Maps Agent package
+Submodules and agents are loaded on first attribute access so that
+`import maps_agent` stays cheap on cold start. `config` is always applied
+before any agent or tool module is materialized.
+"""
+import importlib
+
+# Submodules exposed as package attributes, loaded lazily
+_SUBMODULES = ("config", "agent", "streaming_agent", "tools")
+
+# Objects re-exported from submodules: attribute -> (module, name)
+_LAZY_ATTRS = {
+    "root_agent": ("agent", "root_agent"),
+}
+
+__all__ = list(_SUBMODULES) + list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        module_name, attr = _LAZY_ATTRS[name]
+        value = getattr(__getattr__(module_name), attr)
+        globals()[name] = value
+        return value
+
+    if name in _SUBMODULES:
+        if name != "config":
+            # Load config first - it sets Vertex AI environment variables
+            importlib.import_module(f"{__name__}.config")
+        return importlib.import_module(f"{__name__}.{name}")
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
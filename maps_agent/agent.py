@@ -5,6 +5,12 @@ Following Google ADK best practices for agent design
 from google.adk.agents import Agent
 from google.adk.tools import google_maps_grounding
 
+# Importable both as maps_agent.agent (ADK tooling) and as agent (runner.py)
+try:
+    from .history import history_window_callback
+except ImportError:
+    from history import history_window_callback
+
 # Root agent - MUST be named 'root_agent' for ADK
 root_agent = Agent(
     name="accessible_journey_assistant",
@@ -131,4 +137,6 @@ You are not just a search tool. You are a trusted companion for people who face
 
 **Your ultimate goal:** Help people with mobility challenges reclaim their independence and explore the world on their own terms, with dignity and confidence.""",
     tools=[google_maps_grounding],
+    # Bound the history sent to Gemini so long sessions don't grow every turn
+    before_model_callback=history_window_callback,
 )
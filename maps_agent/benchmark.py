@@ -0,0 +1,836 @@
+"""
+Micro-benchmarks for the Python agent runtime
+Run from the maps_agent directory:
+
+    python benchmark.py registry [--iterations 1000]
+    python benchmark.py startup [--budget-ms 1500] [module ...]
+    python benchmark.py isolation [--requests 20] [--query "..."]
+    python benchmark.py sessions [--sessions 200] [--events 20]
+    python benchmark.py history [--turns 5 10 20 40 80]
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+AGENT_DIR = pathlib.Path(__file__).resolve().parent
+
+
+def _time_calls(fn: Callable[[], object], iterations: int) -> List[float]:
+    """Time each call of fn in seconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    """Mean / p50 / p95 / max in microseconds"""
+    ordered = sorted(timings)
+    return {
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'case':<48}{'mean_us':>12}{'p50_us':>12}{'p95_us':>12}{'max_us':>12}")
+    for name, row in rows.items():
+        print(f"{name:<48}{row['mean_us']:>12.1f}{row['p50_us']:>12.1f}{row['p95_us']:>12.1f}{row['max_us']:>12.1f}")
+
+
+def bench_registry(args) -> None:
+    """Per-turn Runner construction vs cached registry lookups"""
+    from google.adk.memory import InMemoryMemoryService
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from runner_registry import AGENT_LOADERS, RunnerRegistry
+
+    registry = RunnerRegistry()
+    session_service = InMemorySessionService()
+    memory_service = InMemoryMemoryService()
+
+    # Load every agent once so the registry reports import/build cost
+    agent_names = [name for name in AGENT_LOADERS if name in args.agents]
+    for name in agent_names:
+        registry.get_agent(name)
+
+    rows = {}
+    for name in agent_names:
+        agent = registry.get_agent(name)
+        rows[f"{name}: new Runner"] = _summary(_time_calls(
+            lambda: Runner(
+                app_name="bench",
+                agent=agent,
+                session_service=session_service,
+                memory_service=memory_service,
+            ),
+            args.iterations,
+        ))
+        rows[f"{name}: registry"] = _summary(_time_calls(
+            lambda: registry.get_runner("bench", agent, session_service, memory_service),
+            args.iterations,
+        ))
+
+    _print_table(f"Runner construction ({args.iterations} iterations)", rows)
+
+    print("\nAgent load time (import + build)")
+    for name, seconds in registry.stats()["agents"].items():
+        print(f"  {name:<32}{seconds * 1000:>10.1f} ms")
+
+
+def _import_profile(module: str) -> Tuple[float, List[Tuple[int, int, int, str]]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        (wall seconds, [(depth, self_us, cumulative_us, name), ...])
+    """
+    # Package imports run from the repo root, script-style modules from maps_agent/
+    cwd = AGENT_DIR.parent if module.split(".")[0] == AGENT_DIR.name else AGENT_DIR
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True, env=dict(os.environ),
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return wall, entries
+
+
+def bench_startup(args) -> None:
+    """Cold-start import time per entry point with an -X importtime breakdown"""
+    over_budget = []
+    for module in args.modules:
+        runs = [_import_profile(module) for _ in range(args.repeat)]
+        # Report the fastest run; slower ones are mostly scheduling noise
+        wall, entries = min(runs, key=lambda run: run[0])
+        total_us = sum(cumulative for depth, _, cumulative, _ in entries if depth == 0)
+
+        print(f"\nimport {module}: {total_us / 1000:.1f} ms imports, {wall * 1000:.1f} ms process wall")
+        print(f"  {'cumulative_ms':>14}{'self_ms':>10}  package")
+        for depth, self_us, cumulative_us, name in sorted(entries, key=lambda e: -e[2])[:args.top]:
+            print(f"  {cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {'  ' * depth}{name}")
+
+        if args.budget_ms and total_us / 1000 > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\nOver {args.budget_ms} ms import budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+def _start_runner(*mode_args: str) -> subprocess.Popen:
+    """Start runner.py in a server mode and wait for its ready line"""
+    process = subprocess.Popen(
+        [sys.executable, str(AGENT_DIR / "runner.py"), *mode_args],
+        cwd=AGENT_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    while json.loads(process.stdout.readline()).get("type") != "ready":
+        pass
+    return process
+
+
+def _request(process: subprocess.Popen, request: dict) -> dict:
+    """Send one request and block until its result line"""
+    process.stdin.write(json.dumps(request) + "\n")
+    process.stdin.flush()
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("runner exited before replying")
+        message = json.loads(line)
+        if message.get("id") == request["id"] and message.get("type") in ("result", "error"):
+            return message
+
+
+def bench_isolation(args) -> None:
+    """Per-request cost of spawn-per-request vs zygote fork vs in-process daemon"""
+    def make_request(index: int) -> dict:
+        if args.query:
+            return {"id": str(index), "op": "run", "query": args.query, "session_id": f"bench-{index}"}
+        return {"id": str(index), "op": "noop"}
+
+    def spawn_once(index: int) -> None:
+        # What runAgent used to do: a fresh interpreter and agent per query
+        process = _start_runner("--daemon")
+        _request(process, make_request(index))
+        process.stdin.close()
+        process.wait()
+
+    rows = {}
+    counter = iter(range(10 ** 9))
+    rows["spawn per request"] = _summary(_time_calls(lambda: spawn_once(next(counter)), args.requests))
+
+    for name, mode_args in (("zygote fork", ("--zygote",)), ("in-process daemon", ("--daemon",))):
+        process = _start_runner(*mode_args)
+        rows[name] = _summary(_time_calls(lambda: _request(process, make_request(next(counter))), args.requests))
+        process.stdin.close()
+        process.wait()
+
+    workload = f"query {args.query!r}" if args.query else "noop requests"
+    _print_table(f"Isolation modes ({args.requests} sequential {workload})", rows)
+
+
+async def _time_async_calls(calls) -> List[float]:
+    """Await each zero-arg coroutine factory in turn and time it"""
+    timings = []
+    for call in calls:
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def _bench_session_service(service, num_sessions: int, num_events: int) -> Dict[str, Dict[str, float]]:
+    from google.adk.events import Event
+    from google.genai import types
+
+    app_name, user_id = "bench", "bench_user"
+    session_ids = [f"session-{index}" for index in range(num_sessions)]
+
+    create = await _time_async_calls(
+        lambda session_id=session_id: service.create_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        for session_id in session_ids
+    )
+    sessions = [
+        await service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        for session_id in session_ids
+    ]
+
+    def make_event(index: int) -> Event:
+        return Event(
+            author="user" if index % 2 == 0 else "accessible_journey_assistant",
+            invocation_id=f"turn-{index // 2}",
+            content=types.Content(
+                role="user" if index % 2 == 0 else "model",
+                parts=[types.Part(text=f"Find wheelchair accessible cafes near landmark {index}")],
+            ),
+        )
+
+    append = await _time_async_calls(
+        lambda session=session, index=index: service.append_event(session, make_event(index))
+        for index in range(num_events)
+        for session in sessions
+    )
+    get = await _time_async_calls(
+        lambda session_id=session_id: service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        for session_id in session_ids
+    )
+    return {"create": _summary(create), "append_event": _summary(append), "get (full history)": _summary(get)}
+
+
+def bench_sessions(args) -> None:
+    """create / append / get latency: InMemorySessionService vs SqliteSessionService"""
+    from google.adk.sessions import InMemorySessionService
+
+    from sqlite_session_service import SqliteSessionService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "in-memory": InMemorySessionService(),
+            "sqlite": SqliteSessionService(os.path.join(tmp, "sessions.db")),
+        }
+        rows = {}
+        for name, service in services.items():
+            results = asyncio.run(_bench_session_service(service, args.sessions, args.events))
+            rows.update({f"{name}: {op}": row for op, row in results.items()})
+        services["sqlite"].close()
+
+    _print_table(f"Session services ({args.sessions} sessions x {args.events} events)", rows)
+
+
+async def _bench_memory_service(service, num_sessions: int, num_turns: int) -> Dict[str, Dict[str, float]]:
+    from google.adk.events import Event
+    from google.adk.sessions import Session
+    from google.genai import types
+
+    add, search = [], []
+    for index in range(num_sessions):
+        session = Session(id=f"session-{index}", app_name="bench", user_id="bench_user")
+        for turn in range(num_turns):
+            for author, role, text in (
+                ("user", "user", f"Step-free route to museum {index} from station {turn}"),
+                ("accessible_journey_assistant", "model", f"Museum {index} has a ramp at entrance {turn}"),
+            ):
+                session.events.append(Event(
+                    author=author,
+                    invocation_id=f"turn-{turn}",
+                    timestamp=time.time(),
+                    content=types.Content(role=role, parts=[types.Part(text=text)]),
+                ))
+            # The runner saves the session after every turn
+            add += await _time_async_calls([lambda: service.add_session_to_memory(session)])
+        search += await _time_async_calls([lambda: service.search_memory(
+            app_name="bench", user_id="bench_user", query=f"ramp at museum {index}",
+        )])
+    # Recall latency once the whole history is loaded
+    final = await _time_async_calls(
+        lambda index=index: service.search_memory(
+            app_name="bench", user_id="bench_user", query=f"step-free route to museum {index}",
+        )
+        for index in range(50)
+    )
+    return {"add_session (per turn)": _summary(add), "search (growing)": _summary(search), "search (full)": _summary(final)}
+
+
+def bench_memory(args) -> None:
+    """Per-turn ingest and search latency: InMemoryMemoryService vs IndexedMemoryService"""
+    from google.adk.memory import InMemoryMemoryService
+
+    from indexed_memory_service import IndexedMemoryService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "in-memory": InMemoryMemoryService(),
+            "indexed": IndexedMemoryService(os.path.join(tmp, "memory.jsonl")),
+        }
+        rows = {}
+        for name, service in services.items():
+            results = asyncio.run(_bench_memory_service(service, args.sessions, args.turns))
+            rows.update({f"{name}: {op}": row for op, row in results.items()})
+        services["indexed"].close()
+
+    _print_table(f"Memory services ({args.sessions} sessions x {args.turns} turns)", rows)
+
+
+def _synthetic_directions(num_steps: int, points_per_step: int) -> dict:
+    """Directions API response with street-like geometry: straight runs plus GPS jitter"""
+    import numpy as np
+
+    from tools.polyline import encode
+
+    rng = np.random.default_rng(0)
+    lat, lng, steps, overview = 52.5163, 13.3777, [], []
+    for index in range(num_steps):
+        heading = rng.uniform(0, 2 * np.pi)
+        run = np.linspace(0, 1, points_per_step)[:, None] * [np.cos(heading), np.sin(heading)] * 0.002
+        coords = run + [lat, lng] + rng.normal(0, 2e-6, (points_per_step, 2))
+        lat, lng = coords[-1]
+        overview.append(coords)
+        steps.append({
+            "html_instructions": f"Turn <b>left</b> onto <b>Unter den Linden {index}</b>"
+                                 f"<div style=\"font-size:0.9em\">Pass by Cafe {index} (on the right)</div>",
+            "distance": {"text": "210 m", "value": 210},
+            "duration": {"text": "3 mins", "value": 180},
+            "start_location": {"lat": coords[0][0], "lng": coords[0][1]},
+            "end_location": {"lat": coords[-1][0], "lng": coords[-1][1]},
+            "polyline": {"points": encode(coords)},
+            "travel_mode": "WALKING",
+        })
+    leg = {
+        "start_address": "Pariser Platz, 10117 Berlin, Germany",
+        "end_address": "Museumsinsel, 10178 Berlin, Germany",
+        "duration": {"text": f"{num_steps * 3} mins"},
+        "distance": {"text": f"{num_steps * 0.21:.1f} km"},
+        "steps": steps,
+    }
+    route = {
+        "legs": [leg],
+        "overview_polyline": {"points": encode(np.concatenate(overview))},
+        "bounds": {"northeast": {"lat": 52.52, "lng": 13.40}, "southwest": {"lat": 52.51, "lng": 13.37}},
+        "summary": "Unter den Linden",
+    }
+    return {"status": "OK", "routes": [route]}
+
+
+def bench_route_payload(args) -> None:
+    """Route tool result size before/after HTML stripping and polyline simplification"""
+    from history import CHARS_PER_TOKEN
+    from tools.directions import _format_route
+
+    print(f"\n{'steps':>6}{'raw_bytes':>12}{'raw_tokens':>12}{'bytes':>10}{'tokens':>10}{'format_ms':>11}")
+    for num_steps in args.steps:
+        data = _synthetic_directions(num_steps, args.points)
+        leg = data["routes"][0]["legs"][0]
+        # What the tool used to return: HTML instructions and the full overview polyline
+        raw = json.dumps({
+            "steps": [
+                {
+                    "instruction": step["html_instructions"],
+                    "distance": step["distance"]["text"],
+                    "duration": step["duration"]["text"],
+                    "travel_mode": step["travel_mode"],
+                }
+                for step in leg["steps"]
+            ],
+            "polyline": data["routes"][0]["overview_polyline"]["points"],
+        })
+        compact = json.loads(_format_route(data, view="full"))
+        compact = json.dumps({"steps": compact["steps"], "polyline": compact["polyline"]})
+        timings = _time_calls(lambda: _format_route(data, view="full"), 20)
+        print(f"{num_steps:>6}{len(raw):>12}{len(raw) // CHARS_PER_TOKEN:>12}{len(compact):>10}"
+              f"{len(compact) // CHARS_PER_TOKEN:>10}{statistics.fmean(timings) * 1e3:>11.2f}")
+
+
+def bench_tool_payload(args) -> None:
+    """Tool result size per view: json.dumps as before vs full/llm/map compact encodings"""
+    from history import CHARS_PER_TOKEN
+    from tools.directions import _format_route
+    from tools.encoding import encode_result
+
+    places = [
+        {
+            "name": f"Café Einstein {index}",
+            "address": f"Unter den Linden {index}, 10117 Berlin, Deutschland",
+            "rating": 4.4,
+            "user_ratings": 1200 + index,
+            "location": {"latitude": 52.5163 + index * 0.0012345678, "longitude": 13.3777 + index * 0.0009876543},
+            "types": ["cafe", "coffee_shop", "restaurant", "food", "point_of_interest", "establishment"],
+            "google_maps_uri": f"https://maps.google.com/?cid=1234567890123456{index}",
+        }
+        for index in range(5)
+    ]
+    results = {"places": {"places": places, "query": "wheelchair accessible cafes in Berlin"}}
+    for num_steps in args.steps:
+        results[f"route, {num_steps} steps"] = json.loads(_format_route(_synthetic_directions(num_steps, args.points), view="full"))
+
+    print(f"\n{'result':<20}{'view':>8}{'bytes':>10}{'tokens':>10}{'saved':>8}")
+    for name, result in results.items():
+        kind = "places" if name == "places" else "route"
+        baseline = len(json.dumps(result))
+        print(f"{name:<20}{'before':>8}{baseline:>10}{baseline // CHARS_PER_TOKEN:>10}{'':>8}")
+        for view in ("full", "llm"):
+            size = len(encode_result(result, kind, view))
+            print(f"{'':<20}{view:>8}{size:>10}{size // CHARS_PER_TOKEN:>10}{1 - size / baseline:>8.0%}")
+
+
+def bench_turn(args) -> None:
+    """Wall time of one model turn with several slow sync tool calls: FunctionTool vs ConcurrentFunctionTool"""
+    import types as pytypes
+
+    from google.adk.tools import FunctionTool
+
+    from tools.parallel import ConcurrentFunctionTool
+
+    def get_accessible_route(origin: str, destination: str) -> str:
+        """Stand-in for a route call waiting on the Directions API"""
+        time.sleep(args.latency_ms / 1000)
+        return json.dumps({"origin": origin, "destination": destination})
+
+    async def turn(tool) -> List[str]:
+        # ADK runs each function call of a response as its own task and gathers them in order
+        context = pytypes.SimpleNamespace(invocation_id="bench")
+        calls = [{"origin": "Pariser Platz", "destination": f"Cafe {index}"} for index in range(args.calls)]
+        return await asyncio.gather(*(tool.run_async(args=call, tool_context=context) for call in calls))
+
+    rows = {}
+    for name, tool in (
+        ("FunctionTool (on the event loop)", FunctionTool(func=get_accessible_route)),
+        ("ConcurrentFunctionTool", ConcurrentFunctionTool(func=get_accessible_route)),
+    ):
+        results = asyncio.run(turn(tool))
+        assert [json.loads(result)["destination"] for result in results] == [f"Cafe {i}" for i in range(args.calls)]
+        rows[name] = _summary(_time_calls(lambda: asyncio.run(turn(tool)), args.repeat))
+    _print_table(f"Turn with {args.calls} calls of {args.latency_ms} ms each (microseconds)", rows)
+
+
+def _stub_maps_server(base_ms: float, slow_ms: float, slow_fraction: float):
+    """Local HTTP server: /ok answers after base_ms (slow_ms for a random slow_fraction), /down with 503"""
+    import http.server
+    import random
+    import threading
+
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/down"):
+                status = 503
+            else:
+                with rng_lock:
+                    slow = rng.random() < slow_fraction
+                time.sleep((slow_ms if slow else base_ms) / 1000)
+                status = 200
+            body = b"{}"
+            try:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The losing request of a hedged async call is aborted
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_tail(args) -> None:
+    """Maps call latency against a stub server: hedged vs unhedged tail, and fast-fail with the breaker open"""
+    from tools.circuit_breaker import CircuitBreaker, CircuitOpenError
+    from tools.maps_client import EndpointStats, MapsClient
+
+    server = _stub_maps_server(args.base_ms, args.slow_ms, args.slow_fraction)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rows = {}
+    for name, hedge in (("unhedged", False), ("hedged after p95", True)):
+        client = MapsClient(hedge=hedge, stats={})
+        for _ in range(args.warmup):
+            client.get(f"{url}/ok", endpoint="ok")
+        rows[name] = _summary(_time_calls(lambda: client.get(f"{url}/ok", endpoint="ok"), args.requests))
+        summary = client.stats()["ok"]
+        if hedge:
+            name += f" ({summary['hedges']} hedges, {summary['hedge_wins']} won)"
+            rows[name] = rows.pop("hedged after p95")
+
+    def call_down(client):
+        try:
+            client.get(f"{url}/down", endpoint="down")
+        except CircuitOpenError:
+            pass
+
+    # Breaker that never opens: every call waits out its retries
+    never_opens = EndpointStats()
+    never_opens.breaker = CircuitBreaker(failure_threshold=10 ** 9)
+    client = MapsClient(retry_backoff=0.05, stats={"down": never_opens})
+    rows["endpoint down, no breaker"] = _summary(_time_calls(lambda: call_down(client), 20))
+    client = MapsClient(retry_backoff=0.05, stats={})
+    rows["endpoint down, breaker open"] = _summary(_time_calls(lambda: call_down(client), 20))
+    server.shutdown()
+    _print_table(
+        f"Maps call, {args.base_ms:g} ms with {args.slow_fraction:.0%} at {args.slow_ms:g} ms (microseconds)", rows,
+    )
+
+
+def _drain_bucket(directory: str, rate: float, calls: int, results) -> None:
+    """Worker process for bench_rate_limit: take `calls` tokens, report queue waits"""
+    from tools.rate_limiter import RateLimiter
+
+    bucket = RateLimiter({"places:searchText": rate}, directory or None, max_wait=60).bucket(
+        "places:searchText", "bench-key",
+    )
+    results.put([bucket.acquire() for _ in range(calls)])
+
+
+def bench_rate_limit(args) -> None:
+    """Throughput of several processes sharing one API key: per-process buckets vs one file-shared bucket"""
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    print(f"\n{args.processes} processes x {args.calls} calls, quota {args.rate:g}/s per key")
+    print(f"{'buckets':<14}{'seconds':>10}{'calls/s':>10}{'queued':>10}{'p95_wait_ms':>14}{'max_wait_ms':>14}")
+    for name in ("per process", "shared file"):
+        with tempfile.TemporaryDirectory() as directory:
+            results = context.Queue()
+            workers = [
+                context.Process(
+                    target=_drain_bucket,
+                    args=(directory if name == "shared file" else "", args.rate, args.calls, results),
+                )
+                for _ in range(args.processes)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            waits = sorted(wait for _ in workers for wait in results.get())
+            elapsed = time.perf_counter() - started
+            for worker in workers:
+                worker.join()
+        queued = sum(wait > 0 for wait in waits)
+        print(f"{name:<14}{elapsed:>10.2f}{len(waits) / elapsed:>10.1f}{queued:>10}"
+              f"{waits[int(len(waits) * 0.95)] * 1000:>14.1f}{waits[-1] * 1000:>14.1f}")
+
+
+def bench_hazards(args) -> None:
+    """Hazard detection throughput: per-term substring loop vs compiled single-pass engine"""
+    import random
+
+    from tools.hazards import LEXICON, HazardEngine
+
+    templates = [
+        "Head north on Unter den Linden toward Pariser Platz",
+        "Turn left to stay on Friedrichstraße. Destination will be on the right",
+        "Take the stairs down to the underpass",
+        "Nehmen Sie die Rolltreppe zur Unterführung",
+        "Continuez tout droit sur les pavés de la place",
+        "Спустіться сходами до підземного переходу",
+        "Slight right onto the steep cobblestone lane",
+        "Walk through the park on the gravel path",
+    ]
+    rng = random.Random(0)
+    instructions = [f"{rng.choice(templates)} {index}" for index in range(args.instructions)]
+    terms = [
+        (stem, hazard_type)
+        for hazards in LEXICON.values()
+        for hazard_type, stems in hazards.items()
+        for stem in stems
+    ]
+
+    def substring_loop():
+        found = []
+        for step, text in enumerate(instructions):
+            lowered = text.lower()
+            for stem, hazard_type in terms:
+                if stem in lowered:
+                    found.append((step, hazard_type))
+        return found
+
+    engine = HazardEngine()
+    rows = {
+        "substring loop (all lexicon terms)": _summary(_time_calls(substring_loop, args.repeat)),
+        "compiled engine": _summary(_time_calls(lambda: engine.scan(instructions), args.repeat)),
+    }
+    _print_table(f"Hazard scan of {args.instructions} instructions ({len(terms)} terms, microseconds per batch)", rows)
+
+
+def bench_slope(args) -> None:
+    """Slope analysis latency per route against a synthetic memory-mapped elevation tile"""
+    import numpy as np
+
+    from tools.elevation import ElevationGrid, analyze_slope, tile_name
+    from tools.polyline import step_coordinates
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Hills around Berlin: ~60 m of relief, up to ~10% gradients
+        side = 1201
+        rows, cols = np.mgrid[0:side, 0:side] / (side - 1)
+        heights = 80 + 30 * np.sin(rows * 400) + 30 * np.cos(cols * 250)
+        heights.astype(">i2").tofile(os.path.join(directory, tile_name(52, 13)))
+
+        rows = {}
+        for num_steps in args.steps:
+            steps = _synthetic_directions(num_steps, args.points)["routes"][0]["legs"][0]["steps"]
+            step_coords = [step_coordinates(step) for step in steps]
+            grid = ElevationGrid(directory)
+            slope = analyze_slope(step_coords, grid)
+            label = f"{num_steps} steps, {len(slope['steep_segments'])} steep segments"
+            rows[label] = _summary(_time_calls(lambda: analyze_slope(step_coords, grid), args.iterations))
+    _print_table("Slope analysis per route (microseconds)", rows)
+
+
+def _synthetic_osm(path: str, size: int) -> None:
+    """OSM extract of a size x size street grid (~50 m blocks) with some steps and cobbles"""
+    import random
+
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as extract:
+        extract.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for row in range(size):
+            for col in range(size):
+                extract.write(
+                    f'  <node id="{row * size + col + 1}" lat="{52.50 + row * 0.00045:.6f}" '
+                    f'lon="{13.35 + col * 0.00074:.6f}"/>\n'
+                )
+        way_id = 1
+        for row in range(size):
+            for col in range(size - 1):
+                extract.write(f'  <way id="{way_id}"><nd ref="{row * size + col + 1}"/><nd ref="{row * size + col + 2}"/>')
+                extract.write(f'<tag k="highway" v="residential"/><tag k="name" v="Straße {row}"/>')
+                if rng.random() < 0.1:
+                    extract.write('<tag k="surface" v="sett"/>')
+                extract.write("</way>\n")
+                way_id += 1
+        for col in range(size):
+            for row in range(size - 1):
+                highway = "steps" if rng.random() < 0.15 else "footway"
+                extract.write(f'  <way id="{way_id}"><nd ref="{row * size + col + 1}"/><nd ref="{(row + 1) * size + col + 1}"/>')
+                extract.write(f'<tag k="highway" v="{highway}"/></way>\n')
+                way_id += 1
+        extract.write("</osm>\n")
+
+
+def bench_router(args) -> None:
+    """Offline walking router: graph build time and A* query latency on a synthetic grid"""
+    import random
+
+    from tools.walk_graph import WalkGraph
+
+    with tempfile.TemporaryDirectory() as directory:
+        extract = os.path.join(directory, "grid.osm")
+        _synthetic_osm(extract, args.grid)
+        started = time.perf_counter()
+        graph = WalkGraph.from_osm(extract)
+        build_ms = (time.perf_counter() - started) * 1000
+        graph.save(os.path.join(directory, "grid.npz"))
+        started = time.perf_counter()
+        WalkGraph.load(os.path.join(directory, "grid.npz"))
+        load_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    pairs = [
+        (
+            (float(graph.lat[rng.randrange(graph.num_nodes)]), float(graph.lng[rng.randrange(graph.num_nodes)])),
+            (float(graph.lat[rng.randrange(graph.num_nodes)]), float(graph.lng[rng.randrange(graph.num_nodes)])),
+        )
+        for _ in range(args.queries)
+    ]
+    rows = {}
+    for avoid_stairs in (False, True):
+        graph.route(*pairs[0], avoid_stairs=avoid_stairs)  # Warm the per-profile cost lists
+        queries = iter(pairs * args.repeat)
+        rows[f"A* avoid_stairs={avoid_stairs}"] = _summary(_time_calls(
+            lambda: graph.route(*next(queries), avoid_stairs=avoid_stairs), len(pairs) * args.repeat,
+        ))
+    print(f"Graph: {graph.num_nodes} nodes, {graph.num_edges} edges; "
+          f"built from XML in {build_ms:.0f} ms, loaded from .npz in {load_ms:.1f} ms")
+    _print_table(f"Route queries on a {args.grid} x {args.grid} grid (microseconds)", rows)
+
+
+def _synthetic_conversation(num_turns: int):
+    """User question, route tool call, bulky route response and answer per turn"""
+    from google.genai import types
+
+    steps = [
+        {
+            "instruction": f"Head <b>north</b> on Unter den Linden toward Pariser Platz {step}",
+            "distance": "120 m",
+            "duration": "2 mins",
+            "travel_mode": "WALKING",
+        }
+        for step in range(25)
+    ]
+    contents = []
+    for turn in range(num_turns):
+        contents += [
+            types.Content(role="user", parts=[types.Part(text=f"How do I get to accessible cafe number {turn}?")]),
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                id=f"call-{turn}", name="get_accessible_route",
+                args={"origin": "Brandenburg Gate", "destination": f"Cafe {turn}, Berlin"},
+            ))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                id=f"call-{turn}", name="get_accessible_route",
+                response={"status": "success", "steps": steps, "polyline": "a~l~Fjk~uOwHJy@P" * 40},
+            ))]),
+            types.Content(role="model", parts=[types.Part(text="Here is a step-free route. " * 20)]),
+        ]
+    return contents
+
+
+def bench_history(args) -> None:
+    """Estimated prompt tokens per model call with and without history windowing"""
+    from history import estimate_tokens, window_contents
+
+    print(f"\n{'turns':>6}{'full_tokens':>14}{'windowed':>12}{'window_us':>12}")
+    for num_turns in args.turns:
+        contents = _synthetic_conversation(num_turns)
+        timings = _time_calls(lambda: window_contents(contents), 20)
+        windowed = window_contents(contents)
+        print(f"{num_turns:>6}{estimate_tokens(contents):>14}{estimate_tokens(windowed):>12}"
+              f"{statistics.fmean(timings) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent runtime micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    registry_parser = subparsers.add_parser("registry", help=bench_registry.__doc__)
+    registry_parser.add_argument("--iterations", type=int, default=1000)
+    registry_parser.add_argument(
+        "--agents", nargs="+",
+        default=["accessible_journey_assistant", "accessibility_voice_agent", "maps_explorer"],
+    )
+    registry_parser.set_defaults(func=bench_registry)
+
+    startup_parser = subparsers.add_parser("startup", help=bench_startup.__doc__)
+    startup_parser.add_argument(
+        "modules", nargs="*",
+        default=["maps_agent", "runner", "tools.directions", "agent", "voice_server"],
+    )
+    startup_parser.add_argument("--repeat", type=int, default=3)
+    startup_parser.add_argument("--top", type=int, default=15)
+    startup_parser.add_argument("--budget-ms", type=float, default=0,
+                                help="Exit non-zero if any module's imports exceed this")
+    startup_parser.set_defaults(func=bench_startup)
+
+    isolation_parser = subparsers.add_parser("isolation", help=bench_isolation.__doc__)
+    isolation_parser.add_argument("--requests", type=int, default=20)
+    isolation_parser.add_argument("--query", default=None,
+                                  help="Run a real agent turn instead of a noop (needs credentials)")
+    isolation_parser.set_defaults(func=bench_isolation)
+
+    sessions_parser = subparsers.add_parser("sessions", help=bench_sessions.__doc__)
+    sessions_parser.add_argument("--sessions", type=int, default=200)
+    sessions_parser.add_argument("--events", type=int, default=20)
+    sessions_parser.set_defaults(func=bench_sessions)
+
+    memory_parser = subparsers.add_parser("memory", help=bench_memory.__doc__)
+    memory_parser.add_argument("--sessions", type=int, default=300)
+    memory_parser.add_argument("--turns", type=int, default=10)
+    memory_parser.set_defaults(func=bench_memory)
+
+    payload_parser = subparsers.add_parser("route-payload", help=bench_route_payload.__doc__)
+    payload_parser.add_argument("--steps", type=int, nargs="+", default=[5, 15, 40])
+    payload_parser.add_argument("--points", type=int, default=30, help="Polyline points per step")
+    payload_parser.set_defaults(func=bench_route_payload)
+
+    tool_payload_parser = subparsers.add_parser("tool-payload", help=bench_tool_payload.__doc__)
+    tool_payload_parser.add_argument("--steps", type=int, nargs="+", default=[5, 15, 40])
+    tool_payload_parser.add_argument("--points", type=int, default=30, help="Polyline points per step")
+    tool_payload_parser.set_defaults(func=bench_tool_payload)
+
+    turn_parser = subparsers.add_parser("turn", help=bench_turn.__doc__)
+    turn_parser.add_argument("--calls", type=int, default=3)
+    turn_parser.add_argument("--latency-ms", type=int, default=200)
+    turn_parser.add_argument("--repeat", type=int, default=5)
+    turn_parser.set_defaults(func=bench_turn)
+
+    tail_parser = subparsers.add_parser("tail", help=bench_tail.__doc__)
+    tail_parser.add_argument("--requests", type=int, default=300)
+    tail_parser.add_argument("--warmup", type=int, default=50)
+    tail_parser.add_argument("--base-ms", type=float, default=20)
+    tail_parser.add_argument("--slow-ms", type=float, default=400)
+    tail_parser.add_argument("--slow-fraction", type=float, default=0.03)
+    tail_parser.set_defaults(func=bench_tail)
+
+    rate_limit_parser = subparsers.add_parser("rate-limit", help=bench_rate_limit.__doc__)
+    rate_limit_parser.add_argument("--processes", type=int, default=4)
+    rate_limit_parser.add_argument("--calls", type=int, default=100)
+    rate_limit_parser.add_argument("--rate", type=float, default=50)
+    rate_limit_parser.set_defaults(func=bench_rate_limit)
+
+    hazards_parser = subparsers.add_parser("hazards", help=bench_hazards.__doc__)
+    hazards_parser.add_argument("--instructions", type=int, default=100000)
+    hazards_parser.add_argument("--repeat", type=int, default=5)
+    hazards_parser.set_defaults(func=bench_hazards)
+
+    slope_parser = subparsers.add_parser("slope", help=bench_slope.__doc__)
+    slope_parser.add_argument("--steps", type=int, nargs="+", default=[5, 15, 40])
+    slope_parser.add_argument("--points", type=int, default=30, help="Polyline points per step")
+    slope_parser.add_argument("--iterations", type=int, default=200)
+    slope_parser.set_defaults(func=bench_slope)
+
+    router_parser = subparsers.add_parser("router", help=bench_router.__doc__)
+    router_parser.add_argument("--grid", type=int, default=150, help="Streets per side")
+    router_parser.add_argument("--queries", type=int, default=50)
+    router_parser.add_argument("--repeat", type=int, default=1)
+    router_parser.set_defaults(func=bench_router)
+
+    history_parser = subparsers.add_parser("history", help=bench_history.__doc__)
+    history_parser.add_argument("--turns", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    history_parser.set_defaults(func=bench_history)
+
+    args = parser.parse_args()
+    args.func(args)
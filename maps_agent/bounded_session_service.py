@@ -0,0 +1,249 @@
+"""
+Bounded session service wrapper with idle TTL and LRU eviction
+Wraps any ADK session service (InMemorySessionService, SqliteSessionService)
+so that sessions created by one-off chats don't accumulate forever.
+
+The request path only does O(1) bookkeeping (recording last access).
+Eviction and history trimming run on a background sweeper task that
+starts on first use.
+
+Sessions with a turn in progress (see `in_use`) are never evicted; they
+are reconsidered on the next sweep.
+
+Evicting a session always drops this process's bookkeeping for it. The
+stored session is only deleted when `delete_evicted` is set, which by
+default is the case for InMemorySessionService alone: a durable store
+keeps evicted sessions, so they can be resumed later.
+"""
+import asyncio
+import collections
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str]
+
+
+class BoundedSessionService(BaseSessionService):
+    """
+    Session service wrapper enforcing idle TTL, max live sessions and
+    max stored events per session.
+
+    Args:
+        inner: Session service that actually stores sessions
+        idle_ttl: Seconds without access before a session is evicted
+        max_sessions: Max live sessions; least recently used are evicted first
+        max_events: Max events kept per session (older turns are trimmed)
+        sweep_interval: Seconds between sweeper runs
+        delete_evicted: Also delete evicted sessions from `inner` (default:
+            only if it is an InMemorySessionService)
+        in_use: Called with (app_name, user_id, session_id); True while the
+            session has a turn running, which keeps it from being evicted
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        idle_ttl: float = 3600.0,
+        max_sessions: int = 10000,
+        max_events: int = 200,
+        sweep_interval: float = 30.0,
+        delete_evicted: Optional[bool] = None,
+        in_use: Optional[Callable[[SessionKey], bool]] = None,
+    ):
+        self.inner = inner
+        if delete_evicted is None:
+            delete_evicted = isinstance(inner, InMemorySessionService)
+        self.delete_evicted = delete_evicted
+        self.in_use = in_use
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.sweep_interval = sweep_interval
+
+        # Least recently used first: key -> last access (monotonic seconds)
+        self._last_access: "collections.OrderedDict[SessionKey, float]" = collections.OrderedDict()
+        # Events appended per session, to find sessions needing a trim
+        self._event_counts: Dict[SessionKey, int] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.counters = {
+            "evicted_idle": 0,
+            "evicted_capacity": 0,
+            "skipped_in_use": 0,
+            "trimmed_events": 0,
+            "sweeps": 0,
+        }
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _touch(self, key: SessionKey) -> None:
+        self._last_access[key] = time.monotonic()
+        self._last_access.move_to_end(key)
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    def _in_use(self, key: SessionKey) -> bool:
+        """Whether the session has a turn running (never evicted then)"""
+        if self.in_use is None or not self.in_use(key):
+            return False
+        self.counters["skipped_in_use"] += 1
+        return True
+
+    def _forget(self, key: SessionKey) -> None:
+        self._last_access.pop(key, None)
+        self._event_counts.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Live session count plus eviction counters"""
+        return {"live_sessions": len(self._last_access), **self.counters}
+
+    async def close(self) -> None:
+        """Stop the background sweeper"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    # -- sweeper -------------------------------------------------------------
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Session sweep failed: {e}")
+
+    async def sweep(self) -> None:
+        """Evict idle and over-capacity sessions and trim long histories"""
+        self.counters["sweeps"] += 1
+        now = time.monotonic()
+
+        expired, skip = [], set()
+        for key, last_access in self._last_access.items():
+            if now - last_access < self.idle_ttl:
+                break  # Ordered by access time - the rest are newer
+            skip.add(key)
+            if not self._in_use(key):
+                expired.append(key)
+
+        lru = []
+        overflow = len(self._last_access) - len(expired) - self.max_sessions
+        for key in self._last_access:
+            if len(lru) >= overflow:
+                break
+            if key not in skip and not self._in_use(key):
+                lru.append(key)
+
+        for key in expired:
+            await self._evict(key)
+            self.counters["evicted_idle"] += 1
+        for key in lru:
+            await self._evict(key)
+            self.counters["evicted_capacity"] += 1
+
+        for key, count in list(self._event_counts.items()):
+            if count > self.max_events:
+                await self._trim(key)
+
+    async def _evict(self, key: SessionKey) -> None:
+        self._forget(key)
+        if self.delete_evicted:
+            app_name, user_id, session_id = key
+            await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def _trim(self, key: SessionKey) -> None:
+        """Drop the oldest turns so at most max_events remain"""
+        app_name, user_id, session_id = key
+        if hasattr(self.inner, "trim_events"):
+            # Blocking database work: kept off the event loop
+            removed = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                self.inner.trim_events, app_name=app_name, user_id=user_id, session_id=session_id, keep=self.max_events,
+            ))
+        elif isinstance(self.inner, InMemorySessionService):
+            stored = self.inner.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+            removed = 0
+            if stored is not None:
+                removed = turn_boundary([event.author for event in stored.events], self.max_events)
+                del stored.events[:removed]
+        else:
+            return
+        self.counters["trimmed_events"] += removed
+        self._event_counts[key] = self._event_counts.get(key, 0) - removed
+
+    # -- BaseSessionService --------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self.inner.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._event_counts[key] = 0
+        self._touch(key)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = await self.inner.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        key = (app_name, user_id, session_id)
+        if session is None:
+            self._forget(key)
+            return None
+
+        self._touch(key)
+        self._event_counts.setdefault(key, len(session.events))
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._forget((app_name, user_id, session_id))
+        await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await self.inner.append_event(session, event)
+        if not event.partial:
+            key = (session.app_name, session.user_id, session.id)
+            self._event_counts[key] = self._event_counts.get(key, 0) + 1
+            self._touch(key)
+        return event
+
+
+def turn_boundary(authors: List[str], keep: int) -> int:
+    """
+    Number of leading events to drop so that at most `keep` remain.
+    The cut is moved forward to a user message so a tool call is never
+    separated from its response; if there is none, nothing is dropped.
+    """
+    if len(authors) <= keep:
+        return 0
+    cut = len(authors) - keep
+    while cut < len(authors) and authors[cut] != "user":
+        cut += 1
+    return cut if cut < len(authors) else 0
@@ -0,0 +1,98 @@
+"""
+Compact, JSON-safe schema for ADK events streamed to Node.js
+One ADK Event can carry several parts, so it maps to zero or more messages:
+
+    {"type": "text", "text": "...", "author": "...", "partial": true}
+    {"type": "tool_call", "id": "...", "name": "...", "args": {...}}
+    {"type": "tool_result", "id": "...", "name": "...", "response": {...}}
+    {"type": "grounding", "sources": [{"title": "...", "uri": "..."}], "queries": [...]}
+    {"type": "error", "code": "...", "message": "..."}
+
+The stream ends with {"type": "final", "text": "..."} emitted by the runner.
+"""
+import json
+from typing import Any, Dict, List
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so tool payloads never break serialization"""
+    try:
+        return json.loads(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _grounding_message(metadata: Any) -> Dict[str, Any]:
+    """Reduce GroundingMetadata to source titles/URIs and search queries"""
+    sources = []
+    for chunk in getattr(metadata, "grounding_chunks", None) or []:
+        # Chunks carry exactly one of web / maps / retrieved_context
+        for kind in ("maps", "web", "retrieved_context"):
+            source = getattr(chunk, kind, None)
+            if source is not None:
+                entry = {"kind": kind, "title": getattr(source, "title", None), "uri": getattr(source, "uri", None)}
+                place_id = getattr(source, "place_id", None)
+                if place_id:
+                    entry["place_id"] = place_id
+                sources.append(entry)
+                break
+
+    return {
+        "type": "grounding",
+        "sources": sources,
+        "queries": list(getattr(metadata, "web_search_queries", None) or []),
+    }
+
+
+def serialize_event(event: Any, include_text: bool = True) -> List[Dict[str, Any]]:
+    """
+    Convert one ADK Event into compact stream messages.
+
+    Args:
+        event: ADK Event yielded by Runner.run_async
+        include_text: Emit text parts (False for aggregated events whose
+            text was already streamed as partial deltas)
+
+    Returns:
+        List of JSON-serializable message dicts, possibly empty
+    """
+    messages: List[Dict[str, Any]] = []
+    author = getattr(event, "author", None)
+    partial = bool(getattr(event, "partial", False))
+
+    content = getattr(event, "content", None)
+    for part in (getattr(content, "parts", None) or []):
+        if include_text and getattr(part, "text", None) and not getattr(part, "thought", False):
+            messages.append({"type": "text", "text": part.text, "author": author, "partial": partial})
+
+        function_call = getattr(part, "function_call", None)
+        if function_call is not None:
+            messages.append({
+                "type": "tool_call",
+                "id": function_call.id,
+                "name": function_call.name,
+                "args": _json_safe(function_call.args or {}),
+            })
+
+        function_response = getattr(part, "function_response", None)
+        if function_response is not None:
+            messages.append({
+                "type": "tool_result",
+                "id": function_response.id,
+                "name": function_response.name,
+                "response": _json_safe(function_response.response or {}),
+            })
+
+    grounding_metadata = getattr(event, "grounding_metadata", None)
+    if grounding_metadata is not None and not partial:
+        messages.append(_grounding_message(grounding_metadata))
+
+    error_message = getattr(event, "error_message", None)
+    if error_message:
+        messages.append({
+            "type": "error",
+            "code": getattr(event, "error_code", None),
+            "message": error_message,
+        })
+
+    return messages
@@ -0,0 +1,125 @@
+"""
+Token-budgeted conversation history windowing
+Used as a before_model_callback so each model call carries a bounded
+history instead of the whole session:
+
+- the last `keep_turns` turns are sent verbatim
+- older turns keep their text and tool call/response pairing, but tool
+  payloads (grounding results, route steps) are collapsed into short summaries
+- if the estimate is still over `token_budget`, the oldest turns are dropped
+
+A turn starts at a user message carrying text; function responses are
+also sent with role "user" but belong to the turn that called them.
+"""
+import json
+import os
+from typing import Any, List, Optional
+
+from google.genai import types
+
+# Defaults, overridable from the environment
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "200"))
+
+# Rough chars-per-token ratio for Gemini on mixed English/JSON text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Cheap token estimate from text and serialized tool payloads"""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def _starts_turn(content: types.Content) -> bool:
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Group contents into turns, each starting at a user text message"""
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if not turns or _starts_turn(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _shorten(value: Any, limit: int) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _compact_content(content: types.Content, summary_chars: int) -> types.Content:
+    """Copy of a content with tool payloads replaced by short summaries"""
+    parts = []
+    for part in content.parts or []:
+        if part.function_response:
+            response = part.function_response
+            parts.append(types.Part(function_response=types.FunctionResponse(
+                id=response.id,
+                name=response.name,
+                response={"summary": _shorten(response.response or {}, summary_chars)},
+            )))
+        elif part.function_call:
+            call = part.function_call
+            args = {key: _shorten(value, summary_chars) for key, value in (call.args or {}).items()}
+            parts.append(types.Part(function_call=types.FunctionCall(id=call.id, name=call.name, args=args)))
+        elif part.text:
+            parts.append(types.Part(text=_shorten(part.text, summary_chars * 4)))
+        elif part.inline_data or part.file_data:
+            parts.append(types.Part(text="[attachment omitted]"))
+        else:
+            parts.append(part)
+    return types.Content(role=content.role, parts=parts)
+
+
+def window_contents(
+    contents: List[types.Content],
+    keep_turns: int = HISTORY_KEEP_TURNS,
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    summary_chars: int = HISTORY_SUMMARY_CHARS,
+) -> List[types.Content]:
+    """
+    Shape a request history to the window and token budget.
+
+    Args:
+        contents: Full history as built by ADK for this model call
+        keep_turns: Most recent turns sent verbatim
+        token_budget: Estimated token ceiling for the whole history
+        summary_chars: Max characters kept per collapsed tool payload
+
+    Returns:
+        New contents list; the latest turn is never dropped
+    """
+    turns = split_turns(contents)
+
+    # Walk newest to oldest so turns past the budget are never even compacted
+    kept: List[List[types.Content]] = []
+    total = 0
+    for age, turn in enumerate(reversed(turns)):
+        if age >= keep_turns:
+            turn = [_compact_content(content, summary_chars) for content in turn]
+        tokens = estimate_tokens(turn)
+        if kept and total + tokens > token_budget:
+            break
+        kept.append(turn)
+        total += tokens
+
+    return [content for turn in reversed(kept) for content in turn]
+
+
+def history_window_callback(callback_context, llm_request) -> Optional[Any]:
+    """before_model_callback applying window_contents to every model call"""
+    llm_request.contents = window_contents(llm_request.contents)
+    # None lets the model call proceed with the shaped request
+    return None
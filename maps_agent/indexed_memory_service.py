@@ -0,0 +1,256 @@
+"""
+Indexed, incremental memory service for Google ADK
+Replacement for InMemoryMemoryService, which re-copies the whole session on
+every add_session_to_memory call and answers searches with a linear scan.
+
+- Ingestion is incremental: a per-session watermark (last event timestamp)
+  means each call only indexes events added since the previous call.
+- Each user has an inverted index (term -> {doc: term frequency}) scored
+  with BM25, so search cost depends on the query terms, not on history size.
+- Ingested documents are appended to a JSON-lines file and replayed on
+  startup, so memory survives restarts. Lines other processes (daemon
+  workers, zygote children) append are read in before every add and
+  search, so they all see the same memory. Documents carry their event id,
+  so one indexed twice (two processes ingesting the same session) counts once.
+
+Without fcntl (Windows) the file is still shared, but concurrent appends
+from several processes aren't serialized.
+"""
+import json
+import math
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends aren't locked across processes
+    fcntl = None
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+from google.genai import types
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (works for Latin and Cyrillic text alike)"""
+    return [token for token in _WORD.findall(text.lower()) if len(token) > 1]
+
+
+def format_timestamp(timestamp: float) -> str:
+    """ISO 8601 local time of a memory entry, as InMemoryMemoryService reports it"""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class _UserIndex:
+    """BM25 inverted index over one user's remembered messages"""
+
+    def __init__(self):
+        self.docs: List[dict] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_length = 0
+
+    def add(self, doc: dict) -> None:
+        doc_id = len(self.docs)
+        tokens = tokenize(doc["text"])
+        self.docs.append(doc)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+
+        term_counts: Dict[str, int] = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+        for term, count in term_counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, dict]]:
+        num_docs = len(self.docs)
+        if num_docs == 0:
+            return []
+        avg_length = self.total_length / num_docs
+
+        # Rarest (highest idf) terms first: they pick the candidates. Once
+        # there are enough, a term with more postings than candidates only
+        # re-ranks them, so common words like "route" don't turn every
+        # search into a scan of the user's whole history.
+        terms = sorted(
+            (postings for postings in map(self.postings.get, set(tokenize(query))) if postings),
+            key=len,
+        )
+        scores: Dict[int, float] = {}
+        for postings in terms:
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(scores) >= limit and len(postings) > len(scores):
+                matches = [(doc_id, postings[doc_id]) for doc_id in scores if doc_id in postings]
+            else:
+                matches = postings.items()
+            for doc_id, tf in matches:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score, self.docs[doc_id]) for doc_id, score in best]
+
+
+class IndexedMemoryService(BaseMemoryService):
+    """
+    Memory service with incremental ingestion and per-user BM25 search.
+
+    Args:
+        path: Optional JSON-lines file to persist memories to
+        max_results: Max memories returned per search
+    """
+
+    def __init__(self, path: Optional[str] = None, max_results: int = 10):
+        self.path = path
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str], _UserIndex] = {}
+        # (app_name, user_id, session_id) -> timestamp of last ingested event
+        self._watermarks: Dict[Tuple[str, str, str], float] = {}
+        # Keys of the documents already indexed
+        self._doc_keys: set = set()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        # Bytes of the persisted log already indexed
+        self._offset = 0
+
+        if path:
+            with self._lock:
+                self._sync()
+
+    def _file(self) -> Optional[int]:
+        """Descriptor of the persisted log, reopened after a fork (lock held)"""
+        if not self.path:
+            return None
+        if self._pid != os.getpid():
+            if self._fd is not None:
+                # Inherited over fork; the parent's own descriptor keeps its lock
+                os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _tail(self, fd: int) -> None:
+        """Index the complete lines appended to the log since the last read (lock held)"""
+        size = os.fstat(fd).st_size
+        if size <= self._offset:
+            return
+        data = os.pread(fd, size - self._offset, self._offset)
+        # A line without its newline is still being written
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8").splitlines():
+            if line.strip():
+                self._index_doc(json.loads(line))
+        self._offset += end
+
+    def _sync(self, lines: Optional[List[str]] = None) -> None:
+        """Catch up with the log, then append lines to it (lock held)"""
+        fd = self._file()
+        if fd is None:
+            return
+        if fcntl is not None:
+            # Exclusive while appending, so no other line lands between tail and write
+            fcntl.flock(fd, fcntl.LOCK_EX if lines else fcntl.LOCK_SH)
+        try:
+            self._tail(fd)
+            if lines:
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                os.write(fd, data)
+                self._offset += len(data)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _index_doc(self, doc: dict) -> bool:
+        """Add one document to its user index and advance the watermark; False if already indexed (lock held)"""
+        # Lines written before documents had ids fall back to their timestamp and author
+        doc_key = (doc["app_name"], doc["user_id"], doc["session_id"],
+                   doc.get("id") or (doc["timestamp"], doc["author"]))
+        if doc_key in self._doc_keys:
+            return False
+        self._doc_keys.add(doc_key)
+        self._indexes.setdefault((doc["app_name"], doc["user_id"]), _UserIndex()).add(doc)
+        key = (doc["app_name"], doc["user_id"], doc["session_id"])
+        self._watermarks[key] = max(self._watermarks.get(key, 0.0), doc["timestamp"])
+        return True
+
+    def refresh(self) -> None:
+        """Index what other processes appended since the last add or search"""
+        with self._lock:
+            self._sync()
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        key = (session.app_name, session.user_id, session.id)
+
+        with self._lock:
+            # Another process may have ingested this session already
+            self._sync()
+            watermark = self._watermarks.get(key, 0.0)
+
+            # Events are in time order: walk back only as far as the watermark
+            new_events = []
+            for event in reversed(session.events):
+                if event.timestamp <= watermark:
+                    break
+                new_events.append(event)
+
+            lines = []
+            for event in reversed(new_events):
+                if not event.content or not event.content.parts:
+                    continue
+                text = " ".join(part.text for part in event.content.parts if part.text)
+                if not text.strip():
+                    continue
+                doc = {
+                    "id": event.id,
+                    "app_name": session.app_name,
+                    "user_id": session.user_id,
+                    "session_id": session.id,
+                    "author": event.author,
+                    "role": event.content.role,
+                    "timestamp": event.timestamp,
+                    "text": text,
+                }
+                if self._index_doc(doc):
+                    lines.append(json.dumps(doc, ensure_ascii=False))
+
+            if new_events:
+                self._watermarks[key] = max(watermark, new_events[0].timestamp)
+            if lines:
+                # Picks up lines other processes appended meanwhile, then appends ours
+                self._sync(lines)
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        with self._lock:
+            self._sync()
+            index = self._indexes.get((app_name, user_id))
+            results = index.search(query, self.max_results) if index else []
+
+        return SearchMemoryResponse(memories=[
+            MemoryEntry(
+                content=types.Content(role=doc["role"], parts=[types.Part(text=doc["text"])]),
+                author=doc["author"],
+                timestamp=format_timestamp(doc["timestamp"]),
+            )
+            for _, doc in results
+        ])
+
+    def close(self) -> None:
+        """Close the persistence file"""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+            self._pid = None
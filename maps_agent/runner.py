@@ -1,104 +1,287 @@
 """
 Python runner for the accessibility agent that can be called from Node.js
 Includes Memory Service for conversation context
+
+Modes:
+    python runner.py <query> [session_id] [user_id]   # one-shot, prints one JSON blob
+    python runner.py --stream <query> [...]           # one-shot, NDJSON per event
+    python runner.py --daemon                         # long-lived JSON-lines server
+    python runner.py --workers 4                      # supervisor over warm daemon workers
+    python runner.py --zygote                         # fork a warm child per request
+
+Daemon protocol (one JSON object per line):
+    stdin:  {"id": "1", "op": "run", "query": "...", "session_id": "s1", "user_id": "u1"}
+            {"id": "1", "op": "run", "query": "...", "stream": true}   # adds "event" lines
+            {"id": "2", "op": "ping"}
+            {"id": "5", "op": "noop"}                    # result without an agent turn
+            {"id": "3", "op": "shutdown"}
+            {"id": "4", "op": "stats"}
+    stdout: {"id": null, "type": "ready", "pid": 1234}
+            {"id": "1", "type": "event", "event": {"type": "text", "text": "...", ...}}
+            {"id": "1", "type": "result", "success": true, "response": "...", ...}
+            {"id": "2", "type": "pong"}
+            {"id": null, "type": "error", "error": "..."}
+            {"id": "4", "type": "stats", "registry": {...}, "sessions": {"live_sessions": 3, ...},
+             "maps_http": {"directions": {"p50_ms": 180.2, "breaker": {"state": "closed", ...}, ...}},
+             "route_cache": {"hit_rate": 0.4, ...},
+             "place_cache": {"places": 120, "cities": {"kyiv": {"hit_rate": 0.3, ...}}},
+             "single_flight": {"coalesced": 14, "requests": {"places": {"upstream": 9, ...}}},
+             "rate_limits": {"places:searchText/3f2a...": {"queued": 4, "p95_wait_ms": 80.0, ...}},
+             "tool_threads": {"threads": 32, "running_abandoned": 0, "abandoned": 1, "rejected": 0}}
+            {"id": "4", "type": "stats", "workers": [{"index": 0, "queue_depth": 2, ...}]}  # supervisor
+
+In supervisor mode requests are routed to a worker by hashing session_id,
+so each session's in-memory state stays in one process. In zygote mode
+every request runs in its own forked child, so no session state is kept
+between requests unless sessions are stored in SQLite (SESSION_DB_PATH).
+
+Settings are read from the environment; each is documented next to its
+constant, below for the runner and in the tools modules for the tools.
 """
+import argparse
 import asyncio
+import collections
+import gc
 import json
+import os
+import selectors
 import sys
-from typing import AsyncIterator
+import traceback
+import weakref
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# google.adk / google.genai are imported where first needed, so the
+# supervisor and CLI parsing never pay for them
+from event_schema import serialize_event
+from runner_registry import get_runner, registry
+from tools.maps_client import get_maps_client
+from tools.place_cache import get_place_cache
+from tools.rate_limiter import get_rate_limiter
+from tools.route_cache import get_route_cache
+from tools.single_flight import get_single_flight
 
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
-from google.genai import types
-from agent import root_agent
+# Registry name of root_agent (see runner_registry.AGENT_LOADERS)
+ROOT_AGENT = "accessible_journey_assistant"
 
 # Global services to persist across calls
 _session_service = None
 _memory_service = None
 
+# Per-session locks so turns of the same conversation never interleave.
+# Weak values: a lock disappears once no turn holds or waits on it.
+_session_locks: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+# SQLite file for sessions shared across workers and restarts (in-memory if unset)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH")
+
+# Session bounds: idle TTL, max live sessions, max stored events per session
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", "200"))
+
+# Also delete sessions evicted from a process from SESSION_DB_PATH (default: keep them)
+SESSION_DELETE_EVICTED = os.getenv("SESSION_DELETE_EVICTED", "0").lower() in ("1", "true", "yes")
+
+# JSON-lines file the memory index is persisted to and shared through (in-memory only if unset)
+MEMORY_INDEX_PATH = os.getenv("MEMORY_INDEX_PATH")
+
+# Max number of agent runs in flight at once in daemon mode
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("RUNNER_MAX_CONCURRENCY", "32"))
+
+# Number of warm worker processes in supervisor mode
+DEFAULT_WORKERS = int(os.getenv("RUNNER_WORKERS", str(os.cpu_count() or 1)))
+
+# Delay before restarting a crashed worker, doubled per consecutive crash
+WORKER_RESTART_DELAY = 0.5
+WORKER_MAX_RESTART_DELAY = 30.0
+
+# Max size of one protocol line
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
 
 def get_services():
     """Get or create singleton services"""
     global _session_service, _memory_service
-    
+
     if _session_service is None:
-        _session_service = InMemorySessionService()
+        from google.adk.sessions import InMemorySessionService
+
+        from bounded_session_service import BoundedSessionService
+
+        if SESSION_DB_PATH:
+            from sqlite_session_service import SqliteSessionService
+            store = SqliteSessionService(SESSION_DB_PATH)
+        else:
+            store = InMemorySessionService()
+        # Evict idle sessions and cap history so the daemon can't grow forever
+        _session_service = BoundedSessionService(
+            store,
+            idle_ttl=SESSION_TTL_SECONDS,
+            max_sessions=SESSION_MAX_COUNT,
+            max_events=SESSION_MAX_EVENTS,
+            delete_evicted=SESSION_DELETE_EVICTED if SESSION_DB_PATH else True,
+            in_use=lambda key: session_busy(key[1], key[2]),
+        )
     
     if _memory_service is None:
-        _memory_service = InMemoryMemoryService()
+        from indexed_memory_service import IndexedMemoryService
+
+        # Incremental ingestion + BM25 index instead of re-copying sessions each turn
+        _memory_service = IndexedMemoryService(MEMORY_INDEX_PATH)
     
     return _session_service, _memory_service
 
 
-async def run_agent_stream(query: str, session_id: str = "default", user_id: str = "default") -> AsyncIterator[str]:
-    """
-    Run the agent with streaming responses.
-    Yields JSON objects with type and content.
-    """
-    try:
-        # Get shared services
-        session_service, memory_service = get_services()
-        
-        # Create session if it doesn't exist
-        session = await session_service.get_session(
+async def close_services() -> None:
+    """Stop the session sweeper and commit batched session writes; call before exiting"""
+    if _session_service is not None:
+        await _session_service.close()
+        inner = _session_service.inner
+        if hasattr(inner, "close"):
+            # Blocks until queued writes are committed
+            await asyncio.get_running_loop().run_in_executor(None, inner.close)
+    if _memory_service is not None:
+        _memory_service.close()
+
+
+def warm_up() -> None:
+    """Import ADK, build root_agent, services and the runner ahead of the first turn"""
+    session_service, memory_service = get_services()
+    get_runner("maps_agent", ROOT_AGENT, session_service, memory_service)
+
+    # Imported lazily by the turn functions; load them now
+    from google.adk.agents.run_config import RunConfig  # noqa: F401
+    from google.genai import types  # noqa: F401
+
+
+def get_session_lock(user_id: str, session_id: str) -> asyncio.Lock:
+    """Get or create the lock serializing turns of one session"""
+    key = (user_id, session_id)
+    lock = _session_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[key] = lock
+    return lock
+
+
+def session_busy(user_id: str, session_id: str) -> bool:
+    """Whether a turn of the session is running or waiting for its lock"""
+    lock = _session_locks.get((user_id, session_id))
+    return lock is not None and lock.locked()
+
+
+async def _ensure_session(session_service, user_id: str, session_id: str) -> None:
+    """Create the session if it doesn't exist yet"""
+    session = await session_service.get_session(
+        app_name="maps_agent",
+        user_id=user_id,
+        session_id=session_id
+    )
+
+    if session is None:
+        await session_service.create_session(
             app_name="maps_agent",
             user_id=user_id,
             session_id=session_id
         )
-        
-        if session is None:
-            await session_service.create_session(
-                app_name="maps_agent",
-                user_id=user_id,
-                session_id=session_id
-            )
-        
-        # Create runner with memory service
-        runner = Runner(
+
+
+async def _save_session_to_memory(session_service, memory_service, user_id: str, session_id: str) -> None:
+    """Add the completed session to memory for future recall"""
+    try:
+        completed_session = await session_service.get_session(
             app_name="maps_agent",
-            agent=root_agent,
-            session_service=session_service,
-            memory_service=memory_service
-        )
-        
-        # Create message content
-        new_message = types.Content(
-            role="user",
-            parts=[types.Part(text=query)]
-        )
-        
-        # Run agent with streaming
-        async for event in runner.run_async(
             user_id=user_id,
-            session_id=session_id,
-            new_message=new_message
-        ):
-            # Convert event to JSON and yield
-            event_type = type(event).__name__
-            
-            # Extract content based on event type
-            if hasattr(event, "content"):
-                content = event.content
-            elif hasattr(event, "text"):
-                content = event.text
-            else:
-                content = str(event)
-            
-            event_data = {
-                "type": event_type,
-                "content": content
+            session_id=session_id
+        )
+        if completed_session:
+            await memory_service.add_session_to_memory(completed_session)
+    except Exception as mem_error:
+        # Don't fail the whole request if memory save fails
+        print(f"Warning: Failed to save session to memory: {mem_error}", file=sys.stderr)
+
+
+def _new_user_message(query: str):
+    """Create message content for a user query"""
+    from google.genai import types
+
+    return types.Content(
+        role="user",
+        parts=[types.Part(text=query)]
+    )
+
+
+def _extract_model_text(event) -> Optional[str]:
+    """Join the text parts of a model response event, if any"""
+    content = getattr(event, "content", None)
+    # Only process model responses (not user messages)
+    if content is None or getattr(content, "role", None) != "model":
+        return None
+
+    text_parts = [part.text for part in (content.parts or []) if getattr(part, "text", None)]
+    return "\n".join(text_parts) if text_parts else None
+
+
+async def run_agent_stream(query: str, session_id: str = "default", user_id: str = "default") -> AsyncIterator[dict]:
+    """
+    Run the agent with streaming responses.
+    Yields compact event dicts (see event_schema.py) as soon as ADK produces
+    them, ending with {"type": "final", "text": ...}. On failure the last
+    message is {"type": "error", ...} and no final message is sent.
+    """
+    async with get_session_lock(user_id, session_id):
+        try:
+            # Get shared services
+            session_service, memory_service = get_services()
+            await _ensure_session(session_service, user_id, session_id)
+
+            # Reuse the cached runner for these services
+            runner = get_runner("maps_agent", ROOT_AGENT, session_service, memory_service)
+
+            # Create message content
+            new_message = _new_user_message(query)
+
+            from google.adk.agents.run_config import RunConfig, StreamingMode
+
+            # SSE mode makes the model emit partial text deltas as it generates
+            run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+            final_response = None
+            streamed_partial = False
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+                run_config=run_config
+            ):
+                if event.partial:
+                    streamed_partial = True
+                    include_text = True
+                else:
+                    # The aggregated event repeats text already sent as deltas
+                    include_text = not streamed_partial
+                    streamed_partial = False
+                    text = _extract_model_text(event)
+                    if text:
+                        final_response = text
+
+                for message in serialize_event(event, include_text=include_text):
+                    yield message
+
+            await _save_session_to_memory(session_service, memory_service, user_id, session_id)
+
+            yield {"type": "final", "text": final_response or "No response generated"}
+
+        except Exception as e:
+            import traceback
+            yield {
+                "type": "error",
+                "message": str(e),
+                "traceback": traceback.format_exc()
             }
-            yield json.dumps(event_data) + "\n"
-            
-    except Exception as e:
-        import traceback
-        error_data = {
-            "type": "error",
-            "content": str(e),
-            "traceback": traceback.format_exc()
-        }
-        yield json.dumps(error_data) + "\n"
 
 
 async def run_agent(query: str, session_id: str = "default", user_id: str = "default") -> dict:
@@ -106,83 +289,44 @@ async def run_agent(query: str, session_id: str = "default", user_id: str = "def
     Run the agent and return the final response.
     Automatically saves completed sessions to memory.
     """
+    async with get_session_lock(user_id, session_id):
+        return await _run_agent_turn(query, session_id, user_id)
+
+
+async def _run_agent_turn(query: str, session_id: str, user_id: str) -> dict:
+    """Run a single turn; callers must hold the session lock"""
     try:
         # Get shared services
         session_service, memory_service = get_services()
-        
-        # Create session if it doesn't exist
-        session = await session_service.get_session(
-            app_name="maps_agent",
-            user_id=user_id,
-            session_id=session_id
-        )
-        
-        if session is None:
-            await session_service.create_session(
-                app_name="maps_agent",
-                user_id=user_id,
-                session_id=session_id
-            )
-        
-        # Create runner with memory service
-        runner = Runner(
-            app_name="maps_agent",
-            agent=root_agent,
-            session_service=session_service,
-            memory_service=memory_service
-        )
-        
+        await _ensure_session(session_service, user_id, session_id)
+
+        # Reuse the cached runner for these services
+        runner = get_runner("maps_agent", ROOT_AGENT, session_service, memory_service)
+
         # Create message content
-        new_message = types.Content(
-            role="user",
-            parts=[types.Part(text=query)]
-        )
-        
-        # Collect all events
-        events = []
+        new_message = _new_user_message(query)
+
         final_response = None
-        
         async for event in runner.run_async(
             user_id=user_id,
             session_id=session_id,
             new_message=new_message
         ):
-            events.append(event)
-            event_type = type(event).__name__
-            
-            # Try to extract response from any event with content
-            if hasattr(event, "content") and event.content is not None:
-                # Only process model responses (not user messages)
-                if hasattr(event.content, "role") and event.content.role == "model":
-                    # Extract text from Content
-                    if hasattr(event.content, "parts"):
-                        text_parts = []
-                        for part in event.content.parts:
-                            if hasattr(part, "text") and part.text:
-                                text_parts.append(part.text)
-                        if text_parts:
-                            final_response = "\n".join(text_parts)
-        
+            # Keep the latest model text as the response
+            text = _extract_model_text(event)
+            if text:
+                final_response = text
+
         # After conversation, add session to memory for future recall
-        try:
-            completed_session = await session_service.get_session(
-                app_name="maps_agent",
-                user_id=user_id,
-                session_id=session_id
-            )
-            if completed_session:
-                await memory_service.add_session_to_memory(completed_session)
-        except Exception as mem_error:
-            # Don't fail the whole request if memory save fails
-            print(f"Warning: Failed to save session to memory: {mem_error}", file=sys.stderr)
-        
+        await _save_session_to_memory(session_service, memory_service, user_id, session_id)
+
         return {
             "success": True,
             "response": final_response if final_response else "No response generated",
             "session_id": session_id,
             "user_id": user_id
         }
-        
+
     except Exception as e:
         import traceback
         return {
@@ -194,16 +338,542 @@ async def run_agent(query: str, session_id: str = "default", user_id: str = "def
         }
 
 
+def _emit(message: dict) -> None:
+    """Write one protocol line to stdout and flush it immediately"""
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+async def _handle_request(request: dict, semaphore: asyncio.Semaphore) -> None:
+    """Run one daemon request and emit its tagged result line"""
+    request_id = request.get("id")
+    session_id = request.get("session_id") or "default"
+    user_id = request.get("user_id") or "default"
+
+    if request.get("op") == "noop":
+        # Measures protocol/process overhead without calling the model
+        _emit({
+            "id": request_id,
+            "type": "result",
+            "success": True,
+            "response": "",
+            "session_id": session_id,
+            "user_id": user_id,
+        })
+        return
+
+    query = request.get("query")
+    if not query:
+        _emit({"id": request_id, "type": "error", "error": "query is required"})
+        return
+
+    async with semaphore:
+        if not request.get("stream"):
+            result = await run_agent(query, session_id, user_id)
+            _emit({"id": request_id, "type": "result", **result})
+            return
+
+        # Streaming: one tagged event line per message, then the result line
+        error = "No response generated"
+        async for message in run_agent_stream(query, session_id, user_id):
+            if message["type"] == "final":
+                _emit({
+                    "id": request_id,
+                    "type": "result",
+                    "success": True,
+                    "response": message["text"],
+                    "session_id": session_id,
+                    "user_id": user_id,
+                })
+                return
+            if message["type"] == "error":
+                error = message["message"]
+            _emit({"id": request_id, "type": "event", "event": message})
+
+        _emit({
+            "id": request_id,
+            "type": "result",
+            "success": False,
+            "error": error,
+            "session_id": session_id,
+            "user_id": user_id,
+        })
+
+
+async def _open_stdin_reader() -> asyncio.StreamReader:
+    """Wrap stdin in an asyncio StreamReader"""
+    loop = asyncio.get_running_loop()
+    # Allow large requests (long conversation pastes) on a single line
+    reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    return reader
+
+
+async def serve_daemon(max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+    """
+    Serve JSON-lines requests from stdin until EOF or a shutdown request.
+    Requests run concurrently on one event loop and share the global
+    session and memory services, so conversation state survives between turns.
+    """
+    # Build services and runner up front so the first request doesn't pay for it
+    warm_up()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pending = set()
+
+    reader = await _open_stdin_reader()
+    _emit({"id": None, "type": "ready", "pid": os.getpid()})
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break  # EOF - parent closed stdin
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            _emit({"id": None, "type": "error", "error": f"Invalid request: {e}"})
+            continue
+
+        op = request.get("op", "run")
+        if op == "ping":
+            _emit({"id": request.get("id"), "type": "pong", "in_flight": len(pending)})
+        elif op == "stats":
+            from tools.parallel import thread_stats
+
+            _emit({
+                "id": request.get("id"),
+                "type": "stats",
+                "registry": registry.stats(),
+                "sessions": get_services()[0].stats(),
+                "maps_http": get_maps_client().stats(),
+                "route_cache": get_route_cache().stats(),
+                "place_cache": get_place_cache().stats(),
+                "single_flight": get_single_flight().stats(),
+                "rate_limits": get_rate_limiter().stats(),
+                "tool_threads": thread_stats(),
+            })
+        elif op == "shutdown":
+            _emit({"id": request.get("id"), "type": "shutdown"})
+            break
+        elif op in ("run", "noop"):
+            task = asyncio.create_task(_handle_request(request, semaphore))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        else:
+            _emit({"id": request.get("id"), "type": "error", "error": f"Unknown op: {op}"})
+
+    # Let in-flight turns finish before exiting
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    await close_services()
+
+
+class WorkerProcess:
+    """
+    One warm `runner.py --daemon` child managed by the supervisor.
+    Tracks the requests it owns so queue depth is known and so they can be
+    failed cleanly if the process dies.
+    """
+
+    def __init__(self, index: int, max_concurrency: int):
+        self.index = index
+        self.max_concurrency = max_concurrency
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+        self.pending: Dict[str, float] = {}
+        self.ready = asyncio.Event()
+        self.served = 0
+        self.restarts = 0
+        self._stopping = False
+        self._restart_delay = WORKER_RESTART_DELAY
+        self._reader_task: Optional[asyncio.Task] = None
+        self._forward_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Spawn the daemon process and start relaying its output"""
+        self.ready.clear()
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--daemon",
+            "--max-concurrency", str(self.max_concurrency),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_BYTES,
+        )
+        self._reader_task = asyncio.create_task(self._relay_output(self.process))
+
+    def submit(self, request: dict) -> None:
+        """Queue a request for this worker without blocking the caller"""
+        if self._forward_task is None:
+            self._forward_task = asyncio.create_task(self._forward_requests())
+        self.queue.put_nowait(request)
+
+    async def _forward_requests(self) -> None:
+        """Write queued requests to the worker in order, waiting out restarts, until a None sentinel"""
+        while True:
+            request = await self.queue.get()
+            if request is None:
+                return
+            try:
+                await self.ready.wait()
+            except asyncio.CancelledError:
+                _emit({"id": request["id"], "type": "error", "error": "Supervisor stopped before the request was sent"})
+                raise
+            self.pending[request["id"]] = asyncio.get_running_loop().time()
+            try:
+                self.process.stdin.write((json.dumps(request) + "\n").encode())
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # Process died mid-write; the relay fails pending requests
+                pass
+
+    async def stop(self) -> None:
+        """Send queued requests, then close stdin so the daemon drains in-flight turns and exits"""
+        self._stopping = True
+        if self._forward_task:
+            # The relay ends first if the worker dies (it isn't restarted while stopping)
+            self.queue.put_nowait(None)
+            await asyncio.wait({self._forward_task, self._reader_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not self._forward_task.done():
+                self._forward_task.cancel()
+                await asyncio.gather(self._forward_task, return_exceptions=True)
+            # Every request gets a result or error line, or its client would wait forever
+            while not self.queue.empty():
+                request = self.queue.get_nowait()
+                if request is not None:
+                    _emit({"id": request["id"], "type": "error", "error": "Supervisor stopped before the request was sent"})
+        if self.process and self.process.returncode is None:
+            self.process.stdin.close()
+            await self.process.wait()
+        if self._reader_task:
+            await self._reader_task
+
+    def stats(self) -> dict:
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process else None,
+            "ready": self.ready.is_set(),
+            "queue_depth": self.queue.qsize() + len(self.pending),
+            "served": self.served,
+            "restarts": self.restarts,
+        }
+
+    async def _relay_output(self, process: asyncio.subprocess.Process) -> None:
+        """Copy worker lines to our stdout, then restart the worker if it died"""
+        async for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                print(f"Worker {self.index}: non-JSON output: {line!r}", file=sys.stderr)
+                continue
+
+            if message.get("type") == "ready":
+                self.ready.set()
+                self._restart_delay = WORKER_RESTART_DELAY
+                continue
+
+            request_id = message.get("id")
+            if request_id in self.pending and message.get("type") in ("result", "error"):
+                del self.pending[request_id]
+                self.served += 1
+            _emit(message)
+
+        returncode = await process.wait()
+        # Hold new writes until the replacement reports ready
+        self.ready.clear()
+
+        # Fail requests the worker never answered (none after a clean stop)
+        for request_id in list(self.pending):
+            _emit({
+                "id": request_id,
+                "type": "error",
+                "error": f"Worker process exited with code {returncode}",
+            })
+        self.pending.clear()
+        if self._stopping:
+            return
+
+        # Worker crashed - bring up a replacement
+        print(f"Worker {self.index} exited with code {returncode}, restarting", file=sys.stderr)
+        self.restarts += 1
+        await asyncio.sleep(self._restart_delay)
+        self._restart_delay = min(self._restart_delay * 2, WORKER_MAX_RESTART_DELAY)
+        if not self._stopping:
+            await self.start()
+
+
+def route_worker(session_id: str, num_workers: int) -> int:
+    """Pick a worker for a session with a hash that is stable across processes"""
+    return zlib.crc32(session_id.encode("utf-8")) % num_workers
+
+
+async def serve_supervisor(
+    num_workers: int = DEFAULT_WORKERS,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> None:
+    """
+    Serve the daemon protocol from stdin using a pool of warm worker processes.
+    Each worker is a full daemon with the agent already built; requests are
+    routed by session_id so a session's in-memory state stays on one worker.
+    """
+    workers: List[WorkerProcess] = [
+        WorkerProcess(index, max_concurrency) for index in range(num_workers)
+    ]
+    await asyncio.gather(*(worker.start() for worker in workers))
+    await asyncio.gather(*(worker.ready.wait() for worker in workers))
+
+    reader = await _open_stdin_reader()
+    _emit({
+        "id": None,
+        "type": "ready",
+        "pid": os.getpid(),
+        "workers": [worker.stats()["pid"] for worker in workers],
+    })
+
+    next_internal_id = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            _emit({"id": None, "type": "error", "error": f"Invalid request: {e}"})
+            continue
+
+        op = request.get("op", "run")
+        if op == "ping":
+            depth = sum(worker.stats()["queue_depth"] for worker in workers)
+            _emit({"id": request.get("id"), "type": "pong", "in_flight": depth})
+        elif op == "stats":
+            _emit({
+                "id": request.get("id"),
+                "type": "stats",
+                "workers": [worker.stats() for worker in workers],
+            })
+        elif op == "shutdown":
+            _emit({"id": request.get("id"), "type": "shutdown"})
+            break
+        elif op in ("run", "noop"):
+            if request.get("id") is None:
+                next_internal_id += 1
+                request["id"] = f"supervisor-{next_internal_id}"
+            session_id = request.get("session_id") or "default"
+            # Requests for a restarting worker wait in its queue, not here
+            workers[route_worker(session_id, num_workers)].submit(request)
+        else:
+            _emit({"id": request.get("id"), "type": "error", "error": f"Unknown op: {op}"})
+
+    await asyncio.gather(*(worker.stop() for worker in workers))
+
+
+def _fork_child(request: dict, selector: selectors.BaseSelector, children: Dict[int, dict]) -> None:
+    """Fork a copy-on-write child to run one request, reading its output via a pipe"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: protocol lines go to the pipe instead of the zygote's stdout
+        os.close(read_fd)
+        os.dup2(write_fd, sys.stdout.fileno())
+        os.close(write_fd)
+        exit_code = 0
+
+        async def handle() -> None:
+            try:
+                await _handle_request(request, asyncio.Semaphore(1))
+            finally:
+                # os._exit skips cleanup: commit this child's session writes first
+                await close_services()
+
+        try:
+            asyncio.run(handle())
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(exit_code)
+
+    os.close(write_fd)
+    selector.register(read_fd, selectors.EVENT_READ)
+    children[read_fd] = {"pid": pid, "id": request.get("id"), "buffer": b"", "done": False}
+
+
+def _relay_child_output(child: dict, data: bytes) -> None:
+    """Forward complete lines from a child, noting when its result arrives"""
+    *lines, child["buffer"] = (child["buffer"] + data).split(b"\n")
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError:
+            print(f"Child {child['pid']}: non-JSON output: {line!r}", file=sys.stderr)
+            continue
+        if message.get("id") == child["id"] and message.get("type") in ("result", "error"):
+            child["done"] = True
+        _emit(message)
+
+
+def serve_zygote(max_children: int = DEFAULT_MAX_CONCURRENCY) -> None:
+    """
+    Fork-server mode: import ADK and build root_agent once, then fork a
+    copy-on-write child per request. Each turn runs in its own process
+    (crash containment, memory returned on exit) without a cold start.
+
+    The zygote must stay single-threaded with no event loop, so it
+    multiplexes stdin and child pipes with a plain selector.
+    """
+    # Everything children need is loaded before the first fork
+    warm_up()
+    # Keep the GC from touching (and so copying) inherited pages in children
+    gc.collect()
+    gc.freeze()
+
+    selector = selectors.DefaultSelector()
+    stdin_fd = sys.stdin.fileno()
+    selector.register(stdin_fd, selectors.EVENT_READ)
+    children: Dict[int, dict] = {}
+    backlog: "collections.deque[dict]" = collections.deque()
+    stdin_buffer = b""
+    stdin_open = True
+    forked = 0
+
+    _emit({"id": None, "type": "ready", "pid": os.getpid()})
+
+    while stdin_open or children or backlog:
+        if backlog and len(children) < max_children:
+            # Children start from the zygote's index: bring it up to date so
+            # each one doesn't re-read everything appended since startup
+            get_services()[1].refresh()
+        while backlog and len(children) < max_children:
+            _fork_child(backlog.popleft(), selector, children)
+            forked += 1
+
+        for key, _ in selector.select():
+            data = os.read(key.fd, 65536)
+
+            if key.fd != stdin_fd:
+                child = children[key.fd]
+                if data:
+                    _relay_child_output(child, data)
+                    continue
+                # EOF: child exited (or closed its end)
+                selector.unregister(key.fd)
+                os.close(key.fd)
+                del children[key.fd]
+                _, status = os.waitpid(child["pid"], 0)
+                if not child["done"]:
+                    _emit({
+                        "id": child["id"],
+                        "type": "error",
+                        "error": f"Request process exited with code {os.waitstatus_to_exitcode(status)}",
+                    })
+                continue
+
+            if not data:
+                selector.unregister(stdin_fd)
+                stdin_open = False
+                continue
+
+            *lines, stdin_buffer = (stdin_buffer + data).split(b"\n")
+            for line in lines:
+                if not line.strip() or not stdin_open:
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    _emit({"id": None, "type": "error", "error": f"Invalid request: {e}"})
+                    continue
+
+                op = request.get("op", "run")
+                if op == "ping":
+                    _emit({"id": request.get("id"), "type": "pong", "in_flight": len(children) + len(backlog)})
+                elif op == "stats":
+                    _emit({
+                        "id": request.get("id"),
+                        "type": "stats",
+                        "children": len(children),
+                        "backlog": len(backlog),
+                        "forked": forked,
+                    })
+                elif op == "shutdown":
+                    _emit({"id": request.get("id"), "type": "shutdown"})
+                    selector.unregister(stdin_fd)
+                    stdin_open = False
+                elif op in ("run", "noop"):
+                    backlog.append(request)
+                else:
+                    _emit({"id": request.get("id"), "type": "error", "error": f"Unknown op: {op}"})
+
+    selector.close()
+
+
 if __name__ == "__main__":
-    # CLI interface for testing
-    if len(sys.argv) < 2:
-        print("Usage: python runner.py <query> [session_id] [user_id]")
+    # CLI interface for testing, daemon, supervisor and zygote modes
+    parser = argparse.ArgumentParser(description="Run the accessibility agent")
+    parser.add_argument("query", nargs="?", help="Query to run once")
+    parser.add_argument("session_id", nargs="?", default="default")
+    parser.add_argument("user_id", nargs="?", default="default")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print one NDJSON line per event as it arrives")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Serve JSON-lines requests from stdin")
+    parser.add_argument("--workers", type=int, default=0,
+                        help=f"Serve through N warm worker processes (e.g. {DEFAULT_WORKERS})")
+    parser.add_argument("--zygote", action="store_true",
+                        help="Serve requests by forking a warm child per request")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Max agent runs in flight per daemon process (children in zygote mode)")
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        asyncio.run(serve_supervisor(args.workers, args.max_concurrency))
+        sys.exit(0)
+
+    if args.zygote:
+        serve_zygote(args.max_concurrency)
+        sys.exit(0)
+
+    if args.daemon:
+        asyncio.run(serve_daemon(args.max_concurrency))
+        sys.exit(0)
+
+    if not args.query:
+        print("Usage: python runner.py [--stream] <query> [session_id] [user_id] | --daemon | --workers N | --zygote")
         sys.exit(1)
-    
-    query = sys.argv[1]
-    session_id = sys.argv[2] if len(sys.argv) > 2 else "default"
-    user_id = sys.argv[3] if len(sys.argv) > 3 else "default"
-    
+
+    if args.stream:
+        async def _print_stream():
+            try:
+                async for message in run_agent_stream(args.query, args.session_id, args.user_id):
+                    _emit(message)
+            finally:
+                await close_services()
+
+        asyncio.run(_print_stream())
+        sys.exit(0)
+
     # Run agent
-    result = asyncio.run(run_agent(query, session_id, user_id))
+    async def _run_once():
+        try:
+            return await run_agent(args.query, args.session_id, args.user_id)
+        finally:
+            await close_services()
+
+    result = asyncio.run(_run_once())
     print(json.dumps(result, indent=2))
@@ -0,0 +1,148 @@
+"""
+Process-wide registry of ADK Runners
+Runners are built lazily on first use and reused across turns, so one
+process can serve root_agent, streaming_agent and maps_explorer side by side.
+"""
+import importlib.util
+import pathlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+# python_backend ships the maps_explorer agent in its own package
+MAPS_EXPLORER_PATH = (
+    pathlib.Path(__file__).resolve().parent.parent / "python_backend" / "maps_agent" / "agent.py"
+)
+
+
+def _load_root_agent():
+    from agent import root_agent
+    return root_agent
+
+
+def _load_streaming_agent():
+    from streaming_agent import streaming_agent
+    return streaming_agent
+
+
+def _load_maps_explorer():
+    # Loaded by path: python_backend's package is also named maps_agent
+    spec = importlib.util.spec_from_file_location("maps_explorer_agent", MAPS_EXPLORER_PATH)
+    if spec is None or not MAPS_EXPLORER_PATH.exists():
+        raise LookupError(f"maps_explorer agent not found at {MAPS_EXPLORER_PATH}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.root_agent
+
+
+# Agent loaders by agent name; agents are only imported when first requested
+AGENT_LOADERS: Dict[str, Callable[[], Any]] = {
+    "accessible_journey_assistant": _load_root_agent,
+    "accessibility_voice_agent": _load_streaming_agent,
+    "maps_explorer": _load_maps_explorer,
+}
+
+
+class RunnerRegistry:
+    """
+    Lazily builds and caches Runner instances keyed by
+    (app name, agent, session service, memory service).
+
+    The registry keeps strong references to every key object, so the
+    identity-based keys stay valid for the life of the process.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, Any] = {}
+        self._runners: Dict[Tuple[str, int, int, int], Any] = {}
+        self._stats: Dict[Tuple[str, int, int, int], Dict[str, Any]] = {}
+        self._agent_load_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_agent(self, name: str):
+        """Return a registered agent by name, importing it on first use"""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            if name not in self._agents:
+                if name not in AGENT_LOADERS:
+                    raise KeyError(f"Unknown agent: {name}")
+                started = time.perf_counter()
+                self._agents[name] = AGENT_LOADERS[name]()
+                self._agent_load_seconds[name] = time.perf_counter() - started
+            return self._agents[name]
+
+    def get_runner(
+        self,
+        app_name: str,
+        agent: Union[str, Any],
+        session_service: Any,
+        memory_service: Optional[Any] = None,
+    ):
+        """
+        Get the Runner for this combination, building it on first use.
+
+        Args:
+            app_name: ADK application name used for session lookups
+            agent: Agent instance or registered agent name
+            session_service: Session service the runner reads and writes
+            memory_service: Optional memory service
+
+        Returns:
+            Cached google.adk Runner
+        """
+        if isinstance(agent, str):
+            agent = self.get_agent(agent)
+
+        key = (app_name, id(agent), id(session_service), id(memory_service))
+        runner = self._runners.get(key)
+        if runner is not None:
+            self._stats[key]["hits"] += 1
+            return runner
+
+        with self._lock:
+            if key not in self._runners:
+                from google.adk.runners import Runner
+
+                started = time.perf_counter()
+                self._runners[key] = Runner(
+                    app_name=app_name,
+                    agent=agent,
+                    session_service=session_service,
+                    memory_service=memory_service,
+                )
+                self._stats[key] = {
+                    "app_name": app_name,
+                    "agent": getattr(agent, "name", type(agent).__name__),
+                    "session_service": type(session_service).__name__,
+                    "memory_service": type(memory_service).__name__ if memory_service else None,
+                    "build_seconds": time.perf_counter() - started,
+                    "hits": 0,
+                }
+            else:
+                self._stats[key]["hits"] += 1
+            return self._runners[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Construction cost and reuse counts for agents and runners"""
+        return {
+            "agents": dict(self._agent_load_seconds),
+            "runners": [dict(entry) for entry in self._stats.values()],
+        }
+
+    def clear(self) -> None:
+        """Drop all cached runners (agents stay loaded)"""
+        with self._lock:
+            self._runners.clear()
+            self._stats.clear()
+
+
+# Global registry shared by the runner, daemon and voice server
+registry = RunnerRegistry()
+
+
+def get_runner(app_name: str, agent: Union[str, Any], session_service: Any, memory_service: Optional[Any] = None):
+    """Get a cached Runner from the global registry"""
+    return registry.get_runner(app_name, agent, session_service, memory_service)
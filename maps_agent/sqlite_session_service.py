@@ -0,0 +1,430 @@
+"""
+SQLite-backed session service for Google ADK
+Drop-in replacement for InMemorySessionService that survives restarts and
+can be shared by several local processes (daemon workers, voice server).
+
+Storage layout:
+- sessions: one row per session with its session-scoped state
+- events: append-only rows, indexed by (app_name, user_id, session_id, seq)
+- app_states / user_states: "app:" and "user:" prefixed state shared across sessions
+
+The database runs in WAL mode so readers never block the writer. Event
+writes are queued in memory and committed in batches: on every final
+response (turn boundary), when `batch_size` writes are queued, or
+`commit_interval` seconds after the first queued write. A batch is one
+short transaction, so the database write lock is only held while it is
+written, and reads commit this process's queued writes first.
+
+All database work runs on one thread per process, off the event loop, so
+waiting for another process's write lock never blocks serving.
+
+Each process opens its own connection on first use: a SQLite connection
+must not be used across fork, so a service created in the zygote before
+it forks is safe to use in its children. Call flush() or close() before
+exiting, or writes still queued are lost.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS events_by_session
+    ON events (app_name, user_id, session_id, seq);
+
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+# Statements are constant strings so sqlite3's statement cache reuses them
+_INSERT_SESSION = "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)"
+_SELECT_SESSION = "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?"
+_SELECT_SESSIONS = "SELECT id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ?"
+_DELETE_SESSION = "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?"
+_UPDATE_SESSION = "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?"
+_TOUCH_SESSION = "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?"
+
+_INSERT_EVENT = "INSERT INTO events (app_name, user_id, session_id, id, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)"
+_SELECT_EVENTS = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp >= ? ORDER BY seq"
+_SELECT_RECENT_EVENTS = (
+    "SELECT data FROM (SELECT seq, data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+    "AND timestamp >= ? ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+)
+_DELETE_EVENTS = "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+_SELECT_EVENT_AUTHORS = (
+    "SELECT seq, json_extract(data, '$.author') FROM events "
+    "WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq"
+)
+_DELETE_EVENTS_BEFORE = "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq < ?"
+
+_SELECT_APP_STATE = "SELECT state FROM app_states WHERE app_name = ?"
+_UPSERT_APP_STATE = (
+    "INSERT INTO app_states (app_name, state, update_time) VALUES (?, ?, ?) "
+    "ON CONFLICT (app_name) DO UPDATE SET state = excluded.state, update_time = excluded.update_time"
+)
+_SELECT_USER_STATE = "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?"
+_UPSERT_USER_STATE = (
+    "INSERT INTO user_states (app_name, user_id, state, update_time) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state, update_time = excluded.update_time"
+)
+
+
+# Connections inherited over fork: never used, and never closed, since
+# closing one in a child can checkpoint or unlink the parent's WAL
+_inherited_connections = []
+
+
+def _split_state(state: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Split a state dict into (app, user, session) parts, dropping temp: keys"""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    Session service storing sessions and events in a local SQLite database.
+
+    Args:
+        db_path: Database file; processes pointing at the same file share sessions
+        batch_size: Max queued writes before a commit is forced
+        commit_interval: Max seconds a write stays queued
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 32, commit_interval: float = 0.05):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+        self._lock = threading.Lock()
+        # Writes not yet committed, each run against the connection in the batch transaction
+        self._queued: List[Callable[[sqlite3.Connection], None]] = []
+        self._commit_timer: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.TimerHandle]] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This process's connection, opened on first use and again after a fork (lock held)"""
+        if self._connection_pid != os.getpid():
+            if self._connection is not None:
+                _inherited_connections.append(self._connection)
+            # isolation_level=None: transactions are opened explicitly for batching
+            connection = sqlite3.connect(
+                self.db_path, isolation_level=None, check_same_thread=False, cached_statements=64
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            connection.executescript(_SCHEMA)
+            self._connection, self._connection_pid = connection, os.getpid()
+            # Queued writes belong to the parent
+            self._queued = []
+        return self._connection
+
+    def _run(self, fn: Callable, *args) -> "asyncio.Future":
+        """Run fn(*args) with the lock held on this process's database thread"""
+        if self._executor_pid != os.getpid():
+            # The parent's thread doesn't exist in a forked child
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+            self._executor_pid = os.getpid()
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(self._locked, fn, *args))
+
+    def _locked(self, fn: Callable, *args):
+        with self._lock:
+            return fn(*args)
+
+    # -- write batching ------------------------------------------------------
+
+    def _transaction(self, writes: List[Callable[[sqlite3.Connection], None]]):
+        """Run writes in one short write transaction; returns the last one's result (lock held)"""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = None
+            for write in writes:
+                result = write(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _commit_locked(self) -> None:
+        """Commit the queued writes, if any (lock held)"""
+        if self._connection_pid not in (None, os.getpid()):
+            # Queued in the parent before a fork: the parent commits them
+            self._queued = []
+        if self._queued:
+            writes, self._queued = self._queued, []
+            self._transaction(writes)
+
+    def _queue_write(self, write: Callable[[sqlite3.Connection], None], force_commit: bool = False) -> bool:
+        """Queue a write; commits when the batch is full. True if a commit timer is needed (lock held)"""
+        self._conn  # Reopens after a fork, dropping the parent's queue
+        self._queued.append(write)
+        if force_commit or len(self._queued) >= self.batch_size:
+            self._commit_locked()
+            return False
+        return True
+
+    def _arm_commit_timer(self) -> None:
+        """Commit queued writes within commit_interval (event loop thread)"""
+        loop = asyncio.get_running_loop()
+        # A timer of another loop (e.g. the zygote's, before a fork) never fires here
+        if self._commit_timer is None or self._commit_timer[0] is not loop:
+            self._commit_timer = (loop, loop.call_later(self.commit_interval, self._commit_due))
+
+    def _commit_due(self) -> None:
+        self._commit_timer = None
+        self._run(self._commit_locked)
+
+    def flush(self) -> None:
+        """Commit any queued writes so other processes can see them"""
+        with self._lock:
+            self._commit_locked()
+
+    def close(self) -> None:
+        """Commit queued writes and close this process's connection"""
+        self.flush()
+        with self._lock:
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+                self._connection = self._connection_pid = None
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=True)
+        self._executor = self._executor_pid = None
+
+    # -- state helpers -------------------------------------------------------
+
+    def _load_shared_state(self, app_name: str, user_id: str) -> Dict[str, Any]:
+        """App and user state with their prefixes restored (lock held)"""
+        merged = {}
+        row = self._conn.execute(_SELECT_APP_STATE, (app_name,)).fetchone()
+        if row:
+            merged.update({State.APP_PREFIX + k: v for k, v in json.loads(row[0]).items()})
+        row = self._conn.execute(_SELECT_USER_STATE, (app_name, user_id)).fetchone()
+        if row:
+            merged.update({State.USER_PREFIX + k: v for k, v in json.loads(row[0]).items()})
+        return merged
+
+    @staticmethod
+    def _patch_shared_state(
+        conn: sqlite3.Connection, app_name: str, user_id: str, app_state: dict, user_state: dict, now: float
+    ) -> None:
+        """
+        Apply app/user state deltas to their tables (write transaction open).
+        Like ADK, each key's value is replaced: no recursive merge, and None
+        is stored rather than deleting the key.
+        """
+        if app_state:
+            row = conn.execute(_SELECT_APP_STATE, (app_name,)).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **app_state}
+            conn.execute(_UPSERT_APP_STATE, (app_name, json.dumps(state), now))
+        if user_state:
+            row = conn.execute(_SELECT_USER_STATE, (app_name, user_id)).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **user_state}
+            conn.execute(_UPSERT_USER_STATE, (app_name, user_id, json.dumps(state), now))
+
+    # -- BaseSessionService --------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app_state, user_state, session_state = _split_state(state)
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> None:
+            try:
+                conn.execute(_INSERT_SESSION, (app_name, user_id, session_id, json.dumps(session_state), now, now))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Session {session_id} already exists")
+            self._patch_shared_state(conn, app_name, user_id, app_state, user_state, now)
+
+        def create() -> Dict[str, Any]:
+            # Committed right away so other processes can find it; in its own
+            # transaction so a duplicate id doesn't roll back queued writes
+            self._commit_locked()
+            self._transaction([insert])
+            return {**session_state, **self._load_shared_state(app_name, user_id)}
+
+        merged_state = await self._run(create)
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=merged_state,
+            events=[],
+            last_update_time=now,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        after = config.after_timestamp if config and config.after_timestamp else 0.0
+
+        def load():
+            self._commit_locked()
+            row = self._conn.execute(_SELECT_SESSION, (app_name, user_id, session_id)).fetchone()
+            if row is None:
+                return None
+            if config and config.num_recent_events:
+                rows = self._conn.execute(
+                    _SELECT_RECENT_EVENTS,
+                    (app_name, user_id, session_id, after, config.num_recent_events),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(_SELECT_EVENTS, (app_name, user_id, session_id, after)).fetchall()
+            return row, rows, self._load_shared_state(app_name, user_id)
+
+        loaded = await self._run(load)
+        if loaded is None:
+            return None
+        row, rows, shared_state = loaded
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state={**json.loads(row[0]), **shared_state},
+            events=[Event.model_validate_json(data) for (data,) in rows],
+            last_update_time=row[1],
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        def load():
+            self._commit_locked()
+            rows = self._conn.execute(_SELECT_SESSIONS, (app_name, user_id)).fetchall()
+            return rows, self._load_shared_state(app_name, user_id)
+
+        rows, shared_state = await self._run(load)
+        # Like the built-in services, listed sessions carry no events
+        return ListSessionsResponse(sessions=[
+            Session(
+                id=session_id,
+                app_name=app_name,
+                user_id=user_id,
+                state={**json.loads(state), **shared_state},
+                events=[],
+                last_update_time=update_time,
+            )
+            for session_id, state, update_time in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute(_DELETE_EVENTS, (app_name, user_id, session_id))
+            conn.execute(_DELETE_SESSION, (app_name, user_id, session_id))
+
+        await self._run(self._queue_write, delete, True)
+
+    def trim_events(self, *, app_name: str, user_id: str, session_id: str, keep: int) -> int:
+        """
+        Delete the oldest events of a session, keeping at most `keep` and
+        cutting only at a user message. Returns the number of events removed.
+        Blocking: call it off the event loop.
+        """
+        from bounded_session_service import turn_boundary
+
+        def trim(conn: sqlite3.Connection) -> int:
+            rows = conn.execute(_SELECT_EVENT_AUTHORS, (app_name, user_id, session_id)).fetchall()
+            cut = turn_boundary([author for _, author in rows], keep)
+            if cut:
+                conn.execute(_DELETE_EVENTS_BEFORE, (app_name, user_id, session_id, rows[cut][0]))
+            return cut
+
+        with self._lock:
+            # Queued events are committed first so they are counted
+            self._commit_locked()
+            return self._transaction([trim])
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        # Applies the state delta to the in-memory session and appends the event
+        event = await super().append_event(session, event)
+
+        state_delta = event.actions.state_delta if event.actions else None
+        app_state, user_state, session_state = _split_state(state_delta)
+        key = (session.app_name, session.user_id, session.id)
+        data = event.model_dump_json(exclude_none=True)
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(_INSERT_EVENT, (*key, event.id, event.timestamp, data))
+            if session_state:
+                # Replaced key by key, like ADK does for the in-memory session
+                row = conn.execute(_SELECT_SESSION, key).fetchone()
+                state = {**(json.loads(row[0]) if row else {}), **session_state}
+                conn.execute(_UPDATE_SESSION, (json.dumps(state), event.timestamp, *key))
+            else:
+                conn.execute(_TOUCH_SESSION, (event.timestamp, *key))
+            self._patch_shared_state(conn, session.app_name, session.user_id, app_state, user_state, event.timestamp)
+
+        # Committed at turn boundaries so other workers see complete turns
+        if await self._run(self._queue_write, write, event.is_final_response()):
+            self._arm_commit_timer()
+
+        session.last_update_time = event.timestamp
+        return event
@@ -0,0 +1,70 @@
+"""Route selection with avoid_stairs"""
+import json
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from tools.directions import _format_route  # noqa: E402
+from tools.polyline import encode  # noqa: E402
+
+
+def _route(summary, seconds, meters, instructions):
+    steps = [
+        {
+            "html_instructions": text,
+            "distance": {"text": f"{meters // len(instructions)} m", "value": meters // len(instructions)},
+            "duration": {"text": f"{seconds // len(instructions)} s", "value": seconds // len(instructions)},
+            "start_location": {"lat": 50.45, "lng": 30.52 + index * 0.001},
+        }
+        for index, text in enumerate(instructions)
+    ]
+    return {
+        "summary": summary,
+        "bounds": {"northeast": {"lat": 50.46, "lng": 30.53}, "southwest": {"lat": 50.45, "lng": 30.52}},
+        "overview_polyline": {"points": encode([(50.45, 30.52), (50.46, 30.53)])},
+        "legs": [{
+            "start_address": "A",
+            "end_address": "B",
+            "duration": {"text": f"{seconds // 60} mins", "value": seconds},
+            "distance": {"text": f"{meters} m", "value": meters},
+            "steps": steps,
+        }],
+    }
+
+
+def _directions(*routes):
+    return {"status": "OK", "routes": list(routes)}
+
+
+def test_stair_free_route_wins_however_much_longer():
+    data = _directions(
+        _route("Stairs", 600, 800, ["Head north", "Take the stairs down"]),
+        _route("Ramp", 900, 1200, ["Head north", "Continue onto the ramp"]),
+    )
+    result = json.loads(_format_route(data, avoid_stairs=True, view="full"))
+    assert result["summary"] == "Ramp"
+    assert result["stair_free"] is True
+    assert result["alternatives"][0]["summary"] == "Stairs"
+    assert result["alternatives"][0]["stair_free"] is False
+
+
+def test_stair_route_only_when_every_route_has_stairs():
+    data = _directions(
+        _route("Escalator", 900, 1200, ["Take the escalator up"]),
+        _route("Stairs", 600, 800, ["Take the stairs down"]),
+    )
+    result = json.loads(_format_route(data, avoid_stairs=True, view="full"))
+    assert result["summary"] == "Stairs"
+    assert result["stair_free"] is False
+    assert "No stair-free route" in result["accessibility_notes"]
+
+
+def test_stairs_not_penalized_without_avoid_stairs():
+    data = _directions(
+        _route("Stairs", 600, 800, ["Head north", "Take the stairs down"]),
+        _route("Ramp", 900, 1200, ["Head north", "Continue onto the ramp"]),
+    )
+    result = json.loads(_format_route(data, avoid_stairs=False, view="full"))
+    assert result["summary"] == "Stairs"
+    assert "stair_free" not in result
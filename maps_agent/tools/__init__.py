@@ -1,12 +1,42 @@
 """
 Custom tools for Maps Agent
+FunctionTool wrappers are built on first access so importing this package
+does not pull in google.adk. They are ConcurrentFunctionTools (see
+parallel.py).
+
+These are library tools: root_agent and streaming_agent don't register
+them, since Gemini can't combine the built-in google_maps_grounding with
+function declarations in one agent. Register them on an agent of your own.
 """
-from google.adk.tools import FunctionTool
-from .directions import get_accessible_route as _get_accessible_route
-from .directions import get_place_directions_url as _get_place_directions_url
+from . import directions, matrix, places
+
+# Tool name -> plain function to wrap
+_TOOL_FUNCTIONS = {
+    "get_accessible_route": directions.get_accessible_route,
+    "get_accessible_route_async": directions.get_accessible_route_async,
+    "get_place_directions_url": directions.get_place_directions_url,
+    "get_accessible_travel_matrix": matrix.get_accessible_travel_matrix,
+    "find_places": places.find_places,
+    "find_places_async": places.find_places_async,
+}
+
+__all__ = [
+    "get_accessible_route",
+    "get_accessible_route_async",
+    "get_place_directions_url",
+    "get_accessible_travel_matrix",
+    "find_places",
+    "find_places_async",
+]
+
+
+def __getattr__(name):
+    if name in _TOOL_FUNCTIONS:
+        from .parallel import ConcurrentFunctionTool
 
-# Wrap functions with FunctionTool
-get_accessible_route = FunctionTool(func=_get_accessible_route)
-get_place_directions_url = FunctionTool(func=_get_place_directions_url)
+        # Wrap functions with FunctionTool, running concurrently within a turn
+        tool = ConcurrentFunctionTool(func=_TOOL_FUNCTIONS[name])
+        globals()[name] = tool
+        return tool
 
-__all__ = ["get_accessible_route", "get_place_directions_url"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,114 @@
+"""
+Per-endpoint circuit breaker for Maps API calls
+When an endpoint degrades, every call would otherwise wait out its full
+timeout (and retries) inside an LLM turn. After enough consecutive
+failures the breaker opens and calls fail fast with CircuitOpenError, so
+tools can answer from cache or with a degraded result straight away.
+
+- closed: calls go through; consecutive failures are counted
+- open: calls are rejected until the cooldown has passed
+- half-open: one probe call goes through; success closes the breaker,
+  failure opens it for another cooldown
+"""
+import os
+import threading
+import time
+from typing import Any, Dict
+
+# Consecutive failures that open the breaker, and seconds it stays open
+MAPS_BREAKER_FAILURES = int(os.getenv("MAPS_BREAKER_FAILURES", "5"))
+MAPS_BREAKER_COOLDOWN = float(os.getenv("MAPS_BREAKER_COOLDOWN", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"{endpoint} is unavailable, retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one endpoint.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker
+        cooldown: Seconds the breaker stays open before a probe is let through
+    """
+
+    def __init__(self, failure_threshold: int = MAPS_BREAKER_FAILURES, cooldown: float = MAPS_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.counters = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        """State with the cooldown applied (lock held)"""
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; a True in half-open state claims the probe"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            # A probe that never reported back (e.g. cancelled) is given up after a cooldown
+            if state == HALF_OPEN and (not self._probing or now - self._probe_started >= self.cooldown):
+                self._probing = True
+                self._probe_started = now
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be let through"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def record(self, success: bool) -> None:
+        """Outcome of a call that was allowed through"""
+        with self._lock:
+            if success:
+                self._state = CLOSED
+                self._failures = 0
+                self._probing = False
+                return
+            self._failures += 1
+            # Calls that were already in flight when it opened don't extend the cooldown
+            if self._state == OPEN:
+                return
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.counters["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._failures,
+                **self.counters,
+            }
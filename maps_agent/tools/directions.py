@@ -2,10 +2,44 @@
 Custom function tools for Google Directions API
 Following ADK best practices for function tools
 """
+import html
+import json
 import os
-import requests
+import re
+import urllib.parse
 from typing import Dict, List, Optional
 
+from .circuit_breaker import CircuitOpenError
+from .encoding import encode_result
+from .maps_client import get_async_maps_client, get_maps_client
+from .rate_limiter import RateLimitedError, get_rate_limiter
+from .route_cache import RouteCache, get_route_cache, route_key
+from .single_flight import get_single_flight
+
+DIRECTIONS_URL = "https://maps.googleapis.com/maps/api/directions/json"
+
+# Max deviation in metres allowed when simplifying route geometry
+ROUTE_SIMPLIFY_TOLERANCE_M = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE_M", "5"))
+
+# "google" (Directions API), "local" (offline walking graph only), or "auto"
+# (offline graph when it can answer, Directions API otherwise)
+ROUTE_BACKEND = os.getenv("ROUTE_BACKEND", "google").lower()
+
+# Route scoring weights: cost per hazard, and per multiple of the best time/distance
+ROUTE_WEIGHT_HAZARD = float(os.getenv("ROUTE_WEIGHT_HAZARD", "1.0"))
+ROUTE_WEIGHT_DURATION = float(os.getenv("ROUTE_WEIGHT_DURATION", "0.5"))
+ROUTE_WEIGHT_DISTANCE = float(os.getenv("ROUTE_WEIGHT_DISTANCE", "0.25"))
+
+# Route score cost of one hazard per severity, relative to ROUTE_WEIGHT_HAZARD
+HAZARD_SEVERITY_WEIGHTS = {"high": 1.0, "medium": 0.5, "low": 0.2}
+
+# Hazard types avoid_stairs rules out: a route with any of them only wins when every alternative has one
+STAIR_HAZARDS = frozenset({"stairs", "escalator"})
+
+_HTML_BLOCK = re.compile(r"<div[^>]*>", re.IGNORECASE)
+_HTML_TAG = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"\s+")
+
 
 def get_accessible_route(
     origin: str,
@@ -33,11 +67,185 @@ def get_accessible_route(
         - accessibility_notes: Accessibility information for the route
         - polyline: Encoded polyline for map display
     """
+    return _route_view(_route(origin, destination, waypoints, avoid_stairs))
+
+
+async def get_accessible_route_async(
+    origin: str,
+    destination: str,
+    waypoints: Optional[str] = None,
+    avoid_stairs: bool = True,
+) -> str:
+    """
+    Calculate an accessible route between two locations using Google Directions API.
+
+    Non-blocking version of get_accessible_route for async servers: while
+    the Directions API responds, other sessions keep running.
+
+    Args:
+        origin: Starting location (address, place name, or coordinates)
+        destination: Ending location (address, place name, or coordinates)
+        waypoints: Optional intermediate stops (comma-separated)
+        avoid_stairs: Whether to avoid routes with stairs (default: True)
+
+    Returns:
+        Same JSON result as get_accessible_route
+    """
+    return _route_view(await _route_async(origin, destination, waypoints, avoid_stairs))
+
+
+def _route_view(result: str, view: Optional[str] = None) -> str:
+    """A full-view route result re-encoded for one consumer (view: see encoding.VIEWS)"""
+    return encode_result(json.loads(result), "route", view)
+
+
+def _route(origin: str, destination: str, waypoints: Optional[str], avoid_stairs: bool) -> str:
+    """
+    get_accessible_route's result in the "full" view. Cached and coalesced
+    results are full, so every caller can cut them down to its own view.
+    """
+    local = _local_route(origin, destination, waypoints, avoid_stairs)
+    if local is not None:
+        return local
+
+    # Deferred: requests is only needed once a route is actually fetched
+    import requests
+
+    params = _route_params(origin, destination, waypoints)
+    if params is None:
+        return json.dumps({"error": "GOOGLE_API_KEY not configured"})
+
+    cache = get_route_cache()
+    key = route_key(origin, destination, waypoints, params["mode"], avoid_stairs)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def fetch() -> str:
+        try:
+            response = get_maps_client().get(DIRECTIONS_URL, params=params, endpoint="directions")
+            response.raise_for_status()
+            data = response.json()
+            if data.get("status") == "OVER_QUERY_LIMIT":
+                raise _over_query_limit(params)
+            return _format_and_cache(data, cache, key, avoid_stairs)
+        except (CircuitOpenError, RateLimitedError) as e:
+            return _fallback_route(cache, key, origin, destination, waypoints, avoid_stairs, e)
+        except requests.RequestException as e:
+            return _fallback_route(cache, key, origin, destination, waypoints, avoid_stairs, e)
+
+    # Concurrent calls for the same trip share one request
+    return get_single_flight().do("directions", key, fetch)
+
+
+async def _route_async(origin: str, destination: str, waypoints: Optional[str], avoid_stairs: bool) -> str:
+    """Async version of _route"""
+    local = _local_route(origin, destination, waypoints, avoid_stairs)
+    if local is not None:
+        return local
+
+    # Deferred: httpx is only needed once a route is actually fetched
+    import httpx
+
+    params = _route_params(origin, destination, waypoints)
+    if params is None:
+        return json.dumps({"error": "GOOGLE_API_KEY not configured"})
+
+    cache = get_route_cache()
+    key = route_key(origin, destination, waypoints, params["mode"], avoid_stairs)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch() -> str:
+        try:
+            response = await get_async_maps_client().get(DIRECTIONS_URL, params=params, endpoint="directions")
+            response.raise_for_status()
+            data = response.json()
+            if data.get("status") == "OVER_QUERY_LIMIT":
+                raise _over_query_limit(params)
+            return _format_and_cache(data, cache, key, avoid_stairs)
+        except (CircuitOpenError, RateLimitedError) as e:
+            return _fallback_route(cache, key, origin, destination, waypoints, avoid_stairs, e)
+        # A malformed body raises json.JSONDecodeError, which httpx doesn't wrap like requests does
+        except (httpx.HTTPError, ValueError) as e:
+            return _fallback_route(cache, key, origin, destination, waypoints, avoid_stairs, e)
+
+    # Concurrent calls for the same trip share one request, sync or async
+    return await get_single_flight().do_async("directions", key, fetch)
+
+
+def _local_route(origin: str, destination: str, waypoints: Optional[str], avoid_stairs: bool) -> Optional[str]:
+    """Result from the offline walking graph, or None to ask the Directions API"""
+    if ROUTE_BACKEND not in ("local", "auto"):
+        return None
+
+    result = _offline_route(origin, destination, waypoints, avoid_stairs)
+    if result is None and ROUTE_BACKEND == "local":
+        return json.dumps({
+            "error": "No offline route found",
+            "message": "The offline router needs \"lat,lng\" origin and destination inside the loaded map extract",
+        })
+    return result
+
+
+def _offline_route(origin: str, destination: str, waypoints: Optional[str], avoid_stairs: bool) -> Optional[str]:
+    """Result from the offline walking graph, or None if none is loaded or it can't answer"""
+    from .walk_graph import get_walk_graph, parse_point
+
+    graph = get_walk_graph()
+    start, end = parse_point(origin), parse_point(destination)
+    # Offline routing needs coordinates: there is no geocoder without the API
+    if graph is None or not start or not end or waypoints:
+        return None
+    walk = graph.route(start, end, avoid_stairs)
+    return _format_walk(graph, walk) if walk is not None else None
+
+
+def _over_query_limit(params: Dict[str, str]) -> RateLimitedError:
+    """
+    The Directions API reports exhausted quota in the body of a 200
+    response: pause the shared bucket so every process backs off
+    """
+    return RateLimitedError("directions", get_rate_limiter().penalize("directions", params["key"]))
+
+
+def _fallback_route(
+    cache: RouteCache,
+    key: str,
+    origin: str,
+    destination: str,
+    waypoints: Optional[str],
+    avoid_stairs: bool,
+    error: Exception,
+) -> str:
+    """
+    Best answer without the Directions API: an expired cached route marked
+    stale, else an offline route, else the error (with retry_after when
+    the endpoint's circuit breaker is open or its rate limit is reached)
+    """
+    stale = cache.get_stale(key)
+    if stale is not None:
+        return encode_result({**json.loads(stale), "stale": True}, "route", "full")
+
+    offline = _offline_route(origin, destination, waypoints, avoid_stairs)
+    if offline is not None:
+        return offline
+
+    if isinstance(error, (CircuitOpenError, RateLimitedError)):
+        return json.dumps({
+            "error": "Directions are temporarily unavailable",
+            "retry_after": round(error.retry_after),
+        })
+    return json.dumps({"error": f"Failed to fetch directions: {str(error)}"})
+
+
+def _route_params(origin: str, destination: str, waypoints: Optional[str]) -> Optional[Dict[str, str]]:
+    """Directions API query parameters, or None if no API key is configured"""
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
-        import json
-        return json.dumps({"error": "GOOGLE_API_KEY not configured"})
-    
+        return None
+
     # Build request parameters
     params = {
         "origin": origin,
@@ -46,80 +254,273 @@ def get_accessible_route(
         "alternatives": "true",  # Get alternative routes
         "key": api_key,
     }
-    
+
     # Add waypoints if provided
     if waypoints:
         params["waypoints"] = waypoints
-    
-    try:
-        response = requests.get(
-            "https://maps.googleapis.com/maps/api/directions/json",
-            params=params,
-            timeout=10,
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        if data["status"] != "OK":
-            import json
+    return params
+
+
+def _format_and_cache(data: Dict, cache: RouteCache, key: str, avoid_stairs: bool = True) -> str:
+    """Format a Directions API response in the full view, caching it if it found a route"""
+    result = _format_route(data, avoid_stairs, view="full")
+    if data.get("status") == "OK":
+        cache.put(key, result)
+    return result
+
+
+def _plain_text(html_instructions: str) -> str:
+    """Directions step instruction without HTML markup"""
+    # Notes like "Destination will be on the right" come in their own <div>
+    text = _HTML_BLOCK.sub(". ", html_instructions)
+    text = _HTML_TAG.sub("", text)
+    return _SPACES.sub(" ", html.unescape(text)).strip(" .")
+
+
+def score_routes(hazards, durations, distances):
+    """
+    Route scores, lower is better.
+
+    `hazards` is the severity-weighted hazard load per route, which costs
+    ROUTE_WEIGHT_HAZARD per unit; time and distance cost their weight times
+    the ratio to the best alternative.
+    """
+    import numpy as np
+
+    durations = np.asarray(durations, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    return (
+        ROUTE_WEIGHT_HAZARD * np.asarray(hazards, dtype=np.float64)
+        + ROUTE_WEIGHT_DURATION * durations / max(durations.min(), 1.0)
+        + ROUTE_WEIGHT_DISTANCE * distances / max(distances.min(), 1.0)
+    )
+
+
+def rank_routes(scores, has_stairs, avoid_stairs: bool = True) -> List[int]:
+    """
+    Route indices, best first.
+
+    When avoiding stairs, routes without stairs or escalators all rank ahead
+    of routes with them, however much longer they are; scores order the
+    routes within each tier.
+    """
+    import numpy as np
+
+    if avoid_stairs:
+        order = np.lexsort((scores, np.asarray(has_stairs, dtype=bool)))
+    else:
+        order = np.argsort(scores, kind="stable")
+    return [int(index) for index in order]
+
+
+def _format_route(data: Dict, avoid_stairs: bool = True, view: Optional[str] = None) -> str:
+    """Turn a Directions API response into the tool's JSON result (view: see encoding.VIEWS)"""
+    if data["status"] != "OK":
         return json.dumps({
-                "error": f"Directions API error: {data.get('status')}",
-                "message": data.get("error_message", "Unknown error"),
-            })
-        
-        # Get the best route (first route is usually optimal)
-        route = data["routes"][0]
-        leg = route["legs"][0]
-        
-        # Extract steps with accessibility considerations
-        steps = []
-        for step in leg["steps"]:
-            step_info = {
-                "instruction": step["html_instructions"],
-                "distance": step["distance"]["text"],
-                "duration": step["duration"]["text"],
-                "travel_mode": step.get("travel_mode", "WALKING"),
+            "error": f"Directions API error: {data.get('status')}",
+            "message": data.get("error_message", "Unknown error"),
+        })
+
+    # Deferred: numpy is only needed once a route is actually formatted
+    import numpy as np
+
+    from .elevation import analyze_slope, get_elevation_grid
+    from .hazards import HAZARD_WARNINGS, SEVERITIES, get_hazard_engine
+    from .polyline import decode, encode, simplify, step_coordinates
+
+    # Analyze the steps of every alternative in one pass, then pick the best
+    routes = data["routes"]
+    legs = [route["legs"][0] for route in routes]
+    instructions = [[_plain_text(step["html_instructions"]) for step in leg["steps"]] for leg in legs]
+    step_counts = [len(texts) for texts in instructions]
+    first_steps = np.concatenate(([0], np.cumsum(step_counts)[:-1])).astype(int)
+    found = get_hazard_engine().scan([text for texts in instructions for text in texts])
+
+    # Hazards per route: count, stairs, and severity-weighted load for scoring
+    route_of_step = np.repeat(np.arange(len(routes)), step_counts)
+    hazard_routes = route_of_step[[hazard.step for hazard in found]].astype(int)
+    hazard_counts = np.bincount(hazard_routes, minlength=len(routes))
+    is_stairs = np.array([hazard.type in STAIR_HAZARDS for hazard in found], dtype=bool)
+    has_stairs = np.bincount(hazard_routes[is_stairs], minlength=len(routes)) > 0
+    # Stairs only cost anything when they are to be avoided
+    hazard_load = np.bincount(
+        hazard_routes,
+        weights=[
+            0.0 if stairs and not avoid_stairs else HAZARD_SEVERITY_WEIGHTS[hazard.severity]
+            for hazard, stairs in zip(found, is_stairs)
+        ],
+        minlength=len(routes),
+    )
+    durations = [leg["duration"].get("value", 0) for leg in legs]
+    distances = [leg["distance"].get("value", 0) for leg in legs]
+    scores = score_routes(hazard_load, durations, distances)
+    ranking = rank_routes(scores, has_stairs, avoid_stairs)
+
+    best = ranking[0]
+    route, leg = routes[best], legs[best]
+    # Hazards of the chosen route, with step indices local to it
+    hazards = [
+        hazard._replace(step=int(hazard.step - first_steps[best]))
+        for hazard, route_index in zip(found, hazard_routes)
+        if route_index == best
+    ]
+    worst_by_step = {}
+    for hazard in hazards:
+        current = worst_by_step.get(hazard.step)
+        if current is None or SEVERITIES.index(hazard.severity) < SEVERITIES.index(current.severity):
+            worst_by_step[hazard.step] = hazard
+
+    # Extract steps with accessibility considerations
+    steps = []
+    for index, step in enumerate(leg["steps"]):
+        step_info = {
+            "instruction": instructions[best][index],
+            "distance": step["distance"]["text"],
+            "duration": step["duration"]["text"],
+        }
+        # Walking is the default; only note steps that aren't
+        if step.get("travel_mode", "WALKING") != "WALKING":
+            step_info["travel_mode"] = step["travel_mode"]
+
+        # Most severe obstacle mentioned in the instruction
+        if index in worst_by_step:
+            step_info["accessibility_warning"] = HAZARD_WARNINGS[worst_by_step[index].type]
+
+        steps.append(step_info)
+
+    # Measured gradients from local elevation data, when available
+    grid = get_elevation_grid()
+    slope = grid and analyze_slope([step_coordinates(step) for step in leg["steps"]], grid)
+    if slope:
+        for segment in slope["steep_segments"]:
+            steps[segment["step"]].setdefault("accessibility_warning", HAZARD_WARNINGS["steep"])
+
+    # Build result
+    result = {
+        "status": "success",
+        "origin": leg["start_address"],
+        "destination": leg["end_address"],
+        "duration": leg["duration"]["text"],
+        "distance": leg["distance"]["text"],
+        # Raw values so routes can be compared without parsing "12 mins"
+        "duration_seconds": leg["duration"].get("value"),
+        "distance_meters": leg["distance"].get("value"),
+        "summary": route.get("summary", ""),
+        "hazards": [hazard.to_dict() for hazard in hazards],
+        "steps": steps,
+        # Simplified geometry: plenty for map display at street level
+        "polyline": encode(simplify(decode(route["overview_polyline"]["points"]), ROUTE_SIMPLIFY_TOLERANCE_M)),
+        "bounds": route["bounds"],
+        "accessibility_notes": _generate_accessibility_notes(steps),
+    }
+    if avoid_stairs:
+        result["stair_free"] = not has_stairs[best]
+        if has_stairs[best]:
+            result["accessibility_notes"] = (
+                "⚠️ No stair-free route was found; this route has stairs or escalators. "
+                + result["accessibility_notes"]
+            )
+    if slope:
+        result["slope"] = slope
+
+    # Other alternatives, best first
+    if len(routes) > 1:
+        result["alternatives"] = [
+            {
+                "duration": legs[index]["duration"]["text"],
+                "distance": legs[index]["distance"]["text"],
+                "summary": routes[index].get("summary", "Alternative route"),
+                "hazard_count": int(hazard_counts[index]),
+                "stair_free": not has_stairs[index],
+                "score": round(float(scores[index]), 2),
             }
-            
-            # Check for stairs or steep inclines in instructions
-            instruction_lower = step["html_instructions"].lower()
-            if "stair" in instruction_lower:
-                step_info["accessibility_warning"] = "⚠️ This step may involve stairs"
-            elif "steep" in instruction_lower:
-                step_info["accessibility_warning"] = "⚠️ This step may be steep"
-            
-            steps.append(step_info)
-        
-        # Build result
-        result = {
-            "status": "success",
-            "origin": leg["start_address"],
-            "destination": leg["end_address"],
-            "duration": leg["duration"]["text"],
-            "distance": leg["distance"]["text"],
-            "steps": steps,
-            "polyline": route["overview_polyline"]["points"],
-            "bounds": route["bounds"],
-            "accessibility_notes": _generate_accessibility_notes(steps),
+            for index in ranking[1:]
+        ]
+        result["score"] = round(float(scores[best]), 2)
+
+    return encode_result(result, "route", view)
+
+
+def _distance_text(meters: float) -> str:
+    return f"{meters / 1000:.1f} km" if meters >= 1000 else f"{int(round(meters, -1)) or 1} m"
+
+
+def _duration_text(seconds: float) -> str:
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    text = f"{minutes} min{'s' if minutes != 1 else ''}"
+    if hours:
+        text = f"{hours} hour{'s' if hours != 1 else ''} {text}"
+    return text
+
+
+_COMPASS = ("north", "northeast", "east", "southeast", "south", "southwest", "west", "northwest")
+
+
+def _walk_instruction(step, previous) -> str:
+    """Directions-style instruction for a step of an offline route"""
+    if previous is None:
+        return f"Head {_COMPASS[round(step.bearing_in / 45) % 8]} on {step.name}"
+    turn = (step.bearing_in - previous.bearing_out + 540) % 360 - 180
+    if abs(turn) < 30:
+        return f"Continue onto {step.name}"
+    side = "right" if turn > 0 else "left"
+    if abs(turn) < 60:
+        return f"Slight {side} onto {step.name}"
+    return f"Turn {side} onto {step.name}"
+
+
+def _format_walk(graph, walk) -> str:
+    """Turn an offline walking graph route into the tool's JSON result in the full view"""
+    import numpy as np
+
+    from .hazards import HAZARD_SEVERITY, HAZARD_WARNINGS, SEVERITIES, Hazard
+    from .polyline import encode, simplify
+    from .walk_graph import FLAG_HAZARDS, WHEELCHAIR_SPEED_MPS
+
+    walk_steps = graph.steps(walk)
+    steps, hazards, previous = [], [], None
+    for index, step in enumerate(walk_steps):
+        step_info = {
+            "instruction": _walk_instruction(step, previous),
+            "distance": _distance_text(step.length_m),
+            "duration": _duration_text(step.length_m / WHEELCHAIR_SPEED_MPS),
         }
-        
-        # Add alternative routes if available
-        if len(data["routes"]) > 1:
-            result["alternatives"] = [
-                {
-                    "duration": r["legs"][0]["duration"]["text"],
-                    "distance": r["legs"][0]["distance"]["text"],
-                    "summary": r.get("summary", "Alternative route"),
-                }
-                for r in data["routes"][1:3]  # Up to 2 alternatives
-            ]
-        
-        import json
-        return json.dumps(result)
-        
-    except requests.RequestException as e:
-        import json
-        return json.dumps({"error": f"Failed to fetch directions: {str(e)}"})
+        step_hazards = [
+            Hazard(index, hazard_type, HAZARD_SEVERITY[hazard_type], tag, "osm")
+            for flag, (hazard_type, tag) in FLAG_HAZARDS.items()
+            if step.flags & flag
+        ]
+        if step_hazards:
+            worst = min(step_hazards, key=lambda hazard: SEVERITIES.index(hazard.severity))
+            step_info["accessibility_warning"] = HAZARD_WARNINGS[worst.type]
+        hazards += step_hazards
+        steps.append(step_info)
+        previous = step
+
+    lat, lng = graph.lat[walk.nodes], graph.lng[walk.nodes]
+    named = [step for step in walk_steps if step.named]
+    duration = walk.length_m / WHEELCHAIR_SPEED_MPS
+    result = {
+        "status": "success",
+        "backend": "offline",
+        "origin": f"{lat[0]:.5f},{lng[0]:.5f}",
+        "destination": f"{lat[-1]:.5f},{lng[-1]:.5f}",
+        "duration": _duration_text(duration),
+        "distance": _distance_text(walk.length_m),
+        "duration_seconds": round(duration),
+        "distance_meters": round(walk.length_m),
+        "summary": max(named, key=lambda step: step.length_m).name if named else "",
+        "hazards": [hazard.to_dict() for hazard in hazards],
+        "steps": steps,
+        "polyline": encode(simplify(np.column_stack((lat, lng)), ROUTE_SIMPLIFY_TOLERANCE_M)),
+        "bounds": {
+            "northeast": {"lat": float(lat.max()), "lng": float(lng.max())},
+            "southwest": {"lat": float(lat.min()), "lng": float(lng.min())},
+        },
+        "accessibility_notes": _generate_accessibility_notes(steps),
+    }
+    return encode_result(result, "route", "full")
 
 
 def _generate_accessibility_notes(steps: List[Dict]) -> str:
@@ -152,8 +553,6 @@ def get_place_directions_url(
     Returns:
         Google Maps URL that opens directions
     """
-    import urllib.parse
-    
     base_url = "https://www.google.com/maps/dir/"
     params = {
         "api": "1",
@@ -0,0 +1,226 @@
+"""
+Offline slope analysis from local elevation tiles
+Instructions only say "steep" when the street name or a note does; the
+gradient itself comes from a digital elevation model (DEM) on local disk,
+so it costs milliseconds and no API call.
+
+Tiles are SRTM-style .hgt files: a square grid of big-endian int16 heights
+in metres covering one 1 x 1 degree cell, named after its south-west corner
+(N52E013.hgt), 1201 (3 arc-second) or 3601 (1 arc-second) samples per side,
+northernmost row first. Tiles are memory-mapped, so only the pages a route
+touches are read from disk.
+
+- ElevationGrid.sample: vectorized bilinear interpolation at many points
+- analyze_slope: resample a route at fixed spacing, sample heights, and
+  report max/mean gradient and the segments above the slope thresholds
+"""
+import math
+import os
+import pathlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Directory of .hgt tiles; slope analysis is off when unset
+ELEVATION_DEM_DIR = os.getenv("ELEVATION_DEM_DIR", "")
+
+# Route resampling spacing, and the baseline each gradient is measured over
+# (shorter baselines mostly measure DEM noise)
+SLOPE_SAMPLE_SPACING_M = float(os.getenv("SLOPE_SAMPLE_SPACING_M", "10"))
+SLOPE_WINDOW_M = float(os.getenv("SLOPE_WINDOW_M", "30"))
+
+# Gradients in percent: above WARN a ramp would need handrails, above MAX
+# it is steeper than the steepest ramp allowed for wheelchairs (1:12)
+SLOPE_WARN_PERCENT = float(os.getenv("SLOPE_WARN_PERCENT", "5"))
+SLOPE_MAX_PERCENT = float(os.getenv("SLOPE_MAX_PERCENT", "8.33"))
+
+EARTH_RADIUS_M = 6371000.0
+
+# Height of missing samples in .hgt tiles
+_VOID = -32768
+
+
+def tile_name(lat: int, lng: int) -> str:
+    """.hgt file name of the tile whose south-west corner is (lat, lng)"""
+    return f"{'N' if lat >= 0 else 'S'}{abs(lat):02d}{'E' if lng >= 0 else 'W'}{abs(lng):03d}.hgt"
+
+
+class ElevationGrid:
+    """
+    Memory-mapped .hgt tiles from one directory, opened on first use.
+
+    Args:
+        directory: Directory containing the tiles
+    """
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self._lock = threading.Lock()
+        # (lat, lng) of the south-west corner -> heights, or None if there is no tile
+        self._tiles: Dict[Tuple[int, int], Optional[np.ndarray]] = {}
+
+    def _tile(self, lat: int, lng: int) -> Optional[np.ndarray]:
+        key = (lat, lng)
+        if key not in self._tiles:
+            with self._lock:
+                if key not in self._tiles:
+                    self._tiles[key] = self._open(self.directory / tile_name(lat, lng))
+        return self._tiles[key]
+
+    @staticmethod
+    def _open(path: pathlib.Path) -> Optional[np.ndarray]:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        side = math.isqrt(size // 2)
+        if side < 2 or side * side * 2 != size:
+            return None
+        return np.memmap(path, dtype=">i2", mode="r", shape=(side, side))
+
+    def sample(self, lat, lng) -> np.ndarray:
+        """
+        Heights in metres at the given points.
+
+        Args:
+            lat: Latitudes, array-like
+            lng: Longitudes, array-like of the same shape
+
+        Returns:
+            float64 array of heights; NaN where there is no tile or no data
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        heights = np.full(lat.shape, np.nan)
+        if lat.size == 0:
+            return heights
+
+        corners = np.stack((np.floor(lat), np.floor(lng)), axis=-1).reshape(-1, 2).astype(int)
+        keys, tile_of_point = np.unique(corners, axis=0, return_inverse=True)
+        flat = heights.reshape(-1)
+        for index, (tile_lat, tile_lng) in enumerate(keys):
+            grid = self._tile(int(tile_lat), int(tile_lng))
+            if grid is None:
+                continue
+            points = np.flatnonzero(tile_of_point.reshape(-1) == index)
+            last = grid.shape[0] - 1
+            # Fractional row/column; rows run north to south
+            rows = (tile_lat + 1 - lat.reshape(-1)[points]) * last
+            cols = (lng.reshape(-1)[points] - tile_lng) * last
+            row0 = np.clip(np.floor(rows).astype(int), 0, last - 1)
+            col0 = np.clip(np.floor(cols).astype(int), 0, last - 1)
+            drow = (rows - row0)[:, None]
+            dcol = cols - col0
+
+            # Only the 2 x 2 neighbourhoods of the points are read from the map
+            corner_heights = np.stack((
+                grid[row0, col0], grid[row0, col0 + 1],
+                grid[row0 + 1, col0], grid[row0 + 1, col0 + 1],
+            ), axis=1).astype(np.float64)
+            corner_heights[corner_heights == _VOID] = np.nan
+            north = corner_heights[:, 0] * (1 - dcol) + corner_heights[:, 1] * dcol
+            south = corner_heights[:, 2] * (1 - dcol) + corner_heights[:, 3] * dcol
+            flat[points] = north * (1 - drow[:, 0]) + south * drow[:, 0]
+        return heights
+
+
+def _along_m(coords: np.ndarray) -> np.ndarray:
+    """Cumulative distance in metres at each point of a (lat, lng) line"""
+    if len(coords) < 2:
+        return np.zeros(len(coords))
+    lat = np.radians(coords[:, 0])
+    dx = np.diff(np.radians(coords[:, 1])) * np.cos((lat[1:] + lat[:-1]) / 2)
+    dy = np.diff(lat)
+    return np.concatenate(([0.0], np.cumsum(np.hypot(dx, dy) * EARTH_RADIUS_M)))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """(start, end) index pairs, end exclusive, of the True runs in a mask"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def analyze_slope(
+    step_coords: Sequence,
+    grid: Optional[ElevationGrid] = None,
+    spacing_m: float = SLOPE_SAMPLE_SPACING_M,
+    window_m: float = SLOPE_WINDOW_M,
+) -> Optional[Dict[str, Any]]:
+    """
+    Gradient profile of a route.
+
+    Args:
+        step_coords: (N, 2) array of (lat, lng) per route step, in order
+        grid: Elevation tiles (default: get_elevation_grid())
+        spacing_m: Distance between height samples along the route
+        window_m: Baseline each gradient is measured over
+
+    Returns:
+        max/mean gradient in percent, height range, and the segments steeper
+        than SLOPE_WARN_PERCENT with the step they start in; None if there
+        is too little elevation data along the route to measure a gradient
+    """
+    grid = grid or get_elevation_grid()
+    parts = [np.asarray(coords, dtype=np.float64).reshape(-1, 2) for coords in step_coords]
+    if grid is None or not parts:
+        return None
+
+    coords = np.concatenate(parts)
+    along = _along_m(coords)
+    if len(coords) < 2 or along[-1] <= 0:
+        return None
+    step_starts = along[np.cumsum([0] + [len(part) for part in parts[:-1]])]
+
+    # Resample at fixed spacing so gradients don't depend on polyline density
+    distances = np.linspace(0.0, along[-1], max(2, int(along[-1] // spacing_m) + 1))
+    heights = grid.sample(np.interp(distances, along, coords[:, 0]), np.interp(distances, along, coords[:, 1]))
+    covered = ~np.isnan(heights)
+    if not covered.any():
+        return None
+
+    # Central differences over the window, narrower at the route's ends
+    half = max(1, int(round(window_m / spacing_m / 2)))
+    index = np.arange(len(distances))
+    ahead = np.minimum(index + half, len(distances) - 1)
+    behind = np.maximum(index - half, 0)
+    grades = 100 * (heights[ahead] - heights[behind]) / (distances[ahead] - distances[behind])
+    steepness = np.abs(grades)
+    if not np.isfinite(steepness).any():
+        # Covered samples too scattered for any window to have heights at both ends
+        return None
+
+    segments = []
+    for start, end in _runs(np.nan_to_num(steepness) >= SLOPE_WARN_PERCENT):
+        steepest = start + int(np.argmax(steepness[start:end]))
+        segments.append({
+            "step": int(np.searchsorted(step_starts, distances[start], side="right") - 1),
+            "start_m": round(float(distances[start])),
+            "length_m": round(float(distances[end - 1] - distances[start]) + spacing_m),
+            # Signed in the direction of travel: negative is downhill
+            "max_grade_percent": round(float(grades[steepest]), 1),
+            "severity": "high" if steepness[steepest] >= SLOPE_MAX_PERCENT else "medium",
+        })
+
+    return {
+        "max_grade_percent": round(float(np.nanmax(steepness)), 1),
+        "mean_grade_percent": round(float(np.nanmean(steepness)), 1),
+        "min_elevation_m": round(float(np.nanmin(heights))),
+        "max_elevation_m": round(float(np.nanmax(heights))),
+        "coverage": round(float(covered.mean()), 2),
+        "steep_segments": segments,
+    }
+
+
+_grid: Optional[ElevationGrid] = None
+_grid_lock = threading.Lock()
+
+
+def get_elevation_grid() -> Optional[ElevationGrid]:
+    """Process-wide ElevationGrid over ELEVATION_DEM_DIR, or None if not configured"""
+    global _grid
+    if _grid is None and ELEVATION_DEM_DIR and os.path.isdir(ELEVATION_DEM_DIR):
+        with _grid_lock:
+            if _grid is None:
+                _grid = ElevationGrid(ELEVATION_DEM_DIR)
+    return _grid
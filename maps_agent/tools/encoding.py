@@ -0,0 +1,95 @@
+"""
+Compact encoding of tool results
+Tool results are fed back to the model as input tokens on every later
+turn of a session, so every field, space and digit is paid for repeatedly.
+
+- views: per result kind, the fields the model reasons about ("llm"), or
+  everything ("full"); the llm view leaves out route geometry (polyline,
+  bounds), which only a map would draw
+- minified JSON, non-ASCII kept as is ("Straße", not "Stra\\u00dfe")
+- floats rounded to 5 decimals (~1 m for coordinates); fields keep their
+  shape, so coordinates stay {"lat": .., "lng": ..} objects
+
+Tools encode with TOOL_RESULT_VIEW (default "llm"); HTML is stripped from
+route instructions when the route is formatted, before any encoding.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+
+# View the tools return to the model: "llm" (compact) or "full" (every field)
+TOOL_RESULT_VIEW = os.getenv("TOOL_RESULT_VIEW", "llm")
+
+FLOAT_DECIMALS = 5
+
+# A projection lists the fields kept; {"field": projection} projects a
+# nested record, or each record of a nested list
+Projection = List[Union[str, Dict[str, "Projection"]]]
+
+_STATUS_FIELDS = ["status", "error", "message", "retry_after", "stale"]
+
+VIEWS: Dict[str, Dict[str, Projection]] = {
+    "route": {
+        "llm": _STATUS_FIELDS + [
+            "backend", "origin", "destination", "duration", "distance",
+            "duration_seconds", "distance_meters", "summary", "stair_free",
+            {"steps": ["instruction", "distance", "travel_mode", "accessibility_warning"]},
+            {"hazards": ["step", "type", "severity"]},
+            {"slope": ["max_grade_percent", "mean_grade_percent", {"steep_segments": ["step", "max_grade_percent"]}]},
+            {"alternatives": ["duration", "distance", "summary", "hazard_count", "stair_free"]},
+            "accessibility_notes",
+        ],
+    },
+    "places": {
+        "llm": _STATUS_FIELDS + [
+            "query", "cached",
+            {"places": ["name", "address", "rating", "user_ratings", "location"]},
+        ],
+    },
+}
+
+
+def project(value: Any, projection: Projection) -> Any:
+    """Keep only the projected fields of a record, or of each record in a list"""
+    if isinstance(value, list):
+        return [project(item, projection) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for field in projection:
+        if isinstance(field, dict):
+            for name, nested in field.items():
+                if name in value:
+                    projected[name] = project(value[name], nested)
+        elif field in value:
+            projected[field] = value[field]
+    return projected
+
+
+def compact(value: Any) -> Any:
+    """Round floats and drop None/empty values"""
+    if isinstance(value, float):
+        return round(value, FLOAT_DECIMALS)
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: compact(item) for key, item in value.items() if item is not None and item != "" and item != []}
+
+
+def encode_result(result: Dict[str, Any], kind: str, view: Optional[str] = None) -> str:
+    """
+    Tool result as compact JSON.
+
+    Args:
+        result: Full result record
+        kind: Result kind in VIEWS ("route", "places"); other kinds are only compacted
+        view: "llm" or "full" (default: TOOL_RESULT_VIEW)
+
+    Returns:
+        Minified JSON string
+    """
+    projection = VIEWS.get(kind, {}).get(view or TOOL_RESULT_VIEW)
+    if projection is not None:
+        result = project(result, projection)
+    return json.dumps(compact(result), ensure_ascii=False, separators=(",", ":"))
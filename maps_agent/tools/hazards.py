@@ -0,0 +1,212 @@
+"""
+Multilingual hazard detection for route instructions
+Finds accessibility obstacles (stairs, escalators, curbs, steep slopes,
+cobblestones, ...) in Directions step instructions in English, German,
+French and Ukrainian.
+
+All lexicon terms are compiled into one regex, factored as a character
+trie, so each instruction is scanned in a single pass however many terms
+and languages there are; matched words are classified once and memoized.
+
+Terms are word-start anchored stems: "stair" matches "stairs" and
+"staircase", "treppe" matches "Treppen" but not "Rolltreppe", which is
+its own term. Longer terms win over shorter ones at the same position.
+"""
+import re
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+# Severity levels, most severe first
+SEVERITIES = ("high", "medium", "low")
+
+# Hazard type -> severity for a wheelchair user
+HAZARD_SEVERITY: Dict[str, str] = {
+    "stairs": "high",
+    "escalator": "high",
+    "steep": "high",
+    "curb": "medium",
+    "cobblestone": "medium",
+    "unpaved": "medium",
+    "underpass": "medium",
+    "footbridge": "medium",
+    "construction": "medium",
+    "narrow": "low",
+}
+
+# Language -> hazard type -> word-start stems (spaces match any whitespace)
+LEXICON: Dict[str, Dict[str, List[str]]] = {
+    "en": {
+        "stairs": ["stair", "steps", "flight of steps"],
+        "escalator": ["escalator"],
+        "steep": ["steep", "steeply"],
+        "curb": ["curb", "kerb"],
+        "cobblestone": ["cobble", "sett paving"],
+        "unpaved": ["unpaved", "gravel", "dirt path", "dirt road"],
+        "underpass": ["underpass", "pedestrian tunnel", "subway passage"],
+        "footbridge": ["footbridge", "pedestrian bridge", "pedestrian overpass"],
+        "construction": ["construction", "roadworks"],
+        "narrow": ["narrow"],
+    },
+    "de": {
+        "stairs": ["treppe", "stufe", "stiege"],
+        "escalator": ["rolltreppe"],
+        "steep": ["steil", "starke steigung", "starkes gefälle"],
+        "curb": ["bordstein", "bordsteinkante"],
+        "cobblestone": ["kopfsteinpflaster", "pflasterstein"],
+        "unpaved": ["unbefestigt", "schotter", "kies"],
+        "underpass": ["unterführung", "fußgängertunnel", "fussgängertunnel"],
+        "footbridge": ["fußgängerbrücke", "fussgängerbrücke", "überführung"],
+        "construction": ["baustelle", "bauarbeiten"],
+        "narrow": ["schmal", "enge stelle"],
+    },
+    "fr": {
+        "stairs": ["escalier", "marches"],
+        "escalator": ["escalier mécanique", "escalator", "escalators"],
+        "steep": ["raide", "forte pente", "pente raide"],
+        "curb": ["bordure", "trottoir haut"],
+        "cobblestone": ["pavés", "pavé"],
+        "unpaved": ["non goudronné", "non revêtu", "gravier", "chemin de terre"],
+        "underpass": ["passage souterrain"],
+        "footbridge": ["passerelle"],
+        "construction": ["travaux", "chantier"],
+        "narrow": ["étroit"],
+    },
+    "uk": {
+        "stairs": ["сход", "східц"],
+        "escalator": ["ескалатор"],
+        "steep": ["крутий підйом", "крутий спуск", "крутим підйомом", "крутим спуском", "стрімк"],
+        "curb": ["бордюр"],
+        "cobblestone": ["бруків"],
+        "unpaved": ["ґрунтов", "грунтов", "гравій", "без покриття"],
+        "underpass": ["підземний перехід", "підземним переходом", "підземного переходу"],
+        "footbridge": ["надземний перехід", "надземним переходом", "пішохідний міст", "пішохідним мостом"],
+        "construction": ["ремонт", "будівництв"],
+        "narrow": ["вузьк"],
+    },
+}
+
+
+# Hazard type -> step warning shown to the user
+HAZARD_WARNINGS: Dict[str, str] = {
+    "stairs": "⚠️ This step may involve stairs",
+    "escalator": "⚠️ This step may involve an escalator",
+    "steep": "⚠️ This step may be steep",
+    "curb": "⚠️ This step may involve a high curb",
+    "cobblestone": "⚠️ This step may be on cobblestones",
+    "unpaved": "⚠️ This step may be unpaved",
+    "underpass": "⚠️ This step goes through an underpass, which may have stairs",
+    "footbridge": "⚠️ This step crosses a footbridge, which may have stairs",
+    "construction": "⚠️ There may be construction work on this step",
+    "narrow": "⚠️ This step may be narrow",
+}
+
+
+class Hazard(NamedTuple):
+    """One hazard found in one instruction"""
+    step: int
+    type: str
+    severity: str
+    term: str
+    language: str
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"step": self.step, "type": self.type, "severity": self.severity, "term": self.term}
+
+
+def _trie_pattern(stems: List[str]) -> str:
+    """
+    Regex matching any of the stems, factored as a character trie so each
+    position branches on one character instead of trying every term in turn.
+    """
+    trie: Dict[str, dict] = {}
+    for stem in stems:
+        node = trie
+        for char in stem:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A stem ending here makes the longer continuations optional (greedy: longest wins)
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class HazardEngine:
+    """
+    Compiled single-pass matcher over a hazard lexicon.
+
+    Args:
+        lexicon: Language -> hazard type -> stems (default: LEXICON)
+        severity: Hazard type -> severity (default: HAZARD_SEVERITY)
+    """
+
+    def __init__(
+        self,
+        lexicon: Dict[str, Dict[str, List[str]]] = LEXICON,
+        severity: Dict[str, str] = HAZARD_SEVERITY,
+    ):
+        self._severity = severity
+        # stem -> (hazard type, language); the first language listing a stem wins
+        self._stems: Dict[str, Tuple[str, str]] = {}
+        for language, hazards in lexicon.items():
+            for hazard_type, stems in hazards.items():
+                for stem in stems:
+                    self._stems.setdefault(" ".join(stem.lower().split()), (hazard_type, language))
+        self._stem_lengths = sorted({len(stem) for stem in self._stems}, reverse=True)
+        # Matched text -> (hazard type, language); route instructions reuse few words
+        self._terms: Dict[str, Tuple[str, str]] = {}
+
+        # Word-start anchored; the rest of the word (inflection) is consumed too
+        self._pattern = re.compile(rf"(?<!\w)(?:{_trie_pattern(list(self._stems))})\w*")
+
+    def _classify(self, matched: str) -> Tuple[str, str]:
+        """(hazard type, language) of the longest stem the matched text starts with"""
+        found = self._terms.get(matched)
+        if found is None:
+            normalized = " ".join(matched.split())
+            stem = next(normalized[:length] for length in self._stem_lengths if normalized[:length] in self._stems)
+            found = self._terms[matched] = self._stems[stem]
+        return found
+
+    def scan(self, instructions: Sequence[str]) -> List[Hazard]:
+        """
+        Hazards in a batch of plain-text instructions, in step order.
+
+        Args:
+            instructions: Instructions without HTML (see directions._plain_text)
+
+        Returns:
+            One Hazard per (step, hazard type); the first matching term is kept
+        """
+        hazards: List[Hazard] = []
+        for step, text in enumerate(instructions):
+            matched = self._pattern.findall(text.lower())
+            if not matched:
+                continue
+            seen = set()
+            for term in matched:
+                hazard_type, language = self._classify(term)
+                if hazard_type in seen:
+                    continue
+                seen.add(hazard_type)
+                hazards.append(Hazard(step, hazard_type, self._severity.get(hazard_type, "low"), term, language))
+        return hazards
+
+
+_engine = None
+
+
+def get_hazard_engine() -> HazardEngine:
+    """Process-wide HazardEngine built from the default lexicon"""
+    global _engine
+    if _engine is None:
+        _engine = HazardEngine()
+    return _engine
@@ -0,0 +1,529 @@
+"""
+Shared HTTP client for Google Maps Platform APIs
+One pooled requests.Session for every Maps tool call, so connections to
+googleapis.com are kept alive instead of paying a TCP+TLS handshake per call.
+
+- pool sizes and timeouts are configurable from the environment
+- idempotent calls are retried on connection errors and 429/5xx
+  with exponential backoff and full jitter
+- latency, error and retry counts are kept per endpoint
+- a circuit breaker per endpoint fails calls fast while it is down
+  (CircuitOpenError, see circuit_breaker.py)
+- optionally, idempotent calls are hedged: if the first request is slower
+  than the endpoint's p95 latency, a second one is sent and whichever
+  answers first wins
+- every attempt takes a token from the endpoint's rate limit bucket,
+  shared by all local processes using the same API key, and a 429 pauses
+  that bucket for Retry-After (RateLimitedError, see rate_limiter.py)
+
+AsyncMapsClient is the same client on httpx for async tools, so a slow
+Maps call doesn't block the event loop shared by every session.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.parse
+import weakref
+from typing import Any, Dict, Optional
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .rate_limiter import TokenBucket, get_rate_limiter
+
+# Defaults, overridable from the environment
+MAPS_POOL_CONNECTIONS = int(os.getenv("MAPS_POOL_CONNECTIONS", "4"))
+MAPS_POOL_MAXSIZE = int(os.getenv("MAPS_POOL_MAXSIZE", "32"))
+MAPS_CONNECT_TIMEOUT = float(os.getenv("MAPS_CONNECT_TIMEOUT", "3.05"))
+MAPS_READ_TIMEOUT = float(os.getenv("MAPS_READ_TIMEOUT", "10"))
+MAPS_MAX_RETRIES = int(os.getenv("MAPS_MAX_RETRIES", "2"))
+MAPS_RETRY_BACKOFF = float(os.getenv("MAPS_RETRY_BACKOFF", "0.2"))
+
+# Hedge slow idempotent calls with a second request (off by default)
+MAPS_HEDGE_REQUESTS = os.getenv("MAPS_HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+
+# Hedging starts once an endpoint has this many latency samples, and never
+# sends the second request sooner than MAPS_HEDGE_MIN_DELAY seconds
+MAPS_HEDGE_MIN_SAMPLES = int(os.getenv("MAPS_HEDGE_MIN_SAMPLES", "20"))
+MAPS_HEDGE_MIN_DELAY = float(os.getenv("MAPS_HEDGE_MIN_DELAY", "0.05"))
+
+# Responses worth retrying: rate limited or transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Never wait longer than this between attempts, whatever Retry-After says
+MAX_RETRY_DELAY = 5.0
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_SAMPLES = 512
+
+
+class EndpointStats:
+    """Rolling latency and error counters, and the circuit breaker, for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.breaker = CircuitBreaker()
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"requests": self.requests, "errors": self.errors, "retries": self.retries}
+        if self.hedges:
+            summary.update({"hedges": self.hedges, "hedge_wins": self.hedge_wins})
+        summary["breaker"] = self.breaker.summary()
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            summary.update({
+                "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            })
+        return summary
+
+
+class _MapsClientBase:
+    """Pool/timeout/retry settings, backoff and per-endpoint stats shared by both clients"""
+
+    def __init__(
+        self,
+        pool_connections: int = MAPS_POOL_CONNECTIONS,
+        pool_maxsize: int = MAPS_POOL_MAXSIZE,
+        connect_timeout: float = MAPS_CONNECT_TIMEOUT,
+        read_timeout: float = MAPS_READ_TIMEOUT,
+        max_retries: int = MAPS_MAX_RETRIES,
+        retry_backoff: float = MAPS_RETRY_BACKOFF,
+        hedge: bool = MAPS_HEDGE_REQUESTS,
+        stats: Optional[Dict[str, EndpointStats]] = None,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.hedge = hedge
+        # Shared by default, so sync and async calls report under one endpoint
+        self._stats = _shared_stats if stats is None else stats
+
+    def _prepare(self, method: str, url: str, endpoint: Optional[str], idempotent: Optional[bool], kwargs):
+        """
+        Stats bucket, rate limit bucket (None: not limited), attempt count and
+        hedge delay (None: don't hedge) for one call; raises CircuitOpenError
+        if the endpoint's breaker is open
+        """
+        if endpoint is None:
+            parsed = urllib.parse.urlsplit(url)
+            endpoint = parsed.netloc + parsed.path
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        with _stats_lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            hedge_delay = None
+            if self.hedge and idempotent and len(stats.latencies) >= MAPS_HEDGE_MIN_SAMPLES:
+                ordered = sorted(stats.latencies)
+                hedge_delay = max(MAPS_HEDGE_MIN_DELAY, ordered[int(len(ordered) * 0.95)])
+        if not stats.breaker.allow():
+            raise CircuitOpenError(endpoint, stats.breaker.retry_after())
+        bucket = get_rate_limiter().bucket(endpoint, _api_key(kwargs))
+        return stats, bucket, 1 + (self.max_retries if idempotent else 0), hedge_delay
+
+    @staticmethod
+    def _record(stats: EndpointStats, started: float, failed: bool, retrying: bool, healthy: bool) -> None:
+        """Count one attempt; `healthy` is False for connection errors, timeouts and 5xx"""
+        with _stats_lock:
+            stats.requests += 1
+            stats.latencies.append(time.perf_counter() - started)
+            if failed:
+                stats.errors += 1
+            if retrying:
+                stats.retries += 1
+        stats.breaker.record(healthy)
+
+    @staticmethod
+    def _count_hedge(stats: EndpointStats, won: bool) -> None:
+        with _stats_lock:
+            if won:
+                stats.hedge_wins += 1
+            else:
+                stats.hedges += 1
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_DELAY)
+        return random.uniform(0, min(self.retry_backoff * (2 ** attempt), MAX_RETRY_DELAY))
+
+    def _backoff(self, bucket: Optional[TokenBucket], attempt: int, response) -> float:
+        """
+        Seconds to sleep before the next attempt. A 429 pauses the shared
+        bucket instead, so every process backs off and the next attempt
+        waits for its token.
+        """
+        if bucket is not None and response is not None and response.status_code == 429:
+            bucket.penalize(_retry_after(response))
+            return 0.0
+        return self._retry_delay(attempt, response)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint request, error, retry counts and latency percentiles"""
+        with _stats_lock:
+            return {endpoint: stats.summary() for endpoint, stats in self._stats.items()}
+
+
+class MapsClient(_MapsClientBase):
+    """
+    Pooled, retrying HTTP client for Maps Platform endpoints.
+
+    Args:
+        pool_connections: Number of host pools kept (one per googleapis host)
+        pool_maxsize: Max keep-alive connections per host
+        connect_timeout: Seconds to establish a connection
+        read_timeout: Seconds to wait for a response
+        max_retries: Retries after the first attempt for idempotent calls
+        retry_backoff: Base delay in seconds, doubled per retry
+        stats: Endpoint stats to record into (default: shared by all clients)
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """requests.Session with sized connection pools, built on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    # Deferred: requests is only needed once a call is made
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    # Retries are done here, not in urllib3, so they are counted
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=0,
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        endpoint: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs,
+    ):
+        """
+        Send a request through the shared pool.
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            endpoint: Name to record stats under (default: host + path)
+            idempotent: Whether retrying is safe (default: True for GET/HEAD)
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response of the last attempt; raises requests.RequestException
+            if every attempt failed to get a response
+        """
+        import requests
+
+        stats, bucket, attempts, hedge_delay = self._prepare(method, url, endpoint, idempotent, kwargs)
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+
+        for attempt in range(attempts):
+            retrying = attempt < attempts - 1
+            if bucket is not None:
+                bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = self._send(stats, bucket, hedge_delay, method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(stats, started, failed=True, retrying=retrying, healthy=False)
+                if not retrying:
+                    raise
+                response = None
+            else:
+                retrying = retrying and response.status_code in RETRY_STATUSES
+                self._record(
+                    stats, started, failed=response.status_code >= 400, retrying=retrying,
+                    healthy=response.status_code < 500,
+                )
+                if not retrying:
+                    return response
+                response.close()
+
+            time.sleep(self._backoff(bucket, attempt, response))
+
+    def _send(
+        self,
+        stats: EndpointStats,
+        bucket: Optional[TokenBucket],
+        hedge_delay: Optional[float],
+        method: str,
+        url: str,
+        **kwargs,
+    ):
+        """
+        One attempt; hedged with a second request if the first takes longer
+        than hedge_delay and the rate limit has a token to spare
+        """
+        if hedge_delay is None:
+            return self.session.request(method, url, **kwargs)
+
+        first = _get_hedge_executor().submit(self.session.request, method, url, **kwargs)
+        try:
+            return first.result(timeout=hedge_delay)
+        except concurrent.futures.TimeoutError:
+            pass
+        if bucket is not None and not bucket.try_acquire():
+            return first.result()
+        second = _get_hedge_executor().submit(self.session.request, method, url, **kwargs)
+        self._count_hedge(stats, won=False)
+
+        done, _ = concurrent.futures.wait((first, second), return_when=concurrent.futures.FIRST_COMPLETED)
+        winner = first if first in done else second
+        # A failed request loses to one still running
+        if winner.exception() is not None:
+            winner = second if winner is first else first
+            concurrent.futures.wait((winner,))
+        loser = second if winner is first else first
+        # The loser can't be aborted; release its connection once it is done
+        loser.add_done_callback(_close_response)
+        if winner is second and winner.exception() is None:
+            self._count_hedge(stats, won=True)
+        return winner.result()
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncMapsClient(_MapsClientBase):
+    """
+    Non-blocking counterpart of MapsClient on httpx.AsyncClient.
+    Same settings, retries and stats; waiting between retries yields to
+    the event loop, and cancelling the calling task aborts the request.
+
+    An httpx.AsyncClient is bound to the event loop it first ran on, so use
+    get_async_maps_client() to get the instance for the running loop.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client = None
+
+    @property
+    def client(self):
+        """httpx.AsyncClient with sized connection pools, built on first use"""
+        if self._client is None:
+            # Deferred: httpx is only needed once a call is made
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_connections * self.pool_maxsize,
+                    max_keepalive_connections=self.pool_maxsize,
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        endpoint: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs,
+    ):
+        """
+        Send a request through the loop's connection pool.
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            endpoint: Name to record stats under (default: host + path)
+            idempotent: Whether retrying is safe (default: True for GET/HEAD)
+            **kwargs: Passed to httpx.AsyncClient.request
+
+        Returns:
+            httpx.Response of the last attempt; raises httpx.TransportError
+            if every attempt failed to get a response
+        """
+        import httpx
+
+        stats, bucket, attempts, hedge_delay = self._prepare(method, url, endpoint, idempotent, kwargs)
+
+        for attempt in range(attempts):
+            retrying = attempt < attempts - 1
+            if bucket is not None:
+                await bucket.acquire_async()
+            started = time.perf_counter()
+            try:
+                response = await self._send(stats, bucket, hedge_delay, method, url, **kwargs)
+            except httpx.TransportError:
+                self._record(stats, started, failed=True, retrying=retrying, healthy=False)
+                if not retrying:
+                    raise
+                response = None
+            else:
+                retrying = retrying and response.status_code in RETRY_STATUSES
+                self._record(
+                    stats, started, failed=response.status_code >= 400, retrying=retrying,
+                    healthy=response.status_code < 500,
+                )
+                if not retrying:
+                    return response
+
+            await asyncio.sleep(self._backoff(bucket, attempt, response))
+
+    async def _send(
+        self,
+        stats: EndpointStats,
+        bucket: Optional[TokenBucket],
+        hedge_delay: Optional[float],
+        method: str,
+        url: str,
+        **kwargs,
+    ):
+        """
+        One attempt; hedged with a second request if the first takes longer
+        than hedge_delay and the rate limit has a token to spare
+        """
+        if hedge_delay is None:
+            return await self.client.request(method, url, **kwargs)
+
+        tasks = [asyncio.ensure_future(self.client.request(method, url, **kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done and (bucket is None or bucket.try_acquire()):
+                tasks.append(asyncio.ensure_future(self.client.request(method, url, **kwargs)))
+                self._count_hedge(stats, won=False)
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                done, _ = await asyncio.wait(tasks)
+            winner = done.pop()
+            # A failed request loses to one still running
+            if winner.exception() is not None and len(tasks) == 2:
+                winner = tasks[1] if winner is tasks[0] else tasks[0]
+                await asyncio.wait((winner,))
+            if winner is not tasks[0] and winner.exception() is None:
+                self._count_hedge(stats, won=True)
+            return winner.result()
+        finally:
+            # Unlike requests, httpx aborts the losing request when its task is cancelled
+            for task in tasks:
+                task.add_done_callback(_retrieve_exception)
+                task.cancel()
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _api_key(kwargs: Dict[str, Any]) -> Optional[str]:
+    """API key of a call, from the `key` query parameter or the X-Goog-Api-Key header"""
+    params = kwargs.get("params")
+    if isinstance(params, dict) and params.get("key"):
+        return params["key"]
+    return (kwargs.get("headers") or {}).get("X-Goog-Api-Key")
+
+
+def _retry_after(response) -> Optional[float]:
+    """Numeric Retry-After of a response in seconds, or None"""
+    if response is None:
+        return None
+    retry_after = response.headers.get("Retry-After", "")
+    return float(retry_after) if retry_after.isdigit() else None
+
+
+def _close_response(future: concurrent.futures.Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _retrieve_exception(task: asyncio.Future) -> None:
+    """Mark a losing task's exception as seen, so asyncio doesn't log it"""
+    if not task.cancelled():
+        task.exception()
+
+
+_hedge_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _get_hedge_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Threads running hedged sync requests, sized like the connection pool"""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _client_lock:
+            if _hedge_executor is None:
+                _hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=MAPS_POOL_MAXSIZE, thread_name_prefix="maps-hedge",
+                )
+    return _hedge_executor
+
+
+# Endpoint stats shared by every client in the process
+_shared_stats: Dict[str, EndpointStats] = {}
+_stats_lock = threading.Lock()
+
+_client: Optional[MapsClient] = None
+_client_lock = threading.Lock()
+
+# One async client per event loop; dropped with the loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncMapsClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_maps_client() -> MapsClient:
+    """Process-wide MapsClient shared by all tools"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MapsClient()
+    return _client
+
+
+def get_async_maps_client() -> AsyncMapsClient:
+    """AsyncMapsClient for the running event loop, shared by all async tools"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncMapsClient()
+    return client
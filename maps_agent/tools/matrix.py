@@ -0,0 +1,104 @@
+"""
+Custom function tool for accessible travel-time matrices
+Ranks candidate places by accessible walking time in one tool call,
+instead of one get_accessible_route round trip through the LLM per place.
+
+Pairs are deduplicated on the route cache key, fetched concurrently with
+a bounded number in flight, and served from the route cache when fresh.
+"""
+import asyncio
+import json
+import os
+from typing import Any, Dict, List
+
+from .directions import _route_async
+from .encoding import encode_result
+from .route_cache import normalize_location
+
+# Max routes fetched at once, and max distinct pairs per call
+MATRIX_MAX_CONCURRENCY = int(os.getenv("MATRIX_MAX_CONCURRENCY", "8"))
+MATRIX_MAX_PAIRS = int(os.getenv("MATRIX_MAX_PAIRS", "25"))
+
+
+def _matrix_cell(route_json: str) -> Dict[str, Any]:
+    """Compact summary of one route result in the full view"""
+    route = json.loads(route_json)
+    if route.get("status") != "success":
+        return {"error": route.get("error") or route.get("message", "No route")}
+    return {
+        "duration": route.get("duration"),
+        "distance": route.get("distance"),
+        "duration_seconds": route.get("duration_seconds"),
+        "distance_meters": route.get("distance_meters"),
+        # compact() drops an empty steps list
+        "hazards": sum(1 for step in route.get("steps", []) if "accessibility_warning" in step),
+    }
+
+
+def _ranking_key(cell: Dict[str, Any]):
+    """Fewest hazards first, then shortest time; failed routes last"""
+    if "error" in cell:
+        return (1, 0, 0)
+    return (0, cell["hazards"], cell.get("duration_seconds") or 0)
+
+
+async def get_accessible_travel_matrix(
+    origins: List[str],
+    destinations: List[str],
+    avoid_stairs: bool = True,
+) -> str:
+    """
+    Compare accessible walking routes between several origins and destinations.
+
+    Use this to rank candidate places (e.g. 5 cafés) by accessible travel time
+    from the user's location in a single call.
+
+    Args:
+        origins: Starting locations (addresses, place names, or coordinates)
+        destinations: Candidate destinations (addresses, place names, or coordinates)
+        avoid_stairs: Whether to avoid routes with stairs (default: True)
+
+    Returns:
+        JSON with a rows x columns matrix of duration, distance and hazard count
+        per origin/destination pair, and per origin the destination indices
+        ranked by fewest hazards, then shortest time
+    """
+    if not origins or not destinations:
+        return json.dumps({"error": "At least one origin and one destination are required"})
+
+    # Same trip written differently ("Alexanderplatz" / "alexanderplatz ") is fetched once
+    pairs: Dict[tuple, tuple] = {}
+    for origin in origins:
+        for destination in destinations:
+            key = (normalize_location(origin), normalize_location(destination))
+            pairs.setdefault(key, (origin, destination))
+    if len(pairs) > MATRIX_MAX_PAIRS:
+        return json.dumps({
+            "error": f"Too many origin/destination pairs: {len(pairs)} (max {MATRIX_MAX_PAIRS})",
+        })
+
+    semaphore = asyncio.Semaphore(MATRIX_MAX_CONCURRENCY)
+
+    async def fetch(origin: str, destination: str) -> Dict[str, Any]:
+        async with semaphore:
+            # Full view: the tool's own view (TOOL_RESULT_VIEW) may leave out the fields read here
+            return _matrix_cell(await _route_async(origin, destination, None, avoid_stairs))
+
+    cells = dict(zip(
+        pairs.keys(),
+        await asyncio.gather(*(fetch(origin, destination) for origin, destination in pairs.values())),
+    ))
+
+    rows = [
+        [cells[(normalize_location(origin), normalize_location(destination))] for destination in destinations]
+        for origin in origins
+    ]
+    return encode_result({
+        "origins": origins,
+        "destinations": destinations,
+        "rows": rows,
+        "ranking": [
+            sorted(range(len(destinations)), key=lambda index, row=row: _ranking_key(row[index]))
+            for row in rows
+        ],
+    }, "matrix")
@@ -0,0 +1,150 @@
+"""
+Concurrent execution of the function calls of one model turn
+ADK runs each function call of a model response as its own task, but a
+sync tool function (requests-based get_accessible_route, find_places)
+runs on the event loop thread and blocks it: three route calls in one
+turn took the sum of their latencies.
+
+ConcurrentFunctionTool runs sync functions on a worker thread pool, so
+all calls of a turn overlap and the turn takes about as long as its
+slowest call. Calls of one invocation share a semaphore that bounds how
+many run at once, each call has a timeout, and ADK keeps the responses
+in the order the model made the calls.
+
+A thread can't be interrupted, so a sync call that times out keeps its
+pool thread until it returns. Such abandoned calls are counted, and once
+TOOL_MAX_ABANDONED of them are still running, new sync calls fail fast
+instead of queueing behind them for the whole timeout.
+
+Only agents that register function tools benefit; the shipped agents use
+google_maps_grounding alone (see tools/__init__.py).
+"""
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.tools import FunctionTool
+
+# Max calls of one invocation running at once, and max seconds per call
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "20"))
+
+# Worker threads for sync tool functions, shared by all sessions
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "32"))
+
+# Timed-out calls still holding a pool thread before new sync calls are rejected
+TOOL_MAX_ABANDONED = int(os.getenv("TOOL_MAX_ABANDONED", str(max(1, TOOL_THREADS // 2))))
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# invocation id -> semaphore; dropped once no call of the invocation holds it
+_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+# Futures of timed-out calls whose threads are still running
+_abandoned = set()
+_abandoned_lock = threading.Lock()
+_counters = {"abandoned": 0, "rejected": 0}
+
+
+class ToolThreadsBusyError(Exception):
+    """Raised when too many timed-out calls still hold tool pool threads"""
+
+    def __init__(self, running: int):
+        super().__init__(f"tool threads busy: {running} timed-out calls still running, try again shortly")
+        self.running = running
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=TOOL_THREADS, thread_name_prefix="tool",
+                )
+    return _executor
+
+
+def run_in_thread(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Async wrapper running a sync function on the tool thread pool; keeps its signature and docstring"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with _abandoned_lock:
+            if len(_abandoned) >= TOOL_MAX_ABANDONED:
+                _counters["rejected"] += 1
+                raise ToolThreadsBusyError(len(_abandoned))
+        future = _get_executor().submit(functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A queued call is dropped; a running one keeps its thread until it returns
+            if not future.cancel():
+                _abandon(future)
+            raise
+
+    return wrapper
+
+
+def _abandon(future: concurrent.futures.Future) -> None:
+    with _abandoned_lock:
+        _abandoned.add(future)
+        _counters["abandoned"] += 1
+    future.add_done_callback(_release)
+
+
+def _release(future: concurrent.futures.Future) -> None:
+    with _abandoned_lock:
+        _abandoned.discard(future)
+
+
+def thread_stats() -> Dict[str, int]:
+    """Tool pool size, timed-out calls still running, and totals of abandoned and rejected calls"""
+    with _abandoned_lock:
+        return {"threads": TOOL_THREADS, "running_abandoned": len(_abandoned), **_counters}
+
+
+class ConcurrentFunctionTool(FunctionTool):
+    """
+    FunctionTool whose calls within one model turn run concurrently.
+
+    Args:
+        func: Tool function, sync or async
+        max_concurrency: Max calls of one invocation running at once
+        timeout: Seconds before a call is answered with a timeout error
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+        timeout: float = TOOL_CALL_TIMEOUT_SECONDS,
+    ):
+        super().__init__(func=func if inspect.iscoroutinefunction(func) else run_in_thread(func))
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    def _semaphore(self, invocation_id: str) -> asyncio.Semaphore:
+        semaphore = _semaphores.get(invocation_id)
+        if semaphore is None:
+            semaphore = _semaphores[invocation_id] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context) -> Any:
+        async with self._semaphore(tool_context.invocation_id):
+            try:
+                return await asyncio.wait_for(
+                    super().run_async(args=args, tool_context=tool_context), self.timeout,
+                )
+            except asyncio.TimeoutError:
+                # Answer the model like the tools answer other failures
+                return json.dumps({"error": f"{self.name} timed out after {self.timeout:g} seconds"})
+            except ToolThreadsBusyError as e:
+                return json.dumps({"error": str(e)})
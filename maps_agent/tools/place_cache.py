@@ -0,0 +1,389 @@
+"""
+Geospatially indexed cache for Places Text Search results
+A "cafés near the museum" query usually lands on the same places an
+earlier search already returned. Places are stored in geohash buckets
+together with the categories they were found for, so a search for a
+covered category around an already-covered area is answered locally.
+
+- places: geohash cell (precision 5, ~4.9 x 4.9 km) -> place key -> entry
+- coverage: geohash cell -> category -> time a search at coordinates in
+  the cell last returned every match (fewer than a full page)
+- areas: normalized place names ("kyiv", "museum island") -> centre of the
+  results last returned for them, so text locations can be resolved too,
+  and per category the time a search of the area returned every match
+
+A search only covers what it searched: a named area covers that name, and
+coordinates cover their cell, so a city-wide search never answers a
+search near a point in it. A lookup is a hit when the query's area or
+cell is fresh for the category; results are the cached places of that
+category in the centre's cell and its eight neighbours, nearest first. While the Places API is unavailable,
+lookup(stale=True) also accepts entries up to PLACE_CACHE_STALE_SECONDS
+past their TTL.
+
+Memory is bounded: evicting a bucket drops the coverage of its cell,
+entries older than TTL + stale window are purged periodically, and named
+areas and per-city stats are LRU-capped at PLACE_CACHE_MAX_AREAS.
+"""
+import collections
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Defaults, overridable from the environment
+PLACE_CACHE_TTL_SECONDS = float(os.getenv("PLACE_CACHE_TTL_SECONDS", "21600"))
+PLACE_CACHE_MAX_PLACES = int(os.getenv("PLACE_CACHE_MAX_PLACES", "50000"))
+PLACE_CACHE_STALE_SECONDS = float(os.getenv("PLACE_CACHE_STALE_SECONDS", "86400"))
+PLACE_CACHE_MAX_AREAS = int(os.getenv("PLACE_CACHE_MAX_AREAS", "1000"))
+
+# Results per Text Search page: a full page may have left matches out, so it covers nothing
+PLACES_PAGE_SIZE = int(os.getenv("PLACES_PAGE_SIZE", "20"))
+
+# Geohash precision of place buckets and coverage cells
+CELL_PRECISION = 5
+
+# Places, coverage and areas older than TTL + stale window are purged once every this many adds
+PURGE_EVERY = 256
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+_SPACES = re.compile(r"\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+_COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+_AREA = re.compile(r"^(.*?)\s+(?:in|near|around|at)\s+(.+)$", re.IGNORECASE)
+
+# Words that don't change what kind of place is being searched for
+_FILLER = frozenset({"the", "a", "an", "best", "good", "nearby", "some", "find", "me", "show"})
+
+
+def geohash(lat: float, lng: float, precision: int) -> str:
+    """Standard base32 geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def neighbourhood(lat: float, lng: float, precision: int) -> List[str]:
+    """Geohash of the point's cell and its eight neighbours"""
+    height, width = _cell_size(precision)
+    cells = []
+    for dlat in (-height, 0.0, height):
+        for dlng in (-width, 0.0, width):
+            cell_lat = max(-89.999999, min(89.999999, lat + dlat))
+            cell_lng = (lng + dlng + 180.0) % 360.0 - 180.0
+            cell = geohash(cell_lat, cell_lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def _distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Equirectangular distance, accurate enough at neighbourhood scale"""
+    x = math.radians(b[1] - a[1]) * math.cos(math.radians((a[0] + b[0]) / 2))
+    y = math.radians(b[0] - a[0])
+    return 6371000.0 * math.hypot(x, y)
+
+
+def normalize_area(area: Optional[str]) -> str:
+    return _SPACES.sub(" ", area or "").strip().strip(",").lower()
+
+
+def normalize_category(text: str) -> str:
+    """Order-, accent- and plural-insensitive form of what is being searched for"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = set()
+    for word in _WORD.findall(text):
+        if word in _FILLER:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words))
+
+
+def split_query(search_query: str) -> Tuple[str, str]:
+    """("cafés", "kyiv") from "Cafés in Kyiv"; area is "" if none is named"""
+    match = _AREA.match(search_query.strip())
+    if match:
+        return normalize_category(match.group(1)), normalize_area(match.group(2))
+    return normalize_category(search_query), ""
+
+
+def _place_point(place: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    location = place.get("location") or {}
+    if "latitude" in location and "longitude" in location:
+        return float(location["latitude"]), float(location["longitude"])
+    return None
+
+
+class _CityStats:
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self.coverage_cells = set()
+        self.places = set()
+
+
+class PlaceCache:
+    """
+    Geohash-bucketed cache of Places search results with per-city coverage.
+
+    Args:
+        ttl: Seconds a searched area stays fresh for its category
+        max_places: Max cached places; the oldest buckets are dropped beyond it
+        max_areas: Max named areas and per-city stats kept; least recently used are dropped
+    """
+
+    def __init__(
+        self,
+        ttl: float = PLACE_CACHE_TTL_SECONDS,
+        max_places: int = PLACE_CACHE_MAX_PLACES,
+        max_areas: int = PLACE_CACHE_MAX_AREAS,
+    ):
+        self.ttl = ttl
+        self.max_places = max_places
+        self.max_areas = max_areas
+        self._lock = threading.Lock()
+        # cell -> {place key: (place, categories, stored_at, city)}, oldest bucket first
+        self._buckets: "collections.OrderedDict[str, Dict[str, tuple]]" = collections.OrderedDict()
+        self._num_places = 0
+        # cell -> {category: searched_at}
+        self._coverage: Dict[str, Dict[str, float]] = {}
+        # area -> (centre, updated_at, {category: searched_at}), least recently used first
+        self._areas: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+        # city -> stats, least recently used first
+        self._cities: "collections.OrderedDict[str, _CityStats]" = collections.OrderedDict()
+        self._adds = 0
+
+    def _resolve(self, area: str) -> Optional[Tuple[float, float]]:
+        match = _COORDINATES.match(area)
+        if match:
+            return float(match.group(1)), float(match.group(2))
+        entry = self._areas.get(area)
+        return entry[0] if entry else None
+
+    def _city(self, area: str, centre: Optional[Tuple[float, float]]) -> Tuple[str, _CityStats]:
+        """(name, stats) of the city an area counts towards; coordinates count towards the named area around them"""
+        if centre is not None and _COORDINATES.match(area):
+            cells = neighbourhood(*centre, CELL_PRECISION)
+            for name, (name_centre, *_) in self._areas.items():
+                if geohash(*name_centre, CELL_PRECISION) in cells:
+                    area = name
+                    break
+            else:
+                area = f"{centre[0]:.1f},{centre[1]:.1f}"
+        city = self._cities.get(area)
+        if city is None:
+            city = self._cities[area] = _CityStats()
+            # Every distinct area string gets stats, so they are capped like the areas
+            while len(self._cities) > self.max_areas:
+                self._cities.popitem(last=False)
+        self._cities.move_to_end(area)
+        return area, city
+
+    def lookup(self, search_query: str, limit: int = 5, stale: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Cached places for a search, nearest first, or None on a miss.
+        With stale=True, expired entries within PLACE_CACHE_STALE_SECONDS are
+        accepted too; such fallback lookups are not counted in the stats.
+        """
+        category, area = split_query(search_query)
+        now = time.time()
+        max_age = self.ttl + (PLACE_CACHE_STALE_SECONDS if stale else 0.0)
+        with self._lock:
+            centre = self._resolve(area)
+            if not stale:
+                _, city = self._city(area, centre)
+                city.lookups += 1
+            if centre is None:
+                return None
+            if _COORDINATES.match(area):
+                searched_at = self._coverage.get(geohash(*centre, CELL_PRECISION), {}).get(category)
+            else:
+                searched_at = self._areas[area][2].get(category)
+            if searched_at is None or now - searched_at > max_age:
+                return None
+
+            found = []
+            for cell in neighbourhood(*centre, CELL_PRECISION):
+                for place, categories, stored_at, _ in self._buckets.get(cell, {}).values():
+                    if category in categories and now - stored_at <= max_age:
+                        found.append((_distance_m(centre, _place_point(place)), place))
+            if not found:
+                return None
+
+            if not stale:
+                city.hits += 1
+            found.sort(key=lambda item: item[0])
+            return [place for _, place in found[:limit]]
+
+    def add(self, search_query: str, places: List[Dict[str, Any]]) -> None:
+        """
+        Index the places a search returned. Only complete results (less
+        than a full page) mark the searched area, or the cell of the searched
+        coordinates, as covered; places elsewhere don't cover their cells.
+        """
+        category, area = split_query(search_query)
+        points = [(place, point) for place in places if (point := _place_point(place))]
+        if not points:
+            return
+
+        now = time.time()
+        with self._lock:
+            centre = (
+                sum(point[0] for _, point in points) / len(points),
+                sum(point[1] for _, point in points) / len(points),
+            )
+            complete = len(places) < PLACES_PAGE_SIZE
+            named = bool(area) and not _COORDINATES.match(area)
+            if named:
+                entry = self._areas.get(area)
+                searched_categories = dict(entry[2]) if entry else {}
+                if complete:
+                    searched_categories[category] = now
+                self._areas[area] = (centre, now, searched_categories)
+                self._areas.move_to_end(area)
+                while len(self._areas) > self.max_areas:
+                    self._areas.popitem(last=False)
+            searched = self._resolve(area) or centre
+            city_name, city = self._city(area, searched)
+
+            for place, point in points:
+                cell = geohash(*point, CELL_PRECISION)
+                bucket = self._buckets.setdefault(cell, {})
+                self._buckets.move_to_end(cell)
+                key = place.get("google_maps_uri") or f"{place.get('name')}|{cell}"
+                previous = bucket.get(key)
+                categories = (previous[1] if previous else frozenset()) | {category}
+                if previous is None:
+                    self._num_places += 1
+                elif previous[3] != city_name:
+                    self._uncount_place(key, previous)
+                bucket[key] = (place, categories, now, city_name)
+                city.places.add(key)
+
+            if complete and area:
+                cell = geohash(*searched, CELL_PRECISION)
+                if not named:
+                    self._coverage.setdefault(cell, {})[category] = now
+                city.coverage_cells.add(cell)
+            self._evict()
+            self._adds += 1
+            if self._adds % PURGE_EVERY == 0:
+                self._purge(now)
+
+    def _uncount_place(self, key: str, entry: tuple) -> None:
+        """Remove a place from its city's stats (lock held)"""
+        city = self._cities.get(entry[3])
+        if city is not None:
+            city.places.discard(key)
+
+    def _drop_coverage(self, cells) -> None:
+        """Forget that cells were searched, here and in the city stats (lock held)"""
+        cells = {cell for cell in cells if self._coverage.pop(cell, None) is not None}
+        if cells:
+            for city in self._cities.values():
+                city.coverage_cells -= cells
+
+    def _evict(self) -> None:
+        """Drop the oldest buckets, and the coverage of their cells, while over max_places (lock held)"""
+        evicted = []
+        while self._num_places > self.max_places and self._buckets:
+            cell, bucket = self._buckets.popitem(last=False)
+            self._num_places -= len(bucket)
+            for key, entry in bucket.items():
+                self._uncount_place(key, entry)
+            evicted.append(cell)
+        self._drop_coverage(evicted)
+
+    def _purge(self, now: float) -> None:
+        """Drop places, coverage and areas too old even for a stale lookup (lock held)"""
+        max_age = self.ttl + PLACE_CACHE_STALE_SECONDS
+        for cell, bucket in list(self._buckets.items()):
+            for key, entry in list(bucket.items()):
+                if now - entry[2] > max_age:
+                    del bucket[key]
+                    self._num_places -= 1
+                    self._uncount_place(key, entry)
+            if not bucket:
+                del self._buckets[cell]
+
+        expired = []
+        for cell, categories in self._coverage.items():
+            for category, searched_at in list(categories.items()):
+                if now - searched_at > max_age:
+                    del categories[category]
+            if not categories:
+                expired.append(cell)
+        self._drop_coverage(expired)
+
+        for area, (_, updated_at, _) in list(self._areas.items()):
+            if now - updated_at > max_age:
+                del self._areas[area]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cached place count plus lookups, hit rate and coverage per city"""
+        with self._lock:
+            cities = {}
+            for area, city in self._cities.items():
+                cities[area or "(unnamed)"] = {
+                    "lookups": city.lookups,
+                    "hits": city.hits,
+                    "hit_rate": round(city.hits / city.lookups, 3) if city.lookups else None,
+                    "coverage_km2": round(len(city.coverage_cells) * _cell_area_km2(CELL_PRECISION), 1),
+                    "places": len(city.places),
+                }
+            return {"places": self._num_places, "buckets": len(self._buckets), "cities": cities}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._num_places = 0
+            self._coverage.clear()
+            self._areas.clear()
+            self._cities.clear()
+
+
+def _cell_area_km2(precision: int) -> float:
+    """Approximate area of a geohash cell at mid latitudes"""
+    height, width = _cell_size(precision)
+    return height * 111.32 * width * 111.32 * math.cos(math.radians(45))
+
+
+_cache: Optional[PlaceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_place_cache() -> PlaceCache:
+    """Process-wide PlaceCache used by the places tools"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PlaceCache()
+    return _cache
@@ -0,0 +1,183 @@
+"""
+Custom function tool for Google Places API (New) Text Search
+Port of python_backend's find_places onto the shared Maps client
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from .circuit_breaker import CircuitOpenError
+from .encoding import encode_result
+from .maps_client import get_async_maps_client, get_maps_client
+from .place_cache import PlaceCache, get_place_cache
+from .rate_limiter import RateLimitedError
+from .single_flight import get_single_flight
+
+PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+
+# Places returned per search
+MAX_RESULTS = 5
+
+PLACES_FIELD_MASK = ",".join([
+    "places.displayName",
+    "places.formattedAddress",
+    "places.rating",
+    "places.userRatingCount",
+    "places.location",
+    "places.types",
+    "places.googleMapsUri",
+])
+
+
+def find_places(
+    query: str,
+    location: Optional[str] = None,
+) -> str:
+    """
+    Find places using Google Places API Text Search.
+
+    Args:
+        query: Search query (e.g., "Italian restaurants in Kyiv")
+        location: Optional location bias (e.g., "Kyiv, Ukraine")
+
+    Returns:
+        JSON string with place results including names, addresses, ratings
+    """
+    # Deferred: requests is only needed once places are actually fetched
+    import requests
+
+    request = _search_request(query, location)
+    if request is None:
+        return json.dumps({"error": "GOOGLE_MAPS_API_KEY not configured"})
+
+    cache = get_place_cache()
+    search_query = request["json"]["textQuery"]
+    cached = cache.lookup(search_query, limit=MAX_RESULTS)
+    if cached is not None:
+        return encode_result({"places": cached, "query": search_query, "cached": True}, "places")
+
+    def fetch() -> str:
+        try:
+            response = get_maps_client().post(PLACES_SEARCH_URL, **request)
+            response.raise_for_status()
+            return _format_places(response.json(), search_query, cache)
+        except (CircuitOpenError, RateLimitedError) as e:
+            return _fallback_places(cache, search_query, e)
+        except requests.RequestException as e:
+            return _fallback_places(cache, search_query, e)
+
+    # Concurrent identical searches share one request
+    return get_single_flight().do("places", _flight_key(search_query), fetch)
+
+
+async def find_places_async(
+    query: str,
+    location: Optional[str] = None,
+) -> str:
+    """
+    Find places using Google Places API Text Search.
+
+    Non-blocking version of find_places for async servers.
+
+    Args:
+        query: Search query (e.g., "Italian restaurants in Kyiv")
+        location: Optional location bias (e.g., "Kyiv, Ukraine")
+
+    Returns:
+        Same JSON result as find_places
+    """
+    # Deferred: httpx is only needed once places are actually fetched
+    import httpx
+
+    request = _search_request(query, location)
+    if request is None:
+        return json.dumps({"error": "GOOGLE_MAPS_API_KEY not configured"})
+
+    cache = get_place_cache()
+    search_query = request["json"]["textQuery"]
+    cached = cache.lookup(search_query, limit=MAX_RESULTS)
+    if cached is not None:
+        return encode_result({"places": cached, "query": search_query, "cached": True}, "places")
+
+    async def fetch() -> str:
+        try:
+            response = await get_async_maps_client().post(PLACES_SEARCH_URL, **request)
+            response.raise_for_status()
+            return _format_places(response.json(), search_query, cache)
+        except (CircuitOpenError, RateLimitedError) as e:
+            return _fallback_places(cache, search_query, e)
+        # A malformed body raises json.JSONDecodeError, which httpx doesn't wrap like requests does
+        except (httpx.HTTPError, ValueError) as e:
+            return _fallback_places(cache, search_query, e)
+
+    # Concurrent identical searches share one request, sync or async
+    return await get_single_flight().do_async("places", _flight_key(search_query), fetch)
+
+
+def _flight_key(search_query: str) -> str:
+    """Case/whitespace-insensitive search, for coalescing identical requests"""
+    return " ".join(search_query.lower().split())
+
+
+def _fallback_places(cache: PlaceCache, search_query: str, error: Exception) -> str:
+    """Expired cached places marked stale if there are any, else the error"""
+    stale = cache.lookup(search_query, limit=MAX_RESULTS, stale=True)
+    if stale is not None:
+        return encode_result({"places": stale, "query": search_query, "cached": True, "stale": True}, "places")
+    if isinstance(error, (CircuitOpenError, RateLimitedError)):
+        return json.dumps({
+            "error": "Places search is temporarily unavailable",
+            "retry_after": round(error.retry_after),
+        })
+    return json.dumps({"error": f"Failed to fetch places: {str(error)}"})
+
+
+def _search_request(query: str, location: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Keyword arguments for the searchText call, or None if no API key is configured"""
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return None
+
+    # Construct search query
+    search_query = query
+    if location and location.lower() not in query.lower():
+        search_query = f"{query} in {location}"
+
+    return {
+        "json": {
+            "textQuery": search_query,
+            "languageCode": "en",
+        },
+        "headers": {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": api_key,
+            "X-Goog-FieldMask": PLACES_FIELD_MASK,
+        },
+        "endpoint": "places:searchText",
+        # searchText only reads, so it is safe to retry despite being a POST
+        "idempotent": True,
+    }
+
+
+def _format_places(data: Dict[str, Any], search_query: str, cache: PlaceCache) -> str:
+    """Turn a searchText response into the tool's JSON result, caching every place"""
+    places = data.get("places", [])
+    if not places:
+        return json.dumps({"message": f"No places found for query: {search_query}"})
+
+    # Format results; all of them are cached, the top ones are returned
+    results = [
+        {
+            "name": place.get("displayName", {}).get("text", "Unknown"),
+            "address": place.get("formattedAddress", "Address not available"),
+            "rating": place.get("rating"),
+            "user_ratings": place.get("userRatingCount"),
+            "location": place.get("location", {}),
+            "types": place.get("types", []),
+            "google_maps_uri": place.get("googleMapsUri", ""),
+        }
+        for place in places
+    ]
+    cache.add(search_query, results)
+
+    return encode_result({"places": results[:MAX_RESULTS], "query": search_query}, "places")
@@ -0,0 +1,158 @@
+"""
+Vectorized codec and simplification for Google encoded polylines
+Routes come back as encoded polylines with hundreds of points; the map
+only needs a handful per street and the LLM needs none of them.
+
+- decode: encoded string -> (N, 2) float array of (lat, lng)
+- encode: (N, 2) array -> encoded string
+- simplify: Douglas-Peucker with a tolerance in metres
+
+All work is done on NumPy arrays: no per-character Python loops.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+# Max 5-bit chunks per value: enough for any lat/lng delta at precision 5-6
+_MAX_CHUNKS = 7
+_SHIFTS = 5 * np.arange(_MAX_CHUNKS, dtype=np.int64)
+
+
+def decode(encoded: str, precision: int = 5) -> np.ndarray:
+    """
+    Decode an encoded polyline.
+
+    Args:
+        encoded: Polyline string as returned by the Directions API
+        precision: Decimal places encoded (5 for Directions, 6 for some APIs)
+
+    Returns:
+        (N, 2) float64 array of (lat, lng); raises ValueError if malformed
+    """
+    if not encoded:
+        return np.empty((0, 2))
+
+    data = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if data.min() < 0 or data.max() > 63:
+        raise ValueError("invalid polyline character")
+
+    # A value ends at every byte without the 0x20 continuation bit
+    ends = (data & 0x20) == 0
+    if not ends[-1]:
+        raise ValueError("truncated polyline")
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    group = np.cumsum(np.concatenate(([0], ends[:-1].astype(np.int64))))
+    position = np.arange(len(data)) - starts[group]
+    if position.max() >= _MAX_CHUNKS:
+        raise ValueError("polyline value too large")
+
+    values = np.add.reduceat((data & 0x1F) << (5 * position), starts)
+    # Undo zigzag encoding of signed deltas
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+    if len(values) % 2:
+        raise ValueError("odd number of polyline values")
+
+    return np.cumsum(values.reshape(-1, 2), axis=0) / 10 ** precision
+
+
+def encode(coords, precision: int = 5) -> str:
+    """
+    Encode (lat, lng) points as a polyline string.
+
+    Args:
+        coords: (N, 2) array-like of (lat, lng)
+        precision: Decimal places to encode
+
+    Returns:
+        Encoded polyline string
+    """
+    points = np.round(np.asarray(coords, dtype=np.float64).reshape(-1, 2) * 10 ** precision).astype(np.int64)
+    if len(points) == 0:
+        return ""
+
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    # Zigzag: sign moves to the lowest bit
+    values = (deltas << 1) ^ (deltas >> 63)
+
+    chunks = (values[:, None] >> _SHIFTS) & 0x1F
+    num_chunks = 1 + ((values[:, None] >> _SHIFTS[1:]) > 0).sum(axis=1)
+    index = np.arange(_MAX_CHUNKS)
+    used = index < num_chunks[:, None]
+    continued = index < (num_chunks - 1)[:, None]
+    chars = (chunks | (continued * 0x20)) + 63
+    return chars[used].astype(np.uint8).tobytes().decode("ascii")
+
+
+def _project(coords: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to metres around the points' mean latitude"""
+    lat0 = np.radians(coords[:, 0].mean())
+    return np.column_stack((
+        np.radians(coords[:, 1]) * np.cos(lat0),
+        np.radians(coords[:, 0]),
+    )) * EARTH_RADIUS_M
+
+
+def simplify(coords, tolerance_m: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification.
+
+    Args:
+        coords: (N, 2) array-like of (lat, lng)
+        tolerance_m: Max distance in metres a dropped point may lie from the result
+
+    Returns:
+        (M, 2) array, M <= N, always keeping the first and last point
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+
+    xy = _project(coords)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    # Explicit stack instead of recursion: long routes don't hit the recursion limit
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1:end] - xy[start]
+        length_sq = segment @ segment
+        if length_sq > 0:
+            t = np.clip(offsets @ segment / length_sq, 0.0, 1.0)
+            offsets = offsets - t[:, None] * segment
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return coords[keep]
+
+
+def step_coordinates(step: Dict, tolerance_m: Optional[float] = None) -> np.ndarray:
+    """
+    Points along one Directions step, for per-step hazard analysis.
+
+    Args:
+        step: Directions API step
+        tolerance_m: Simplify with this tolerance if given
+
+    Returns:
+        (N, 2) array of (lat, lng); start/end locations if the step has no polyline
+    """
+    encoded = (step.get("polyline") or {}).get("points")
+    if encoded:
+        coords = decode(encoded)
+    else:
+        coords = np.array([
+            [step["start_location"]["lat"], step["start_location"]["lng"]],
+            [step["end_location"]["lat"], step["end_location"]["lng"]],
+        ])
+    return simplify(coords, tolerance_m) if tolerance_m else coords
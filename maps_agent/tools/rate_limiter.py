@@ -0,0 +1,293 @@
+"""
+Outbound rate limiter for Maps API calls, shared by every local process
+All daemon workers and the voice server send with one API key, so bursts
+from several processes add up and come back as 429 / OVER_QUERY_LIMIT.
+Each (endpoint, API key) pair gets a token bucket whose state lives in a
+small file under MAPS_RATE_LIMIT_DIR, updated under an exclusive flock,
+so every process draws from the same budget.
+
+- a call takes a token or reserves the next one and waits for it, in
+  arrival order; if its wait would exceed MAPS_RATE_LIMIT_WAIT it fails
+  fast with RateLimitedError instead
+- a 429 or OVER_QUERY_LIMIT pauses the bucket for Retry-After seconds
+  (MAPS_RATE_PENALTY_SECONDS without one) in every process
+- queue waits are reported per bucket
+
+Without fcntl (Windows) or a writable directory, buckets are per process.
+"""
+import asyncio
+import collections
+import hashlib
+import os
+import statistics
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets stay per process
+    fcntl = None
+
+# Calls per second per endpoint and API key, e.g. "directions=50,places:searchText=10";
+# endpoints not listed are not limited. Defaults are the standard per-minute
+# quotas (3000 and 600) per second.
+MAPS_RATE_LIMITS = os.getenv("MAPS_RATE_LIMITS", "directions=50,places:searchText=10")
+
+# Seconds of traffic a full bucket can send at once
+MAPS_RATE_BURST_SECONDS = float(os.getenv("MAPS_RATE_BURST_SECONDS", "1"))
+
+# Longest a call queues for a token before failing with RateLimitedError
+MAPS_RATE_LIMIT_WAIT = float(os.getenv("MAPS_RATE_LIMIT_WAIT", "5"))
+
+# Pause after a rate-limited response without Retry-After
+MAPS_RATE_PENALTY_SECONDS = float(os.getenv("MAPS_RATE_PENALTY_SECONDS", "2"))
+
+# Directory of shared bucket files; empty for per-process buckets
+MAPS_RATE_LIMIT_DIR = os.getenv(
+    "MAPS_RATE_LIMIT_DIR", os.path.join(tempfile.gettempdir(), "maps_agent_rate_limits"),
+)
+
+# Queue wait samples kept per bucket for percentiles
+WAIT_SAMPLES = 512
+
+# Bucket file contents: tokens, time (epoch seconds) they were counted at
+_STATE = struct.Struct("<dd")
+
+
+class RateLimitedError(Exception):
+    """Raised when a call would have to queue longer than the limiter allows"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"{endpoint} rate limit reached, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """{"directions": 50.0, ...} from "directions=50,..." """
+    rates = {}
+    for item in spec.split(","):
+        endpoint, _, rate = item.strip().rpartition("=")
+        if endpoint and rate:
+            rates[endpoint] = float(rate)
+    return rates
+
+
+class TokenBucket:
+    """
+    Token bucket for one endpoint and API key, optionally shared through a file.
+
+    Args:
+        name: Bucket name for stats and errors
+        rate: Tokens added per second
+        burst: Max tokens held
+        path: Bucket file shared with other processes (per process if None)
+        max_wait: Longest a call may queue for a token
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        path: Optional[str] = None,
+        max_wait: float = MAPS_RATE_LIMIT_WAIT,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.path = path if fcntl is not None else None
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._state = (float(burst), 0.0)
+        self.counters = {"acquired": 0, "queued": 0, "rejected": 0, "penalties": 0}
+        self._waits = collections.deque(maxlen=WAIT_SAMPLES)
+
+    def _file(self) -> Optional[int]:
+        """Descriptor of the bucket file, reopened after a fork (lock held)"""
+        if self.path is None:
+            return None
+        # A descriptor inherited over fork shares its flock with the parent
+        if self._pid != os.getpid():
+            if self._fd is not None:
+                # The parent keeps its own descriptor, so closing ours leaves its lock alone
+                os.close(self._fd)
+                self._fd = None
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError:
+                self.path = None
+                return None
+            self._pid = os.getpid()
+        return self._fd
+
+    def _update(self, fn: Callable[[float, float, float], Tuple[float, float, Any]]) -> Any:
+        """Apply fn(tokens, counted_at, now) -> (tokens, counted_at, result) atomically across processes"""
+        with self._lock:
+            fd = self._file()
+            if fd is None:
+                tokens, counted_at, result = fn(*self._state, time.time())
+                self._state = (tokens, counted_at)
+                return result
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, _STATE.size, 0)
+                state = _STATE.unpack(raw) if len(raw) == _STATE.size else (float(self.burst), 0.0)
+                tokens, counted_at, result = fn(*state, time.time())
+                os.pwrite(fd, _STATE.pack(tokens, counted_at), 0)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _reserve(self, max_wait: float) -> float:
+        """Take or reserve a token; seconds to wait for it, or -seconds if that exceeds max_wait"""
+
+        def reserve(tokens: float, counted_at: float, now: float):
+            # counted_at is in the future while the bucket is paused
+            if now > counted_at:
+                tokens = min(self.burst, tokens + (now - counted_at) * self.rate)
+                counted_at = now
+            wait = (counted_at - now) + max(0.0, (1.0 - tokens) / self.rate)
+            if wait > max_wait:
+                return tokens, counted_at, -wait
+            return tokens - 1.0, counted_at, wait
+
+        return self._update(reserve)
+
+    def _count(self, wait: float) -> None:
+        with self._lock:
+            if wait < 0:
+                self.counters["rejected"] += 1
+            else:
+                self.counters["acquired"] += 1
+                self.counters["queued"] += wait > 0
+                self._waits.append(wait)
+
+    def acquire(self) -> float:
+        """Wait for a token; returns seconds queued, raises RateLimitedError past max_wait"""
+        wait = self._reserve(self.max_wait)
+        self._count(wait)
+        if wait < 0:
+            raise RateLimitedError(self.name, -wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Async version of acquire"""
+        wait = self._reserve(self.max_wait)
+        self._count(wait)
+        if wait < 0:
+            raise RateLimitedError(self.name, -wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now (e.g. for a hedged request)"""
+        if self._reserve(0.0) != 0.0:
+            return False
+        self._count(0.0)
+        return True
+
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """Pause the bucket after a rate-limited response; returns the pause in seconds"""
+        pause = MAPS_RATE_PENALTY_SECONDS if retry_after is None else retry_after
+
+        def pause_bucket(tokens: float, counted_at: float, now: float):
+            return min(tokens, 0.0), max(counted_at, now + pause), None
+
+        self._update(pause_bucket)
+        with self._lock:
+            self.counters["penalties"] += 1
+        return pause
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            summary = {"rate": self.rate, "shared": self.path is not None, **self.counters}
+            if self._waits:
+                ordered = sorted(self._waits)
+                summary.update({
+                    "mean_wait_ms": round(statistics.fmean(ordered) * 1000, 1),
+                    "p95_wait_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1),
+                    "max_wait_ms": round(ordered[-1] * 1000, 1),
+                })
+            return summary
+
+
+class RateLimiter:
+    """
+    Token buckets per endpoint and API key.
+
+    Args:
+        rates: Calls per second per endpoint; other endpoints are not limited
+        directory: Directory of shared bucket files (per process if empty)
+        burst_seconds: Seconds of traffic a full bucket can send at once
+        max_wait: Longest a call may queue for a token
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        directory: Optional[str] = MAPS_RATE_LIMIT_DIR,
+        burst_seconds: float = MAPS_RATE_BURST_SECONDS,
+        max_wait: float = MAPS_RATE_LIMIT_WAIT,
+    ):
+        self.rates = parse_rates(MAPS_RATE_LIMITS) if rates is None else rates
+        self.directory = directory
+        self.burst_seconds = burst_seconds
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, endpoint: str, api_key: Optional[str]) -> Optional[TokenBucket]:
+        """Bucket for calls to endpoint with api_key, or None if the endpoint isn't limited"""
+        rate = self.rates.get(endpoint)
+        if not rate:
+            return None
+        # Keys are hashed: bucket names end up in file names and stats
+        key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+        with self._lock:
+            bucket = self._buckets.get((endpoint, key_id))
+            if bucket is None:
+                name = f"{endpoint}/{key_id}"
+                path = None
+                if self.directory:
+                    path = os.path.join(self.directory, f"{endpoint.replace(':', '_')}-{key_id}.bucket")
+                bucket = self._buckets[(endpoint, key_id)] = TokenBucket(
+                    name, rate, max(1.0, rate * self.burst_seconds), path, self.max_wait,
+                )
+            return bucket
+
+    def penalize(self, endpoint: str, api_key: Optional[str], retry_after: Optional[float] = None) -> float:
+        """Pause an endpoint's bucket after it reported a rate limit; returns the pause in seconds"""
+        bucket = self.bucket(endpoint, api_key)
+        if bucket is None:
+            return MAPS_RATE_PENALTY_SECONDS if retry_after is None else retry_after
+        return bucket.penalize(retry_after)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-bucket token counts and queue wait percentiles"""
+        with self._lock:
+            buckets = list(self._buckets.values())
+        return {bucket.name: bucket.summary() for bucket in buckets}
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide RateLimiter used by the Maps clients"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,263 @@
+"""
+Two-tier TTL cache for Directions API results
+Popular trips (station -> museum, hotel -> landmark) are requested over and
+over; serving them from cache saves Maps quota and a full API round trip.
+
+- front tier: in-memory LRU of up to `max_entries` routes
+- second tier: optional SQLite file that survives restarts and can be
+  shared by several local processes (daemon workers, voice server)
+
+Keys are normalized (origin, destination, waypoints, mode, avoid_stairs),
+so "Brandenburger Tor " and "brandenburger tor" share one entry. Only
+successful results are cached. Expired routes are kept for a further
+`stale` seconds so get_stale() can still answer while the Directions API
+is unavailable.
+"""
+import collections
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# SQLite file of the second tier, shared by local processes (memory only if unset)
+ROUTE_CACHE_PATH = os.getenv("ROUTE_CACHE_PATH")
+
+# Defaults, overridable from the environment
+ROUTE_CACHE_TTL_SECONDS = float(os.getenv("ROUTE_CACHE_TTL_SECONDS", "21600"))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "2048"))
+ROUTE_CACHE_STALE_SECONDS = float(os.getenv("ROUTE_CACHE_STALE_SECONDS", "86400"))
+
+# Latency samples kept per tier for percentiles
+LATENCY_SAMPLES = 512
+
+# Expired disk rows are purged once every this many writes
+PURGE_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS routes (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_SELECT_ROUTE = "SELECT value, expires_at FROM routes WHERE key = ? AND expires_at > ?"
+_UPSERT_ROUTE = (
+    "INSERT INTO routes (key, value, expires_at) VALUES (?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+)
+_PURGE_ROUTES = "DELETE FROM routes WHERE expires_at <= ?"
+
+# Connections inherited over fork: never used, and never closed, since
+# closing one in a child can checkpoint or unlink the parent's WAL
+_inherited_connections = []
+
+_SPACES = re.compile(r"\s+")
+_COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def normalize_location(location: Optional[str]) -> str:
+    """Case/whitespace-insensitive form of a place; coordinates rounded to ~1 m"""
+    if not location:
+        return ""
+    match = _COORDINATES.match(location)
+    if match:
+        return f"{float(match.group(1)):.5f},{float(match.group(2)):.5f}"
+    return _SPACES.sub(" ", location).strip().strip(",").lower()
+
+
+def route_key(
+    origin: str,
+    destination: str,
+    waypoints: Optional[str] = None,
+    mode: str = "walking",
+    avoid_stairs: bool = True,
+) -> str:
+    """Cache key for one directions request"""
+    return "\x1f".join([
+        normalize_location(origin),
+        normalize_location(destination),
+        normalize_location(waypoints),
+        mode.lower(),
+        "1" if avoid_stairs else "0",
+    ])
+
+
+def _latency_summary(samples) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 1),
+        "p95_us": round(ordered[int(len(ordered) * 0.95)] * 1e6, 1),
+    }
+
+
+class RouteCache:
+    """
+    In-memory LRU in front of an optional SQLite tier, with a per-entry TTL.
+
+    Args:
+        path: SQLite file for the second tier (memory only if None)
+        ttl: Seconds a cached route stays fresh
+        max_entries: Max routes kept in the in-memory tier
+        stale: Seconds an expired route is kept as a fallback for get_stale()
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ROUTE_CACHE_PATH,
+        ttl: float = ROUTE_CACHE_TTL_SECONDS,
+        max_entries: int = ROUTE_CACHE_MAX_ENTRIES,
+        stale: float = ROUTE_CACHE_STALE_SECONDS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale = stale
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._memory: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+        self._writes = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "stale_hits": 0, "stores": 0}
+        self._latencies = {
+            tier: collections.deque(maxlen=LATENCY_SAMPLES) for tier in ("memory_hit", "disk_hit", "miss")
+        }
+
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        if path:
+            # Create the schema up front, so a bad path fails here rather than mid-turn
+            with self._lock:
+                self._conn
+
+    @property
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        """This process's connection to the SQLite tier, reopened after a fork (lock held)"""
+        if not self.path:
+            return None
+        if self._connection_pid != os.getpid():
+            if self._connection is not None:
+                _inherited_connections.append(self._connection)
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            connection.executescript(_SCHEMA)
+            self._connection, self._connection_pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        """Fresh cached value for key, or None"""
+        started = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    self._latencies["memory_hit"].append(time.perf_counter() - started)
+                    return entry[1]
+                # Kept for get_stale(); a fresh put() replaces it
+                self.counters["expired"] += 1
+
+            conn = self._conn
+            if conn is not None:
+                row = conn.execute(_SELECT_ROUTE, (key, now)).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    self._remember(key, expires_at, value)
+                    self.counters["disk_hits"] += 1
+                    self._latencies["disk_hit"].append(time.perf_counter() - started)
+                    return value
+
+            self.counters["misses"] += 1
+            self._latencies["miss"].append(time.perf_counter() - started)
+            return None
+
+    def get_stale(self, key: str) -> Optional[str]:
+        """Cached value for key even if expired, up to `stale` seconds past its TTL, or None"""
+        oldest = time.time() - self.stale
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > oldest:
+                self.counters["stale_hits"] += 1
+                return entry[1]
+            conn = self._conn
+            if conn is not None:
+                row = conn.execute(_SELECT_ROUTE, (key, oldest)).fetchone()
+                if row is not None:
+                    self.counters["stale_hits"] += 1
+                    return row[0]
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value in both tiers for `ttl` seconds"""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.counters["stores"] += 1
+            conn = self._conn
+            if conn is not None:
+                conn.execute(_UPSERT_ROUTE, (key, value, expires_at))
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    conn.execute(_PURGE_ROUTES, (now - self.stale,))
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """Insert into the memory tier, evicting the LRU entry if full (lock held)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and lookup latency per outcome"""
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                "entries": len(self._memory),
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                **self.counters,
+                "latency": {
+                    outcome: _latency_summary(samples)
+                    for outcome, samples in self._latencies.items()
+                    if samples
+                },
+            }
+
+    def clear(self) -> None:
+        """Drop every cached route from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            conn = self._conn
+            if conn is not None:
+                conn.execute("DELETE FROM routes")
+
+    def close(self) -> None:
+        """Close this process's connection to the SQLite tier"""
+        with self._lock:
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._connection_pid = None
+
+
+_cache: Optional[RouteCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_route_cache() -> RouteCache:
+    """Process-wide RouteCache used by the directions tools"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RouteCache()
+    return _cache
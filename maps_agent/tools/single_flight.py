@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing of identical in-flight upstream requests
+At peak many sessions ask for the same thing within seconds ("accessible
+cafes near Brandenburg Gate"). The first call for a key makes the request;
+calls for the same key arriving while it is in flight wait for it and get
+the same result (or exception) instead of sending their own.
+
+Sync and async callers share one table, so a thread-pool call and an
+event-loop call for the same key coalesce too. Keys are the normalized
+cache keys of the tools, checked after the cache: once a request finishes,
+later calls are cache hits rather than followers.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """In-flight request table shared by sync and async callers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, key) -> (result future, event loop of an async leader or None)
+        self._calls: Dict[Tuple[str, Hashable], Tuple[concurrent.futures.Future, Optional[asyncio.AbstractEventLoop]]] = {}
+        self._leaders: Dict[str, int] = collections.Counter()
+        self._coalesced: Dict[str, int] = collections.Counter()
+
+    def _join(
+        self,
+        name: str,
+        key: Hashable,
+        loop: Optional[asyncio.AbstractEventLoop],
+    ) -> Tuple[concurrent.futures.Future, bool]:
+        """(future, True) for a new leader, (leader's future, False) for a follower"""
+        with self._lock:
+            call = self._calls.get((name, key))
+            # A sync follower can't wait for an async leader on its own loop: it would block that loop
+            if call is not None and not (loop is None and call[1] is not None and _running_loop() is call[1]):
+                self._coalesced[name] += 1
+                return call[0], False
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            if call is None:
+                self._calls[(name, key)] = (future, loop)
+            self._leaders[name] += 1
+            return future, True
+
+    def _settle(self, name: str, key: Hashable, future: concurrent.futures.Future, result=None, error=None) -> None:
+        with self._lock:
+            call = self._calls.get((name, key))
+            if call is not None and call[0] is future:
+                del self._calls[(name, key)]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call fn, or wait for the in-flight call with the same key.
+
+        Args:
+            name: Kind of request, for stats (e.g. "directions")
+            key: Normalized request key
+            fn: Makes the request
+
+        Returns:
+            fn's result, from this call or the one already in flight
+        """
+        future, leader = self._join(name, key, None)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(name, key, future, error=e)
+            raise
+        self._settle(name, key, future, result)
+        return result
+
+    async def do_async(self, name: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of do: fn returns an awaitable"""
+        loop = asyncio.get_running_loop()
+        future, leader = self._join(name, key, loop)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        task = asyncio.ensure_future(fn())
+
+        def settle(done: asyncio.Future) -> None:
+            if done.cancelled():
+                self._settle(name, key, future, error=asyncio.CancelledError())
+            elif done.exception() is not None:
+                self._settle(name, key, future, error=done.exception())
+            else:
+                self._settle(name, key, future, done.result())
+
+        task.add_done_callback(settle)
+        # Shielded: if the leading caller is cancelled, the request still completes for its followers
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream requests made and calls coalesced into them, per kind"""
+        with self._lock:
+            names = sorted(set(self._leaders) | set(self._coalesced))
+            return {
+                "in_flight": len(self._calls),
+                "coalesced": sum(self._coalesced.values()),
+                "requests": {
+                    name: {
+                        "upstream": self._leaders[name],
+                        "coalesced": self._coalesced[name],
+                    }
+                    for name in names
+                },
+            }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide SingleFlight used by the Maps tools"""
+    return _single_flight
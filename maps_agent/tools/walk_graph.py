@@ -0,0 +1,439 @@
+"""
+Offline wheelchair-aware walking router over an OpenStreetMap extract
+Routes between coordinates without a Directions API round trip, and knows
+what walking mode doesn't: steps, wheelchair access, surfaces, kerbs and
+inclines, read from the OSM tags of the local extract.
+
+The pedestrian network is stored as a compressed sparse row (CSR) graph in
+flat arrays: node i's outgoing edges are indptr[i]:indptr[i + 1] of the
+edge arrays (target, length, flags, incline, name). A built graph is saved
+as .npz, so the XML is only parsed once. Queries run A* with the straight
+line distance as heuristic, over per-profile edge costs computed once.
+
+ROUTER_GRAPH_PATH is either a saved .npz graph or an .osm / .osm.gz /
+.osm.bz2 extract, which is built on first use and saved next to it.
+"""
+import bz2
+import gzip
+import heapq
+import math
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .elevation import SLOPE_MAX_PERCENT
+
+# Graph or OSM extract used by the offline router; routing is off when unset
+ROUTER_GRAPH_PATH = os.getenv("ROUTER_GRAPH_PATH", "")
+
+# Max distance from a query point to the nearest graph node
+ROUTER_MAX_SNAP_M = float(os.getenv("ROUTER_MAX_SNAP_M", "150"))
+
+# Travel speed used for route durations (manual wheelchair, ~3.6 km/h)
+WHEELCHAIR_SPEED_MPS = float(os.getenv("WHEELCHAIR_SPEED_MPS", "1.0"))
+
+EARTH_RADIUS_M = 6371000.0
+
+# Highways a pedestrian may use; cycleways only when foot access is signed
+PEDESTRIAN_HIGHWAYS = frozenset({
+    "footway", "pedestrian", "path", "steps", "living_street", "residential",
+    "service", "unclassified", "track", "cycleway", "tertiary", "tertiary_link",
+    "secondary", "secondary_link", "primary", "primary_link",
+})
+ROUGH_SURFACES = frozenset({"sett", "cobblestone", "unhewn_cobblestone", "grass_paver", "stepping_stones"})
+UNPAVED_SURFACES = frozenset({
+    "unpaved", "gravel", "fine_gravel", "pebblestone", "compacted", "dirt",
+    "earth", "ground", "grass", "mud", "sand", "woodchips",
+})
+
+# Edge flags
+STEPS = 1
+NO_WHEELCHAIR = 2
+LIMITED_WHEELCHAIR = 4
+ROUGH = 8
+UNPAVED = 16
+RAISED_KERB = 32
+STEEP = 64
+
+# Flag -> (hazard type, OSM tag it came from), for route hazards
+FLAG_HAZARDS: Dict[int, Tuple[str, str]] = {
+    STEPS: ("stairs", "highway=steps"),
+    RAISED_KERB: ("curb", "kerb=raised"),
+    STEEP: ("steep", "incline"),
+    ROUGH: ("cobblestone", "surface"),
+    UNPAVED: ("unpaved", "surface"),
+}
+
+# Accessible profile: edges with these flags are impassable, the others cost
+# their length times 1 + the penalties of their flags
+BLOCKING_FLAGS = STEPS | NO_WHEELCHAIR | RAISED_KERB | STEEP
+FLAG_PENALTIES: Dict[int, float] = {LIMITED_WHEELCHAIR: 0.5, ROUGH: 1.0, UNPAVED: 2.0}
+
+# How unnamed ways are called in instructions
+_UNNAMED = {
+    "crossing": "the crossing",
+    "sidewalk": "the sidewalk",
+    "footway": "the footpath",
+    "path": "the path",
+    "pedestrian": "the pedestrian street",
+    "steps": "the steps",
+    "track": "the track",
+    "cycleway": "the cycle path",
+    "service": "the service road",
+}
+_UNNAMED_LABELS = frozenset(_UNNAMED.values()) | {"the path"}
+
+_POINT = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def parse_point(text: str) -> Optional[Tuple[float, float]]:
+    """(lat, lng) from "52.5163,13.3777", or None for addresses and place names"""
+    match = _POINT.match(text or "")
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def _incline_percent(value: Optional[str]) -> float:
+    """Gradient from an incline tag ("8%", "-5%", "4°"); NaN for "up"/"down" or missing"""
+    value = (value or "").strip().lower()
+    try:
+        if value.endswith("%"):
+            return float(value[:-1])
+        if value.endswith("°"):
+            return 100 * math.tan(math.radians(float(value[:-1])))
+    except ValueError:
+        pass
+    return math.nan
+
+
+def _walkable(tags: Dict[str, str]) -> bool:
+    highway = tags.get("highway")
+    if highway not in PEDESTRIAN_HIGHWAYS:
+        return False
+    foot = tags.get("foot")
+    if foot in ("no", "private"):
+        return False
+    if highway == "cycleway" or tags.get("access") in ("no", "private"):
+        return foot in ("yes", "designated", "permissive")
+    return True
+
+
+def _way_flags(tags: Dict[str, str]) -> int:
+    flags = 0
+    wheelchair = tags.get("wheelchair")
+    # Steps with a ramp are tagged wheelchair=yes or ramp:wheelchair=yes
+    if tags.get("highway") == "steps" and "yes" not in (wheelchair, tags.get("ramp:wheelchair")):
+        flags |= STEPS
+    if wheelchair == "no":
+        flags |= NO_WHEELCHAIR
+    elif wheelchair == "limited":
+        flags |= LIMITED_WHEELCHAIR
+    surface = tags.get("surface")
+    if surface in ROUGH_SURFACES:
+        flags |= ROUGH
+    elif surface in UNPAVED_SURFACES:
+        flags |= UNPAVED
+    if tags.get("kerb") == "raised":
+        flags |= RAISED_KERB
+    if abs(_incline_percent(tags.get("incline"))) > SLOPE_MAX_PERCENT:
+        flags |= STEEP
+    return flags
+
+
+def _way_label(tags: Dict[str, str]) -> str:
+    if tags.get("name"):
+        return tags["name"]
+    return _UNNAMED.get(tags.get("footway", ""), _UNNAMED.get(tags.get("highway", ""), "the path"))
+
+
+def _open_extract(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _reference_latitude(lat: np.ndarray) -> float:
+    return math.radians(float(np.mean(lat))) if len(lat) else 0.0
+
+
+def _project(lat, lng, lat0: float):
+    """Equirectangular projection to metres around latitude lat0 (radians)"""
+    return np.radians(lng) * math.cos(lat0) * EARTH_RADIUS_M, np.radians(lat) * EARTH_RADIUS_M
+
+
+class WalkStep(NamedTuple):
+    """Consecutive route edges along the same way"""
+    name: str
+    named: bool
+    length_m: float
+    flags: int
+    start: Tuple[float, float]
+    bearing_in: float
+    bearing_out: float
+
+
+class WalkRoute(NamedTuple):
+    """A* result: graph nodes and edges along the route"""
+    nodes: List[int]
+    edges: List[int]
+    length_m: float
+    cost: float
+
+
+class WalkGraph:
+    """
+    Pedestrian network in CSR form.
+
+    Args:
+        lat, lng: Node coordinates
+        indptr: Node i's edges are indptr[i]:indptr[i + 1]
+        targets, lengths, flags, inclines, names: Per-edge arrays; names
+            index into name_table
+        name_table: Way names and labels
+    """
+
+    FIELDS = ("lat", "lng", "indptr", "targets", "lengths", "flags", "inclines", "names", "name_table")
+
+    def __init__(self, lat, lng, indptr, targets, lengths, flags, inclines, names, name_table):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.flags = np.asarray(flags, dtype=np.uint8)
+        self.inclines = np.asarray(inclines, dtype=np.float32)
+        self.names = np.asarray(names, dtype=np.int32)
+        self.name_table = [str(name) for name in name_table]
+
+        # Local metric projection: edge lengths and the A* heuristic share it,
+        # so the straight-line heuristic never overestimates
+        self._lat0 = _reference_latitude(self.lat)
+        self.x, self.y = _project(self.lat, self.lng, self._lat0)
+        self._lock = threading.Lock()
+        self._adjacency = None
+        self._costs: Dict[bool, List[float]] = {}
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    @classmethod
+    def from_osm(cls, path: str) -> "WalkGraph":
+        """Build the pedestrian graph of an .osm (optionally .gz/.bz2) extract"""
+        coords: Dict[int, Tuple[float, float]] = {}
+        raised_kerbs = set()
+        name_ids: Dict[str, int] = {}
+        sources, dests, way_flags, way_inclines, way_names = [], [], [], [], []
+
+        with _open_extract(path) as extract:
+            for _, element in ET.iterparse(extract, events=("end",)):
+                if element.tag == "node":
+                    node_id = int(element.get("id"))
+                    coords[node_id] = (float(element.get("lat")), float(element.get("lon")))
+                    for tag in element.iter("tag"):
+                        if tag.get("k") == "kerb" and tag.get("v") == "raised":
+                            raised_kerbs.add(node_id)
+                    element.clear()
+                elif element.tag == "way":
+                    tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                    if _walkable(tags):
+                        refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                        refs = [ref for ref in refs if ref in coords]
+                        flags = _way_flags(tags)
+                        incline = _incline_percent(tags.get("incline"))
+                        name = name_ids.setdefault(_way_label(tags), len(name_ids))
+                        for source, dest in zip(refs, refs[1:]):
+                            sources.append(source)
+                            dests.append(dest)
+                            way_flags.append(flags | (RAISED_KERB if raised_kerbs & {source, dest} else 0))
+                            way_inclines.append(incline)
+                            way_names.append(name)
+                    element.clear()
+                elif element.tag == "relation":
+                    element.clear()
+
+        node_ids = np.unique(np.array(sources + dests, dtype=np.int64))
+        lat = np.array([coords[node_id][0] for node_id in node_ids.tolist()])
+        lng = np.array([coords[node_id][1] for node_id in node_ids.tolist()])
+        x, y = _project(lat, lng, _reference_latitude(lat))
+
+        # Ways are walkable both ways; inclines flip sign on the way back
+        source = np.searchsorted(node_ids, np.array(sources, dtype=np.int64))
+        dest = np.searchsorted(node_ids, np.array(dests, dtype=np.int64))
+        edge_from = np.concatenate((source, dest))
+        edge_to = np.concatenate((dest, source))
+        order = np.argsort(edge_from, kind="stable")
+        inclines = np.array(way_inclines, dtype=np.float32)
+        return cls(
+            lat,
+            lng,
+            np.concatenate(([0], np.cumsum(np.bincount(edge_from, minlength=len(node_ids))))),
+            edge_to[order],
+            np.hypot(x[edge_to] - x[edge_from], y[edge_to] - y[edge_from])[order],
+            np.tile(np.array(way_flags, dtype=np.uint8), 2)[order],
+            np.concatenate((inclines, -inclines))[order],
+            np.tile(np.array(way_names, dtype=np.int32), 2)[order],
+            list(name_ids),
+        )
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, **{
+            field: np.array(self.name_table, dtype=str) if field == "name_table" else getattr(self, field)
+            for field in self.FIELDS
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "WalkGraph":
+        with np.load(path) as data:
+            return cls(*(data[field] for field in cls.FIELDS))
+
+    def edge_costs(self, avoid_stairs: bool = True) -> np.ndarray:
+        """Per-edge cost in metres: length, penalized or infinite when avoiding stairs"""
+        if not avoid_stairs:
+            return self.lengths.astype(np.float64)
+        multiplier = np.ones(self.num_edges)
+        for flag, penalty in FLAG_PENALTIES.items():
+            multiplier += penalty * ((self.flags & flag) != 0)
+        multiplier[(self.flags & BLOCKING_FLAGS) != 0] = np.inf
+        return self.lengths * multiplier
+
+    def _search_arrays(self, avoid_stairs: bool):
+        """CSR arrays and costs as lists: far faster than NumPy scalars in the A* loop"""
+        with self._lock:
+            if self._adjacency is None:
+                self._adjacency = (self.indptr.tolist(), self.targets.tolist(), self.x.tolist(), self.y.tolist())
+            if avoid_stairs not in self._costs:
+                self._costs[avoid_stairs] = self.edge_costs(avoid_stairs).tolist()
+            return self._adjacency + (self._costs[avoid_stairs],)
+
+    def nearest(self, lat: float, lng: float) -> Optional[int]:
+        """Node closest to a point, or None if none is within ROUTER_MAX_SNAP_M"""
+        if not self.num_nodes:
+            return None
+        x, y = _project(lat, lng, self._lat0)
+        distances = (self.x - x) ** 2 + (self.y - y) ** 2
+        node = int(np.argmin(distances))
+        return node if distances[node] <= ROUTER_MAX_SNAP_M ** 2 else None
+
+    def route(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        avoid_stairs: bool = True,
+    ) -> Optional[WalkRoute]:
+        """
+        Cheapest route between two points.
+
+        Args:
+            origin: (lat, lng)
+            destination: (lat, lng)
+            avoid_stairs: Use the accessible profile (see BLOCKING_FLAGS)
+
+        Returns:
+            The route, or None if a point is off the network or no route exists
+        """
+        source, target = self.nearest(*origin), self.nearest(*destination)
+        if source is None or target is None:
+            return None
+
+        indptr, targets, x, y, costs = self._search_arrays(avoid_stairs)
+        target_x, target_y = x[target], y[target]
+        best = {source: 0.0}
+        came_by: Dict[int, int] = {}
+        queue = [(math.hypot(x[source] - target_x, y[source] - target_y), 0.0, source)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue
+            for edge in range(indptr[node], indptr[node + 1]):
+                next_cost = cost + costs[edge]
+                neighbour = targets[edge]
+                if next_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = next_cost
+                    came_by[neighbour] = edge
+                    heuristic = math.hypot(x[neighbour] - target_x, y[neighbour] - target_y)
+                    heapq.heappush(queue, (next_cost + heuristic, next_cost, neighbour))
+        else:
+            return None
+
+        nodes, edges = [target], []
+        while nodes[-1] != source:
+            edge = came_by[nodes[-1]]
+            edges.append(edge)
+            nodes.append(int(np.searchsorted(self.indptr, edge, side="right") - 1))
+        nodes.reverse()
+        edges.reverse()
+        return WalkRoute(nodes, edges, float(self.lengths[edges].sum()), best[target])
+
+    def _bearing(self, edge: int, source: int) -> float:
+        """Compass bearing of an edge in degrees"""
+        target = self.targets[edge]
+        return math.degrees(math.atan2(self.x[target] - self.x[source], self.y[target] - self.y[source])) % 360
+
+    def steps(self, route: WalkRoute) -> List[WalkStep]:
+        """Route edges grouped into steps along the same way"""
+        steps: List[WalkStep] = []
+        start = 0
+        for end in range(1, len(route.edges) + 1):
+            if end < len(route.edges) and self.names[route.edges[end]] == self.names[route.edges[start]]:
+                continue
+            edges = route.edges[start:end]
+            first, last = route.nodes[start], route.nodes[end - 1]
+            name = self.name_table[self.names[edges[0]]]
+            steps.append(WalkStep(
+                name=name,
+                named=name not in _UNNAMED_LABELS,
+                length_m=float(self.lengths[edges].sum()),
+                flags=int(np.bitwise_or.reduce(self.flags[edges])),
+                start=(float(self.lat[first]), float(self.lng[first])),
+                bearing_in=self._bearing(edges[0], first),
+                bearing_out=self._bearing(edges[-1], last),
+            ))
+            start = end
+        return steps
+
+
+_graph: Optional[WalkGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_walk_graph() -> Optional[WalkGraph]:
+    """Process-wide WalkGraph from ROUTER_GRAPH_PATH, or None if not configured"""
+    global _graph
+    if _graph is None and ROUTER_GRAPH_PATH and os.path.exists(ROUTER_GRAPH_PATH):
+        with _graph_lock:
+            if _graph is None:
+                _graph = _load_or_build(ROUTER_GRAPH_PATH)
+    return _graph
+
+
+def _load_or_build(path: str) -> WalkGraph:
+    if path.endswith(".npz"):
+        return WalkGraph.load(path)
+
+    # Built graphs are saved next to the extract and reused while it is unchanged
+    saved = f"{path}.npz"
+    if os.path.exists(saved) and os.path.getmtime(saved) >= os.path.getmtime(path):
+        return WalkGraph.load(saved)
+    graph = WalkGraph.from_osm(path)
+    try:
+        graph.save(saved)
+    except OSError:
+        pass
+    return graph
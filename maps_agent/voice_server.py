@@ -10,11 +10,17 @@ import logging
 from typing import AsyncGenerator
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+from bounded_session_service import BoundedSessionService
+from runner_registry import get_runner, registry
 from streaming_agent import streaming_agent
+from tools.maps_client import get_maps_client
+from tools.place_cache import get_place_cache
+from tools.rate_limiter import get_rate_limiter
+from tools.route_cache import get_route_cache
+from tools.single_flight import get_single_flight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +30,12 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="Maps Agent Voice API")
 
 # Initialize ADK components
-session_service = InMemorySessionService()
-runner = Runner(
-    app_name="maps_agent_voice",
-    agent=streaming_agent,
-    session_service=session_service
+# Sessions left behind by dropped connections are evicted after an idle TTL;
+# sessions of open connections are kept
+session_service = BoundedSessionService(
+    InMemorySessionService(), in_use=lambda key: key[2] in active_sessions,
 )
+runner = get_runner("maps_agent_voice", streaming_agent, session_service)
 
 # Active sessions
 active_sessions = {}
@@ -88,7 +94,7 @@ async def voice_websocket(websocket: WebSocket):
             # Create session if it doesn't exist
             if session_id not in active_sessions:
                 logger.info(f"Creating new session: {session_id}")
-                session = session_service.create_session_sync(
+                session = await session_service.create_session(
                     app_name="maps_agent",
                     user_id=user_id,
                     session_id=session_id
@@ -240,7 +246,14 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "active_sessions": len(active_sessions)
+        "active_sessions": len(active_sessions),
+        "sessions": session_service.stats(),
+        "runners": registry.stats(),
+        "maps_http": get_maps_client().stats(),
+        "route_cache": get_route_cache().stats(),
+        "place_cache": get_place_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "rate_limits": get_rate_limiter().stats()
     }
 
 
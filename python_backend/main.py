@@ -4,8 +4,12 @@ Based on local-explorer-assistant architecture with SSE streaming
 """
 import os
 import json
+import time
 import uuid
+import asyncio
 import logging
+import contextlib
+import collections
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
@@ -15,6 +19,7 @@ from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 
 from maps_agent.agent import root_agent
+from maps_agent.tools import coalescing_stats
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +31,13 @@ logger = logging.getLogger("maps_agent_api")
 APP_NAME = "maps-agent-hackathon"
 USER_ID = os.getenv("USER_ID", "default_user")
 
+# Session bounds: every chat without a session_id creates a new session, so
+# sessions idle longer than the TTL, and the oldest beyond the cap, are deleted
+# by a background sweep every SESSION_SWEEP_SECONDS
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "30"))
+
 app = FastAPI(title="Maps Agent API")
 
 # CORS configuration
@@ -41,6 +53,69 @@ app.add_middleware(
 runner: Runner = None
 session_service: InMemorySessionService = None
 
+# session_id -> last access (monotonic seconds), least recently used first
+_session_access: "collections.OrderedDict[str, float]" = collections.OrderedDict()
+_sessions_evicted = 0
+# session_id -> turns running; such sessions are never evicted
+_active_turns: "collections.Counter[str]" = collections.Counter()
+
+
+async def _ensure_session(session_id: str) -> None:
+    """Create the session if it doesn't exist and mark it as just used"""
+    if session_id not in _session_access:
+        try:
+            await session_service.create_session(
+                app_name=APP_NAME,
+                user_id=USER_ID,
+                session_id=session_id,
+            )
+        except Exception:
+            # Session already exists, that's fine
+            pass
+    _session_access[session_id] = time.monotonic()
+    _session_access.move_to_end(session_id)
+
+
+@contextlib.contextmanager
+def _turn(session_id: str):
+    """Keep a session from being evicted while a turn runs; idle time counts from its end"""
+    _active_turns[session_id] += 1
+    try:
+        yield
+    finally:
+        _active_turns[session_id] -= 1
+        if _active_turns[session_id] <= 0:
+            del _active_turns[session_id]
+        if session_id in _session_access:
+            _session_access[session_id] = time.monotonic()
+            _session_access.move_to_end(session_id)
+
+
+async def _evict_sessions() -> None:
+    """Delete idle sessions, then the least recently used beyond the cap, skipping running turns"""
+    global _sessions_evicted
+
+    now = time.monotonic()
+    # Oldest first: stop at the first session that is neither idle nor over the cap
+    for session_id, last_access in list(_session_access.items()):
+        if now - last_access < SESSION_TTL_SECONDS and len(_session_access) <= SESSION_MAX_COUNT:
+            break
+        if _active_turns[session_id] or session_id not in _session_access:
+            continue
+        del _session_access[session_id]
+        await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        _sessions_evicted += 1
+
+
+async def _sweep_sessions() -> None:
+    """Run session eviction off the request path"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        try:
+            await _evict_sessions()
+        except Exception as e:
+            logger.warning(f"Session sweep failed: {e}")
+
 
 @app.on_event("startup")
 async def init_runner():
@@ -56,6 +131,7 @@ async def init_runner():
         app_name=APP_NAME,
         session_service=session_service,
     )
+    app.state.session_sweeper = asyncio.create_task(_sweep_sessions())
     
     logger.info("ADK Runner initialized successfully")
 
@@ -67,7 +143,9 @@ async def root():
         "status": "ok",
         "message": "Maps Agent API is running",
         "version": "1.0.0",
-        "backend": "Google ADK"
+        "backend": "Google ADK",
+        "find_places": coalescing_stats(),
+        "sessions": {"live": len(_session_access), "evicted": _sessions_evicted},
     }
 
 
@@ -87,15 +165,7 @@ async def chat_stream(request: Request):
         logger.info(f"Received message: {message} (session: {session_id})")
         
         # Create session if it doesn't exist
-        try:
-            await session_service.create_session(
-                app_name=APP_NAME,
-                user_id=USER_ID,
-                session_id=session_id,
-            )
-        except Exception:
-            # Session already exists, that's fine
-            pass
+        await _ensure_session(session_id)
         
         # Create content for the agent
         content = Content(role="user", parts=[Part(text=message)])
@@ -103,31 +173,32 @@ async def chat_stream(request: Request):
         async def generate():
             """Generate SSE stream from ADK events"""
             try:
-                async for event in runner.run_async(
-                    user_id=USER_ID,
-                    session_id=session_id,
-                    new_message=content
-                ):
-                    # Send different event types
-                    if event.is_final_response():
-                        # Final response from agent
-                        if event.content and event.content.parts:
-                            response_text = event.content.parts[0].text
-                            yield f"data: {json.dumps({'type': 'text', 'content': response_text})}\n\n"
+                with _turn(session_id):
+                    async for event in runner.run_async(
+                        user_id=USER_ID,
+                        session_id=session_id,
+                        new_message=content
+                    ):
+                        # Send different event types
+                        if event.is_final_response():
+                            # Final response from agent
+                            if event.content and event.content.parts:
+                                response_text = event.content.parts[0].text
+                                yield f"data: {json.dumps({'type': 'text', 'content': response_text})}\n\n"
                         
-                        # Check for escalation/error
-                        if event.actions and event.actions.escalate:
-                            error_msg = event.error_message or "Agent escalated"
-                            yield f"data: {json.dumps({'type': 'error', 'content': error_msg})}\n\n"
+                            # Check for escalation/error
+                            if event.actions and event.actions.escalate:
+                                error_msg = event.error_message or "Agent escalated"
+                                yield f"data: {json.dumps({'type': 'error', 'content': error_msg})}\n\n"
                         
-                        # Send done signal
-                        yield f"data: {json.dumps({'type': 'done'})}\n\n"
-                        break
+                            # Send done signal
+                            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                            break
                     
-                    elif event.content and event.content.parts:
-                        # Intermediate response (streaming)
-                        text_chunk = event.content.parts[0].text
-                        yield f"data: {json.dumps({'type': 'text', 'content': text_chunk})}\n\n"
+                        elif event.content and event.content.parts:
+                            # Intermediate response (streaming)
+                            text_chunk = event.content.parts[0].text
+                            yield f"data: {json.dumps({'type': 'text', 'content': text_chunk})}\n\n"
                         
             except Exception as e:
                 logger.error(f"Error in generate: {e}")
@@ -164,30 +235,24 @@ async def chat_simple(request: Request):
         logger.info(f"Received simple message: {message}")
         
         # Create session if it doesn't exist
-        try:
-            await session_service.create_session(
-                app_name=APP_NAME,
-                user_id=USER_ID,
-                session_id=session_id,
-            )
-        except Exception:
-            pass
+        await _ensure_session(session_id)
         
         # Create content for the agent
         content = Content(role="user", parts=[Part(text=message)])
         
         response_text = ""
-        async for event in runner.run_async(
-            user_id=USER_ID,
-            session_id=session_id,
-            new_message=content
-        ):
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    response_text = event.content.parts[0].text
-                elif event.actions and event.actions.escalate:
-                    response_text = f"Agent escalated: {event.error_message or 'No message'}"
-                break
+        with _turn(session_id):
+            async for event in runner.run_async(
+                user_id=USER_ID,
+                session_id=session_id,
+                new_message=content
+            ):
+                if event.is_final_response():
+                    if event.content and event.content.parts:
+                        response_text = event.content.parts[0].text
+                    elif event.actions and event.actions.escalate:
+                        response_text = f"Agent escalated: {event.error_message or 'No message'}"
+                    break
         
         return {"text": response_text, "session_id": session_id}
         
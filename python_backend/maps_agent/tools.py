@@ -1,10 +1,62 @@
 """
 Google Places API tool for finding places with Maps grounding
 """
+import asyncio
+import concurrent.futures
+import json
 import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional
 
+# Use Places API (New) Text Search
+PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+
+# Keep-alive pool shared by every call, so each search skips the TCP+TLS handshake
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_maxsize=int(os.getenv("MAPS_POOL_MAXSIZE", "32")),
+    max_retries=0,
+))
+
+# httpx.AsyncClient for find_places_async, created on the server's event loop
+_async_client = None
+
+# Single flight: identical searches in flight share one request.
+# Normalized search query -> future of the leading call's result
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_flight_stats = {"upstream": 0, "coalesced": 0}
+
+
+def _join_flight(key: str, is_async: bool):
+    """(future, True) if this call makes the request, (leader's future, False) if it waits"""
+    with _in_flight_lock:
+        call = _in_flight.get(key)
+        # Sync callers never wait on an async leader: it may need the loop they would block
+        if call is not None and (is_async or not call[1]):
+            _flight_stats["coalesced"] += 1
+            return call[0], False
+        future = concurrent.futures.Future()
+        if call is None:
+            _in_flight[key] = (future, is_async)
+        _flight_stats["upstream"] += 1
+        return future, True
+
+
+def _end_flight(key: str, future, result: str) -> None:
+    with _in_flight_lock:
+        if _in_flight.get(key, (None,))[0] is future:
+            del _in_flight[key]
+    future.set_result(result)
+
+
+def coalescing_stats() -> dict:
+    """Upstream searches made and calls coalesced into them"""
+    with _in_flight_lock:
+        return dict(_flight_stats, in_flight=len(_in_flight))
+
 
 def find_places(
     query: str,
@@ -12,66 +64,134 @@ def find_places(
 ) -> str:
     """
     Find places using Google Places API Text Search
-    
+
+    Args:
+        query: Search query (e.g., "Italian restaurants in Kyiv")
+        location: Optional location bias (e.g., "Kyiv, Ukraine")
+
+    Returns:
+        JSON string with place results including names, addresses, ratings
+    """
+    request = _search_request(query, location)
+    if request is None:
+        return '{"error": "GOOGLE_MAPS_API_KEY not configured"}'
+    payload, headers = request
+
+    key = " ".join(payload["textQuery"].lower().split())
+    future, leader = _join_flight(key, is_async=False)
+    if not leader:
+        return future.result()
+
+    try:
+        response = _session.post(PLACES_SEARCH_URL, json=payload, headers=headers, timeout=10)
+        response.raise_for_status()
+        result = _format_places(response.json(), payload["textQuery"])
+
+    except requests.exceptions.RequestException as e:
+        result = f'{{"error": "Failed to fetch places: {str(e)}"}}'
+    except Exception as e:
+        result = f'{{"error": "Unexpected error: {str(e)}"}}'
+    _end_flight(key, future, result)
+    return result
+
+
+async def find_places_async(
+    query: str,
+    location: Optional[str] = None,
+) -> str:
+    """
+    Find places using Google Places API Text Search without blocking the event loop
+
     Args:
         query: Search query (e.g., "Italian restaurants in Kyiv")
         location: Optional location bias (e.g., "Kyiv, Ukraine")
-    
+
     Returns:
         JSON string with place results including names, addresses, ratings
     """
+    import httpx
+
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=int(os.getenv("MAPS_POOL_MAXSIZE", "32"))),
+            timeout=httpx.Timeout(10, connect=3.05),
+        )
+
+    request = _search_request(query, location)
+    if request is None:
+        return '{"error": "GOOGLE_MAPS_API_KEY not configured"}'
+    payload, headers = request
+
+    key = " ".join(payload["textQuery"].lower().split())
+    future, leader = _join_flight(key, is_async=True)
+    if not leader:
+        return await asyncio.wrap_future(future)
+
+    try:
+        response = await _async_client.post(PLACES_SEARCH_URL, json=payload, headers=headers)
+        response.raise_for_status()
+        result = _format_places(response.json(), payload["textQuery"])
+
+    except httpx.HTTPError as e:
+        result = f'{{"error": "Failed to fetch places: {str(e)}"}}'
+    except BaseException as e:
+        # Cancelled or unexpected: followers must not wait forever
+        with _in_flight_lock:
+            if _in_flight.get(key, (None,))[0] is future:
+                del _in_flight[key]
+        future.set_exception(e)
+        raise
+    _end_flight(key, future, result)
+    return result
+
+
+def _search_request(query: str, location: Optional[str]):
+    """(payload, headers) for a searchText call, or None if no API key is configured"""
     api_key = os.getenv("GOOGLE_MAPS_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    
+
     if not api_key:
-        return '{"error": "GOOGLE_MAPS_API_KEY not configured"}'
-    
+        return None
+
     # Construct search query
     search_query = query
     if location and location.lower() not in query.lower():
         search_query = f"{query} in {location}"
-    
-    # Use Places API (New) Text Search
-    url = "https://places.googleapis.com/v1/places:searchText"
-    
+
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.location,places.types,places.googleMapsUri"
+        "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.location"
     }
-    
+
     payload = {
         "textQuery": search_query,
         "languageCode": "en"
     }
-    
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        places = data.get("places", [])
-        
-        if not places:
-            return f'{{"message": "No places found for query: {search_query}"}}'
-        
-        # Format results
-        results = []
-        for place in places[:5]:  # Limit to top 5 results
-            result = {
-                "name": place.get("displayName", {}).get("text", "Unknown"),
-                "address": place.get("formattedAddress", "Address not available"),
-                "rating": place.get("rating"),
-                "user_ratings": place.get("userRatingCount"),
-                "location": place.get("location", {}),
-                "types": place.get("types", []),
-                "google_maps_uri": place.get("googleMapsUri", "")
-            }
-            results.append(result)
-        
-        import json
-        return json.dumps({"places": results, "query": search_query}, indent=2)
-        
-    except requests.exceptions.RequestException as e:
-        return f'{{"error": "Failed to fetch places: {str(e)}"}}'
-    except Exception as e:
-        return f'{{"error": "Unexpected error: {str(e)}"}}'
+    return payload, headers
+
+
+def _format_places(data: dict, search_query: str) -> str:
+    """Format a searchText response as the tool's JSON result"""
+    places = data.get("places", [])
+
+    if not places:
+        return f'{{"message": "No places found for query: {search_query}"}}'
+
+    # Format results: only what the model needs, since it is re-read every turn
+    results = []
+    for place in places[:5]:  # Limit to top 5 results
+        result = {
+            "name": place.get("displayName", {}).get("text", "Unknown"),
+            "address": place.get("formattedAddress", "Address not available"),
+            "rating": place.get("rating"),
+            "user_ratings": place.get("userRatingCount"),
+        }
+        location = place.get("location")
+        if location:
+            # [lat, lng] rounded to ~1 m
+            result["location"] = [round(location["latitude"], 5), round(location["longitude"], 5)]
+        results.append({key: value for key, value in result.items() if value is not None})
+
+    # Minified: no indentation or spaces, non-ASCII names kept as is
+    return json.dumps({"places": results, "query": search_query}, ensure_ascii=False, separators=(",", ":"))
@@ -1,8 +1,13 @@
 /**
  * Node.js wrapper for calling the Python ADK agent
+ *
+ * A single long-lived `runner.py --daemon` process serves all queries over a
+ * JSON-lines protocol, so each turn skips interpreter startup and agent
+ * construction, and session/memory state survives between turns.
  */
-import { spawn } from "child_process";
+import { spawn, ChildProcessWithoutNullStreams } from "child_process";
 import path from "path";
+import readline from "readline";
 import { fileURLToPath } from "url";
 import { dirname } from "path";
 
@@ -17,6 +22,189 @@ export interface AgentResponse {
   user_id: string;
 }
 
+/**
+ * Compact event emitted by `runner.py` in streaming mode
+ */
+export interface AgentStreamEvent {
+  type: "text" | "tool_call" | "tool_result" | "grounding" | "error";
+  text?: string;
+  author?: string;
+  partial?: boolean;
+  id?: string;
+  name?: string;
+  args?: Record<string, unknown>;
+  response?: Record<string, unknown>;
+  sources?: { kind: string; title?: string; uri?: string; place_id?: string }[];
+  queries?: string[];
+  code?: string;
+  message?: string;
+}
+
+interface PendingRequest {
+  resolve: (response: AgentResponse) => void;
+  reject: (error: Error) => void;
+  onEvent?: (event: AgentStreamEvent) => void;
+  child: ChildProcessWithoutNullStreams;
+  timer: NodeJS.Timeout;
+}
+
+// A turn not answered within this many milliseconds is failed
+const REQUEST_TIMEOUT_MS = Number(process.env.ADK_AGENT_TIMEOUT_MS || 120000);
+
+let daemon: ChildProcessWithoutNullStreams | null = null;
+let nextRequestId = 1;
+const pending = new Map<string, PendingRequest>();
+
+function getAgentEnv(): NodeJS.ProcessEnv {
+  // Set environment variables for Vertex AI
+  return {
+    ...process.env,
+    GOOGLE_GENAI_USE_VERTEXAI: "TRUE",
+    GOOGLE_CLOUD_PROJECT: "qwiklabs-gcp-00-6bf2cd71dda4",
+    GOOGLE_CLOUD_LOCATION: "us-central1",
+    GOOGLE_APPLICATION_CREDENTIALS: path.resolve(
+      process.cwd(),
+      "maps_agent/qwiklabs-gcp-00-6bf2cd71dda4-c40f82b6785d.json"
+    ),
+  };
+}
+
+/**
+ * Remove a request from the pending map; undefined if it already settled
+ */
+function takePending(id: string): PendingRequest | undefined {
+  const request = pending.get(id);
+  if (request) {
+    pending.delete(id);
+    clearTimeout(request.timer);
+  }
+  return request;
+}
+
+/**
+ * Fail every request still waiting on a daemon that has gone away
+ */
+function failPending(child: ChildProcessWithoutNullStreams, error: Error) {
+  pending.forEach((request, id) => {
+    if (request.child === child) {
+      takePending(id);
+      request.reject(error);
+    }
+  });
+}
+
+function dropDaemon(child: ChildProcessWithoutNullStreams, error: Error) {
+  if (daemon === child) {
+    daemon = null;
+  }
+  failPending(child, error);
+}
+
+/**
+ * Get the running agent daemon, starting it on first use or after a crash
+ */
+function getDaemon(): ChildProcessWithoutNullStreams {
+  if (daemon) {
+    return daemon;
+  }
+
+  const pythonPath = "python3.11";
+  const scriptPath = path.resolve(process.cwd(), "maps_agent/runner.py");
+  // ADK_AGENT_ISOLATION=fork runs each query in a forked child of a warm
+  // zygote; ADK_AGENT_WORKERS > 0 runs a supervisor over warm workers
+  const workers = Number(process.env.ADK_AGENT_WORKERS || 0);
+  const modeArgs =
+    process.env.ADK_AGENT_ISOLATION === "fork"
+      ? ["--zygote"]
+      : workers > 0
+        ? ["--workers", String(workers)]
+        : ["--daemon"];
+  const child = spawn(pythonPath, [scriptPath, ...modeArgs], {
+    env: getAgentEnv(),
+  });
+
+  let stderr = "";
+  child.stderr.on("data", data => {
+    // Keep only the tail for error reports
+    stderr = (stderr + data.toString()).slice(-4000);
+  });
+
+  readline.createInterface({ input: child.stdout }).on("line", line => {
+    let message: any;
+    try {
+      message = JSON.parse(line);
+    } catch {
+      console.warn(`[adk-agent] Ignoring non-JSON daemon output: ${line}`);
+      return;
+    }
+
+    const request = message.id != null ? pending.get(message.id) : undefined;
+    if (!request) {
+      if (message.type === "error") {
+        console.error(`[adk-agent] Daemon error: ${message.error}`);
+      }
+      return;
+    }
+
+    if (message.type === "event") {
+      request.onEvent?.(message.event);
+    } else if (message.type === "result") {
+      takePending(message.id);
+      const { id, type, ...result } = message;
+      request.resolve(result as AgentResponse);
+    } else if (message.type === "error") {
+      takePending(message.id);
+      request.reject(new Error(message.error));
+    }
+  });
+
+  child.on("exit", code => {
+    dropDaemon(child, new Error(`Python agent daemon exited with code ${code}: ${stderr}`));
+  });
+
+  child.on("error", error => {
+    dropDaemon(child, error);
+  });
+
+  // Writing after the daemon died raises EPIPE here; unhandled, it would crash Node
+  child.stdin.on("error", error => {
+    dropDaemon(child, error);
+  });
+
+  daemon = child;
+  return child;
+}
+
+function sendRequest(
+  query: string,
+  sessionId: string,
+  userId: string,
+  onEvent?: (event: AgentStreamEvent) => void
+): Promise<AgentResponse> {
+  return new Promise((resolve, reject) => {
+    const child = getDaemon();
+    const id = String(nextRequestId++);
+
+    const timer = setTimeout(() => {
+      // A late answer finds no pending entry and is ignored
+      if (takePending(id)) {
+        reject(new Error(`Python agent did not answer within ${REQUEST_TIMEOUT_MS}ms`));
+      }
+    }, REQUEST_TIMEOUT_MS);
+    pending.set(id, { resolve, reject, onEvent, child, timer });
+    child.stdin.write(
+      JSON.stringify({
+        id,
+        op: "run",
+        query,
+        session_id: sessionId,
+        user_id: userId,
+        stream: onEvent !== undefined,
+      }) + "\n"
+    );
+  });
+}
+
 /**
  * Run the ADK agent with a query
  */
@@ -25,71 +213,71 @@ export async function runAgent(
   sessionId: string = "default",
   userId: string = "default"
 ): Promise<AgentResponse> {
-  return new Promise((resolve, reject) => {
-    const pythonPath = "python3.11";
-    const scriptPath = path.resolve(process.cwd(), "maps_agent/runner.py");
-
-    // Set environment variables for Vertex AI
-    const env = {
-      ...process.env,
-      GOOGLE_GENAI_USE_VERTEXAI: "TRUE",
-      GOOGLE_CLOUD_PROJECT: "qwiklabs-gcp-00-6bf2cd71dda4",
-      GOOGLE_CLOUD_LOCATION: "us-central1",
-      GOOGLE_APPLICATION_CREDENTIALS: path.resolve(
-        process.cwd(),
-        "maps_agent/qwiklabs-gcp-00-6bf2cd71dda4-c40f82b6785d.json"
-      ),
-    };
-
-    const pythonProcess = spawn(pythonPath, [scriptPath, query, sessionId, userId], {
-      env,
-    });
-
-    let stdout = "";
-    let stderr = "";
-
-    pythonProcess.stdout.on("data", (data) => {
-      stdout += data.toString();
-    });
-
-    pythonProcess.stderr.on("data", (data) => {
-      stderr += data.toString();
-    });
-
-    pythonProcess.on("close", (code) => {
-      if (code !== 0) {
-        reject(new Error(`Python process exited with code ${code}: ${stderr}`));
-        return;
-      }
+  return sendRequest(query, sessionId, userId);
+}
 
-      try {
-        const result = JSON.parse(stdout);
-        resolve(result);
-      } catch (error) {
-        reject(new Error(`Failed to parse JSON response: ${stdout}`));
-      }
-    });
+/**
+ * Stream events from the ADK agent as soon as the daemon emits them
+ */
+export async function* streamAgentEvents(
+  query: string,
+  sessionId: string = "default",
+  userId: string = "default"
+): AsyncGenerator<AgentStreamEvent, AgentResponse, unknown> {
+  const queue: AgentStreamEvent[] = [];
+  let wake: (() => void) | null = null;
+  let done = false;
+
+  const notify = () => {
+    wake?.();
+    wake = null;
+  };
 
-    pythonProcess.on("error", (error) => {
-      reject(error);
-    });
+  const result = sendRequest(query, sessionId, userId, event => {
+    queue.push(event);
+    notify();
+  }).finally(() => {
+    done = true;
+    notify();
   });
+  // Errors surface through `await result` below
+  result.catch(() => undefined);
+
+  while (true) {
+    if (queue.length > 0) {
+      yield queue.shift()!;
+    } else if (done) {
+      break;
+    } else {
+      await new Promise<void>(resolve => {
+        wake = resolve;
+      });
+    }
+  }
+
+  return await result;
 }
 
 /**
- * Stream responses from the ADK agent (for future implementation)
+ * Stream response text from the ADK agent as it is generated
  */
 export async function* streamAgent(
   query: string,
   sessionId: string = "default",
   userId: string = "default"
 ): AsyncGenerator<string, void, unknown> {
-  // TODO: Implement streaming by modifying runner.py to support streaming mode
-  // For now, just yield the final response
-  const response = await runAgent(query, sessionId, userId);
-  if (response.success && response.response) {
-    yield response.response;
-  } else if (response.error) {
-    throw new Error(response.error);
+  const events = streamAgentEvents(query, sessionId, userId);
+  while (true) {
+    const next = await events.next();
+    if (next.done) {
+      const response = next.value;
+      if (!response.success) {
+        throw new Error(response.error || "Agent failed to process query");
+      }
+      return;
+    }
+    if (next.value.type === "text" && next.value.text) {
+      yield next.value.text;
+    }
   }
 }